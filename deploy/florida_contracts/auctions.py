@@ -0,0 +1,150 @@
+from typing import Iterator, NamedTuple, Optional
+
+from florida_contracts.events import (
+    AuctionSettled,
+    AuctionSettledWithBuyout,
+    BidPlaced,
+    Event,
+    EventRegistry,
+    LoanLiquidationStarted,
+)
+from florida_contracts.structs import Auction
+
+# Mirrors src/lib/AuctionLoanLiquidator.sol
+MIN_NO_ACTION_MARGIN = 10 * 60
+MIN_INCREMENT_BPS = 500
+BPS = 10000
+
+TimeForMainLenderToBuyUpdated = Event("TimeForMainLenderToBuyUpdated", ("uint256",))
+
+AUCTION_EVENTS = EventRegistry(
+    [
+        LoanLiquidationStarted,
+        BidPlaced,
+        AuctionSettled,
+        AuctionSettledWithBuyout,
+        TimeForMainLenderToBuyUpdated,
+    ]
+)
+
+
+class BidQuote(NamedTuple):
+    auction: Auction
+    min_bid: int
+    # First timestamp at which `placeBid` is accepted (buyout window for
+    # AuctionWithBuyoutLoanLiquidator, `startTime` otherwise).
+    opens_at: int
+    # Bids are accepted while `block.timestamp < deadline`, settlement from then on.
+    # None while there are no bids: `placeBid` has no time limit in that case.
+    deadline: Optional[int]
+
+    def is_open(self, now: int) -> bool:
+        return self.opens_at <= now and (self.deadline is None or now < self.deadline)
+
+    def accepts(self, bid: int, now: int) -> bool:
+        return bid >= self.min_bid and self.is_open(now)
+
+
+def get_min_bid(auction: Auction) -> int:
+    # `_placeBidChecks` requires `bid >= minBid` and `highestBid * 10500 / 10000 < bid`.
+    return max(
+        auction.min_bid,
+        auction.highest_bid * (BPS + MIN_INCREMENT_BPS) // BPS + 1,
+    )
+
+
+def get_deadline(auction: Auction, max_extension: int) -> int:
+    expiration = auction.expiration
+    with_margin = auction.last_bid_time + MIN_NO_ACTION_MARGIN
+    return max(min(with_margin, expiration + max_extension), expiration)
+
+
+class AuctionBook:
+    """In-memory view of the live auctions of a single liquidator.
+
+    Use `time_for_main_lender_to_buy` for an `AuctionWithBuyoutLoanLiquidator`
+    (0 for a plain `AuctionLoanLiquidator`).
+    """
+
+    def __init__(self, max_extension: int, time_for_main_lender_to_buy: int = 0):
+        self._max_extension = max_extension
+        self._time_for_main_lender_to_buy = time_for_main_lender_to_buy
+        self._quotes: dict[tuple[str, int], BidQuote] = {}
+
+    def __len__(self) -> int:
+        return len(self._quotes)
+
+    def __contains__(self, key: tuple[str, int]) -> bool:
+        return _key(*key) in self._quotes
+
+    def quote(self, collection: str, token_id: int) -> Optional[BidQuote]:
+        return self._quotes.get(_key(collection, token_id))
+
+    def get_auction(self, collection: str, token_id: int) -> Optional[Auction]:
+        quote = self.quote(collection, token_id)
+        return quote.auction if quote else None
+
+    def open_auctions(self, now: int) -> Iterator[tuple[tuple[str, int], BidQuote]]:
+        for key, quote in self._quotes.items():
+            if quote.is_open(now):
+                yield key, quote
+
+    def liquidation_started(self, collection: str, token_id: int, auction: Auction):
+        self._set(_key(collection, token_id), auction)
+
+    def bid_placed(
+        self, collection: str, token_id: int, bidder: str, bid: int, timestamp: int
+    ):
+        key = _key(collection, token_id)
+        quote = self._quotes.get(key)
+        if quote is None:
+            # Auction started before we began tracking.
+            return
+        self._set(
+            key,
+            quote.auction._replace(
+                highest_bidder=bidder, highest_bid=bid, last_bid_time=timestamp
+            ),
+        )
+
+    def settled(self, collection: str, token_id: int):
+        self._quotes.pop(_key(collection, token_id), None)
+
+    def set_time_for_main_lender_to_buy(self, time_for_main_lender_to_buy: int):
+        self._time_for_main_lender_to_buy = time_for_main_lender_to_buy
+        for key, quote in self._quotes.items():
+            self._set(key, quote.auction)
+
+    def apply_log(self, log: dict, timestamp: Optional[int] = None) -> bool:
+        """Apply a raw liquidator log. `timestamp` is the block timestamp, needed for bids."""
+        decoded = AUCTION_EVENTS.decode_log(log)
+        if decoded is None:
+            return False
+        event, values = decoded
+        if event is LoanLiquidationStarted:
+            collection, token_id, auction = values
+            self.liquidation_started(collection, token_id, Auction(*auction))
+        elif event is BidPlaced:
+            if timestamp is None:
+                raise ValueError("BidPlaced requires the block timestamp")
+            collection, token_id, bidder, bid, _, _ = values
+            self.bid_placed(collection, token_id, bidder, bid, timestamp)
+        elif event is AuctionSettled:
+            self.settled(values[2], values[3])
+        elif event is AuctionSettledWithBuyout:
+            self.settled(values[2], values[3])
+        elif event is TimeForMainLenderToBuyUpdated:
+            self.set_time_for_main_lender_to_buy(values[0])
+        return True
+
+    def _set(self, key: tuple[str, int], auction: Auction):
+        self._quotes[key] = BidQuote(
+            auction,
+            get_min_bid(auction),
+            auction.start_time + self._time_for_main_lender_to_buy,
+            get_deadline(auction, self._max_extension) if auction.highest_bid else None,
+        )
+
+
+def _key(collection: str, token_id: int) -> tuple[str, int]:
+    return collection.lower(), token_id
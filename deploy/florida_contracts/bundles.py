@@ -0,0 +1,258 @@
+from typing import Any, NamedTuple, Optional, Sequence
+
+from eth_abi import decode, encode
+
+from florida_contracts.events import (
+    LOAN_EXECUTION_DATA_TUPLE,
+    LOAN_REPAYMENT_DATA_TUPLE,
+    LOAN_TUPLE,
+)
+from florida_contracts.hashing import get_typed_data_hash, hash_execution_data
+from florida_contracts.interest import mul_div_up
+from florida_contracts.rpc import RpcClient, RpcError, get_selector, to_block_tag
+from florida_contracts.structs import (
+    ExecutionData,
+    Loan,
+    LoanExecutionData,
+    LoanRepaymentData,
+    SignableRepaymentData,
+)
+from florida_contracts.views import ViewAggregator, ViewCall, unwrap_results
+
+# Mirrors src/lib/callbacks/PurchaseBundler.sol
+PRECISION = 10000
+EMIT_LOAN = f"emitLoan({LOAN_EXECUTION_DATA_TUPLE})"
+REPAY_LOAN = f"repayLoan({LOAN_REPAYMENT_DATA_TUPLE})"
+BUY = "buy(bytes[])"
+SELL = "sell(bytes[])"
+EXECUTION_INFO_TUPLE = "((address,bytes,uint256),bool)"
+
+
+class Taxes(NamedTuple):
+    buy_tax: int
+    sell_tax: int
+
+
+class ProtocolFee(NamedTuple):
+    recipient: str
+    fraction: int
+
+
+class ExecutionInfo(NamedTuple):
+    # `IReservoir.ExecutionInfo` plus `contractMustBeOwner`.
+    module: str
+    data: bytes
+    value: int
+    contract_must_be_owner: bool = False
+
+    def to_callback_data(self) -> bytes:
+        return encode(
+            [EXECUTION_INFO_TUPLE],
+            [((self.module, self.data, self.value), self.contract_must_be_owner)],
+        )
+
+
+class BuyItem(NamedTuple):
+    # `callback_data` is replaced with the encoded `execution_info`.
+    execution_data: ExecutionData
+    borrower: str
+    execution_info: ExecutionInfo
+    borrower_offer_signature: bytes = b""
+
+    @property
+    def loan_execution_data(self) -> LoanExecutionData:
+        return LoanExecutionData(
+            self.execution_data._replace(
+                callback_data=self.execution_info.to_callback_data()
+            ),
+            self.borrower,
+            self.borrower_offer_signature,
+        )
+
+    @property
+    def principal_amount(self) -> int:
+        return sum(e.amount for e in self.execution_data.offer_execution)
+
+    @property
+    def fee(self) -> int:
+        # `totalFee` of `_processOffersFromExecutionData`, kept by the lenders.
+        return sum(
+            mul_div_up(e.offer.fee, e.amount, e.offer.principal_amount)
+            for e in self.execution_data.offer_execution
+        )
+
+
+class SellItem(NamedTuple):
+    loan_id: int
+    loan: Loan
+    execution_info: ExecutionInfo
+    borrower_signature: bytes = b""
+    should_delegate: bool = False
+
+    @property
+    def repayment_data(self) -> LoanRepaymentData:
+        return LoanRepaymentData(
+            SignableRepaymentData(
+                self.loan_id,
+                self.execution_info.to_callback_data(),
+                self.should_delegate,
+            ),
+            self.loan,
+            self.borrower_signature,
+        )
+
+
+class TaxPayment(NamedTuple):
+    # Pulled from the borrower: `amount` to `lender`, fee share to the protocol.
+    lender: str
+    amount: int
+    protocol_fee: int
+
+
+class BundleSimulation(NamedTuple):
+    success: bool
+    # `BNPLLoansStarted` / `SellAndRepayExecuted` loan ids.
+    loan_ids: tuple[int, ...]
+    # New loans returned by `buy`, empty for `sell`.
+    loans: tuple[Loan, ...]
+    gas: Optional[int]
+    error: Optional[Any]
+
+
+def get_tax_payments(
+    loan: Loan, tax: int, protocol_fee: ProtocolFee
+) -> list[TaxPayment]:
+    """Transfers made by `_handleTax`, one per tranche."""
+    if tax == 0:
+        return []
+    payments = []
+    for tranche in loan.tranche:
+        cost = mul_div_up(tranche.principal_amount, tax, PRECISION)
+        fee = mul_div_up(cost, protocol_fee.fraction, PRECISION)
+        payments.append(TaxPayment(tranche.lender, cost - fee, fee))
+    return payments
+
+
+def get_tax_cost(loan: Loan, tax: int) -> int:
+    return sum(
+        mul_div_up(tranche.principal_amount, tax, PRECISION) for tranche in loan.tranche
+    )
+
+
+def get_buy_signing_hash(item: BuyItem, domain_separator: bytes) -> bytes:
+    """What the borrower signs, `emitLoan` is called by the bundler on their behalf."""
+    return get_typed_data_hash(
+        domain_separator, hash_execution_data(item.loan_execution_data.execution_data)
+    )
+
+
+def encode_buy(items: Sequence[BuyItem]) -> list[bytes]:
+    return [
+        get_selector(EMIT_LOAN)
+        + encode([LOAN_EXECUTION_DATA_TUPLE], [item.loan_execution_data.to_abi()])
+        for item in items
+    ]
+
+
+def encode_sell(items: Sequence[SellItem]) -> list[bytes]:
+    return [
+        get_selector(REPAY_LOAN)
+        + encode([LOAN_REPAYMENT_DATA_TUPLE], [item.repayment_data.to_abi()])
+        for item in items
+    ]
+
+
+def get_buy_value(items: Sequence[BuyItem]) -> int:
+    """`msg.value` for `buy`: listing prices minus the unwrapped WETH the loans
+    provide (`principalAmount - fee` each). Anything left over is refunded."""
+    needed = sum(item.execution_info.value for item in items)
+    borrowed = sum(item.principal_amount - item.fee for item in items)
+    return max(needed - borrowed, 0)
+
+
+class BundleBuilder:
+    def __init__(self, rpc: RpcClient, bundler: str):
+        self._rpc = rpc
+        self.bundler = bundler
+        self.taxes = Taxes(0, 0)
+        self.protocol_fee = ProtocolFee("0x" + "00" * 20, 0)
+        self.block: Optional[int] = None
+
+    def load(self, aggregator: ViewAggregator, block: Optional[int] = None) -> int:
+        """Current taxes and protocol fee, pinning later simulations to `block`."""
+        self.block, results = aggregator.execute(
+            [
+                ViewCall(self.bundler, "getTaxes()", (), ("(uint128,uint128)",), Taxes),
+                ViewCall(
+                    self.bundler,
+                    "getProtocolFee()",
+                    (),
+                    ("(address,uint256)",),
+                    ProtocolFee,
+                ),
+            ],
+            block,
+        )
+        self.taxes, self.protocol_fee = unwrap_results(results)
+        return self.block
+
+    def get_buy_taxes(self, loan: Loan) -> list[TaxPayment]:
+        return get_tax_payments(loan, self.taxes.buy_tax, self.protocol_fee)
+
+    def get_sell_taxes(self, loan: Loan) -> list[TaxPayment]:
+        return get_tax_payments(loan, self.taxes.sell_tax, self.protocol_fee)
+
+    def simulate(
+        self,
+        sender: str,
+        buys: Sequence[tuple[Sequence[BuyItem], int]] = (),
+        sells: Sequence[Sequence[SellItem]] = (),
+    ) -> tuple[list[BundleSimulation], list[BundleSimulation]]:
+        """Simulate every candidate bundle (`buy` bundles with their `msg.value`)
+        with `eth_call` and `eth_estimateGas` at the loaded block. Everything is
+        sent as a single JSON-RPC batch, which the node executes concurrently."""
+        block = to_block_tag(self.block)
+        transactions = [
+            _get_transaction(sender, self.bundler, BUY, encode_buy(items), value)
+            for items, value in buys
+        ] + [
+            _get_transaction(sender, self.bundler, SELL, encode_sell(items), 0)
+            for items in sells
+        ]
+        requests = []
+        for transaction in transactions:
+            requests.append(("eth_call", [transaction, block]))
+            requests.append(("eth_estimateGas", [transaction, block]))
+        results = self._rpc.batch(requests, raise_errors=False)
+
+        simulations = []
+        for i, (output, gas) in enumerate(zip(results[::2], results[1::2])):
+            if isinstance(output, RpcError):
+                simulations.append(BundleSimulation(False, (), (), None, output))
+                continue
+            gas = None if isinstance(gas, RpcError) else int(gas, 16)
+            if i < len(buys):
+                loan_ids, loans = decode(
+                    ["uint256[]", f"{LOAN_TUPLE}[]"],
+                    bytes.fromhex(output.removeprefix("0x")),
+                )
+                loans = tuple(Loan.from_abi(loan) for loan in loans)
+            else:
+                loan_ids = [item.loan_id for item in sells[i - len(buys)]]
+                loans = ()
+            simulations.append(
+                BundleSimulation(True, tuple(loan_ids), loans, gas, None)
+            )
+        return simulations[: len(buys)], simulations[len(buys) :]
+
+
+def _get_transaction(
+    sender: str, bundler: str, signature: str, calls: list[bytes], value: int
+) -> dict:
+    data = get_selector(signature) + encode(["bytes[]"], [calls])
+    return {
+        "from": sender,
+        "to": bundler,
+        "data": "0x" + data.hex(),
+        "value": hex(value),
+    }
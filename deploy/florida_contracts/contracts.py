@@ -35,6 +35,12 @@ SingleSourceLoan = Contract("src/lib/loans/SingleSourceLoan.sol", "SingleSourceL
 VaultLoanValidator = Contract("src/lib/VaultLoanValidator.sol", "VaultLoanValidator")
 VaultFactory = Contract("src/lib/VaultFactory.sol", "VaultFactory")
 RangeValidator = Contract("src/lib/validators/RangeValidator.sol", "RangeValidator")
+NftBitVectorValidator = Contract(
+    "src/lib/validators/NftBitVectorValidator.sol", "NftBitVectorValidator"
+)
+NftPackedListValidator = Contract(
+    "src/lib/validators/NftPackedListValidator.sol", "NftPackedListValidator"
+)
 DelegateRegistry = Contract(
     "lib/delegate-registry/src/DelegateRegistry.sol", "DelegateRegistry"
 )
@@ -0,0 +1,160 @@
+from collections import defaultdict
+from typing import Iterable, NamedTuple, Optional, Sequence
+
+import numpy as np
+from eth_hash.auto import keccak
+
+from florida_contracts.events import AuctionSettled
+from florida_contracts.interest import PRECISION, SECONDS_PER_YEAR
+from florida_contracts.structs import Loan
+
+# Mirrors src/lib/LiquidationDistributor.sol
+TRANSFER_TOPIC = "0x" + keccak(b"Transfer(address,address,uint256)").hex()
+
+
+class Liquidation(NamedTuple):
+    loan_address: str
+    loan_id: int
+    loan: Loan
+    proceeds: int
+    transaction_hash: Optional[str] = None
+
+    @classmethod
+    def from_log(cls, log: dict, loan: Loan) -> "Liquidation":
+        """From an `AuctionSettled` log, `proceeds` is what reached `distribute`."""
+        values = AuctionSettled.decode(log["data"])
+        return cls(values[0], values[1], loan, values[5], log.get("transactionHash"))
+
+
+class Payout(NamedTuple):
+    loan_address: str
+    loan_id: int
+    tranche_index: int
+    lender: str
+    token: str
+    amount: int
+    # `_handleLoanManagerCall` calls `loanLiquidation` on registered loan managers,
+    # with `amount` as `_sent`, even when nothing is transferred.
+    is_loan_manager: bool
+    transaction_hash: Optional[str]
+
+
+class TokenTransfer(NamedTuple):
+    token: str
+    sender: str
+    recipient: str
+    amount: int
+    transaction_hash: Optional[str]
+
+    @classmethod
+    def from_log(cls, log: dict) -> Optional["TokenTransfer"]:
+        topics = log.get("topics") or []
+        if len(topics) != 3 or topics[0].lower() != TRANSFER_TOPIC:
+            return None
+        return cls(
+            log["address"].lower(),
+            "0x" + topics[1][-40:].lower(),
+            "0x" + topics[2][-40:].lower(),
+            int(log["data"], 16),
+            log.get("transactionHash"),
+        )
+
+
+class Mismatch(NamedTuple):
+    transaction_hash: Optional[str]
+    token: str
+    lender: str
+    expected: int
+    actual: int
+
+
+def get_payouts(
+    liquidations: Sequence[Liquidation], loan_managers: Iterable[str] = ()
+) -> list[Payout]:
+    """Expected `distribute` transfers for a batch of liquidations. All tranches
+    are laid out in flat arrays and every step runs over the whole batch at once.
+    Arrays hold python ints so the uint256 math stays exact."""
+    liquidations = [
+        liquidation for liquidation in liquidations if liquidation.loan.tranche
+    ]
+    if not liquidations:
+        return []
+    loan_managers = {lender.lower() for lender in loan_managers}
+    tranches = [t for liquidation in liquidations for t in liquidation.loan.tranche]
+    counts = np.array([len(liquidation.loan.tranche) for liquidation in liquidations])
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+    loan_index = np.repeat(np.arange(len(liquidations)), counts)
+
+    principal = _to_array(t.principal_amount for t in tranches)
+    accrued = _to_array(t.accrued_interest for t in tranches)
+    apr = _to_array(t.apr_bps for t in tranches)
+    start_time = _to_array(t.start_time for t in tranches)
+    end_time = _to_array(liquidation.loan.end_time for liquidation in liquidations)[
+        loan_index
+    ]
+    proceeds = _to_array(liquidation.proceeds for liquidation in liquidations)
+
+    # `getInterest` up to the loan end time, rounded up.
+    pending = -(
+        -(principal * apr * (end_time - start_time)) // (PRECISION * SECONDS_PER_YEAR)
+    )
+    owed = principal + accrued + pending
+    total_owed = (
+        _to_array(liquidation.loan.principal_amount for liquidation in liquidations)
+        + np.add.reduceat(accrued, starts)
+        + np.add.reduceat(pending, starts)
+    )
+
+    # `_handleTrancheExcess`: owed plus the pro-rata share of the excess.
+    excess = (proceeds - total_owed)[loan_index]
+    with_excess = owed + excess * owed // total_owed[loan_index]
+    # `_handleTrancheInsufficient`: tranches are paid in order until proceeds run out.
+    cumulative = np.cumsum(owed)
+    owed_before = cumulative - owed - (cumulative - owed)[starts][loan_index]
+    left = proceeds[loan_index] - owed_before
+    insufficient = np.where(left > owed, owed, np.where(left > 0, left, 0))
+    amounts = np.where((proceeds > total_owed)[loan_index], with_excess, insufficient)
+
+    payouts = []
+    for i, (tranche, amount) in enumerate(zip(tranches, amounts)):
+        liquidation = liquidations[loan_index[i]]
+        payouts.append(
+            Payout(
+                liquidation.loan_address,
+                liquidation.loan_id,
+                int(i - starts[loan_index[i]]),
+                tranche.lender,
+                liquidation.loan.principal_address,
+                int(amount),
+                tranche.lender.lower() in loan_managers,
+                liquidation.transaction_hash,
+            )
+        )
+    return payouts
+
+
+def reconcile(
+    payouts: Iterable[Payout], transfers: Iterable[TokenTransfer]
+) -> list[Mismatch]:
+    """Compare expected payouts with indexed transfers, summed per
+    (transaction, token, lender). Only transfers to expected lenders in the same
+    transaction are considered, so trigger fee transfers are ignored unless the
+    originator or settler is also a lender of that loan."""
+    expected: dict[tuple, int] = defaultdict(int)
+    for payout in payouts:
+        key = (payout.transaction_hash, payout.token.lower(), payout.lender.lower())
+        expected[key] += payout.amount
+    actual: dict[tuple, int] = defaultdict(int)
+    for transfer in transfers:
+        key = (transfer.transaction_hash, transfer.token, transfer.recipient)
+        if key in expected:
+            actual[key] += transfer.amount
+    return [
+        Mismatch(*key, amount, actual.get(key, 0))
+        for key, amount in expected.items()
+        if actual.get(key, 0) != amount
+    ]
+
+
+def _to_array(values: Iterable[int]) -> np.ndarray:
+    return np.fromiter(values, dtype=object)
@@ -0,0 +1,98 @@
+from functools import cached_property
+from typing import Any, Iterable, NamedTuple, Optional
+
+from eth_abi import decode
+from eth_hash.auto import keccak
+
+AUCTION_TUPLE = "(address,uint256,uint256,uint256,uint256,address,uint96,address,uint96,address,uint96)"
+TRANCHE_TUPLE = "(uint256,uint256,uint256,address,uint256,uint256,uint256)"
+LOAN_TUPLE = f"(address,uint256,address,address,uint256,uint256,uint256,{TRANCHE_TUPLE}[],uint256)"
+LOAN_OFFER_TUPLE = "(uint256,address,uint256,uint256,address,uint256,address,uint256,uint256,uint256,uint256,uint256,(address,bytes)[])"
+EXECUTION_DATA_TUPLE = (
+    f"(({LOAN_OFFER_TUPLE},uint256,bytes)[],uint256,uint256,uint256,address,bytes)"
+)
+LOAN_EXECUTION_DATA_TUPLE = f"({EXECUTION_DATA_TUPLE},address,bytes)"
+LOAN_REPAYMENT_DATA_TUPLE = f"((uint256,bytes,bool),{LOAN_TUPLE},bytes)"
+RENEGOTIATION_OFFER_TUPLE = (
+    "(uint256,uint256,address,uint256,uint256[],uint256,uint256,uint256,uint256)"
+)
+
+
+class Event(NamedTuple):
+    # Protocol events don't use indexed parameters, everything lives in `data`.
+    name: str
+    types: tuple[str, ...]
+
+    @property
+    def signature(self) -> str:
+        return f"{self.name}({','.join(self.types)})"
+
+    @property
+    def topic(self) -> str:
+        return "0x" + keccak(self.signature.encode()).hex()
+
+    def decode(self, data: str | bytes) -> tuple[Any, ...]:
+        if isinstance(data, str):
+            data = bytes.fromhex(data.removeprefix("0x"))
+        return decode(list(self.types), data)
+
+
+class EventRegistry:
+    def __init__(self, events: Iterable[Event]):
+        self._by_topic = {event.topic: event for event in events}
+
+    @cached_property
+    def topics(self) -> list[str]:
+        return list(self._by_topic)
+
+    def decode_log(self, log: dict) -> Optional[tuple[Event, tuple[Any, ...]]]:
+        topics = log.get("topics") or []
+        if not topics:
+            return None
+        event = self._by_topic.get(topics[0].lower())
+        if event is None:
+            return None
+        return event, event.decode(log["data"])
+
+
+LoanLiquidationStarted = Event(
+    "LoanLiquidationStarted", ("address", "uint256", AUCTION_TUPLE)
+)
+BidPlaced = Event(
+    "BidPlaced", ("address", "uint256", "address", "uint256", "address", "uint256")
+)
+AuctionSettled = Event(
+    "AuctionSettled",
+    (
+        "address",
+        "uint256",
+        "address",
+        "uint256",
+        "address",
+        "uint256",
+        "address",
+        "uint256",
+    ),
+)
+AuctionSettledWithBuyout = Event(
+    "AuctionSettledWithBuyout", ("address", "uint256", "address", "uint256", "uint256")
+)
+
+LoanEmitted = Event("LoanEmitted", ("uint256", "uint256[]", LOAN_TUPLE, "uint256"))
+LoanRefinanced = Event(
+    "LoanRefinanced", ("uint256", "uint256", "uint256", LOAN_TUPLE, "uint256")
+)
+LoanRefinancedFromNewOffers = Event(
+    "LoanRefinancedFromNewOffers",
+    ("uint256", "uint256", LOAN_TUPLE, "uint256[]", "uint256"),
+)
+LoanRepaid = Event("LoanRepaid", ("uint256", "uint256", "uint256"))
+LoanLiquidated = Event("LoanLiquidated", ("uint256",))
+LoanForeclosed = Event("LoanForeclosed", ("uint256",))
+LoanSentToLiquidator = Event("LoanSentToLiquidator", ("uint256", "address"))
+MinLockPeriodUpdated = Event("MinLockPeriodUpdated", ("uint256",))
+MinAprImprovementUpdated = Event("MinAprImprovementUpdated", ("uint256",))
+OfferCancelled = Event("OfferCancelled", ("address", "uint256"))
+AllOffersCancelled = Event("AllOffersCancelled", ("address", "uint256"))
+
+DataUpdated = Event("DataUpdated", ("address", "uint64", "bytes4", "uint128"))
@@ -0,0 +1,190 @@
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+import time
+from typing import Iterable, NamedTuple, Optional, Sequence
+
+GAS_TEST_PATH = "test/MultiSourceGas.t.sol"
+HISTORY_FILENAME = "gas_history.jsonl"
+# Emitted by `_logGas` in test/MultiSourceGas.t.sol.
+GAS_REPORT_PATTERN = re.compile(r"GAS_REPORT (\w+) (\d+) (\d+)")
+
+
+class GasSample(NamedTuple):
+    operation: str
+    tranches: int
+    gas: int
+
+
+class GasRun(NamedTuple):
+    commit: str
+    timestamp: int
+    samples: tuple[GasSample, ...]
+
+    def to_json(self) -> str:
+        return json.dumps(
+            {
+                "commit": self.commit,
+                "timestamp": self.timestamp,
+                "samples": [sample._asdict() for sample in self.samples],
+            }
+        )
+
+    @classmethod
+    def from_json(cls, line: str) -> "GasRun":
+        values = json.loads(line)
+        return cls(
+            values["commit"],
+            values["timestamp"],
+            tuple(GasSample(**sample) for sample in values["samples"]),
+        )
+
+
+class Regression(NamedTuple):
+    operation: str
+    tranches: int
+    baseline: int
+    current: int
+
+    @property
+    def change_bps(self) -> int:
+        return (self.current - self.baseline) * 10000 // self.baseline
+
+
+def parse_gas_report(output: str) -> list[GasSample]:
+    """Samples in `forge test -vv` output. If an operation is measured more than
+    once for the same tranche count, the last measurement wins."""
+    samples = {}
+    for operation, tranches, gas in GAS_REPORT_PATTERN.findall(output):
+        samples[(operation, int(tranches))] = int(gas)
+    return [GasSample(*key, gas) for key, gas in sorted(samples.items())]
+
+
+def run_gas_tests(root: str = ".", match_test: Optional[str] = None) -> str:
+    cmd = ["forge", "test", "--match-path", GAS_TEST_PATH, "-vv"]
+    if match_test:
+        cmd += ["--match-test", match_test]
+    output = subprocess.run(cmd, cwd=root, stdout=subprocess.PIPE, text=True)
+    if output.returncode != 0:
+        raise RuntimeError(f"Gas tests failed\n{output.stdout}")
+    return output.stdout
+
+
+def get_commit(root: str = ".") -> str:
+    output = subprocess.run(
+        ["git", "rev-parse", "HEAD"], cwd=root, stdout=subprocess.PIPE, text=True
+    )
+    if output.returncode != 0:
+        raise RuntimeError("Could not get current commit")
+    return output.stdout.strip()
+
+
+def load_history(path: str) -> list[GasRun]:
+    if not os.path.exists(path):
+        return []
+    with open(path) as f:
+        return [GasRun.from_json(line) for line in f if line.strip()]
+
+
+def append_history(path: str, run: GasRun):
+    with open(path, "a") as f:
+        f.write(run.to_json() + "\n")
+
+
+def get_baseline(
+    history: Sequence[GasRun], commit: Optional[str] = None, exclude: str = ""
+) -> Optional[GasRun]:
+    """Latest run for `commit`, or the latest run of any other commit than
+    `exclude` when `commit` isn't given."""
+    for run in reversed(history):
+        if commit is not None and run.commit.startswith(commit):
+            return run
+        if commit is None and run.commit != exclude:
+            return run
+    return None
+
+
+def find_regressions(
+    baseline: Iterable[GasSample], current: Iterable[GasSample], threshold_bps: int
+) -> list[Regression]:
+    """(operation, tranches) pairs whose gas grew by more than `threshold_bps`.
+    Pairs only present in one of the runs are ignored."""
+    previous = {(s.operation, s.tranches): s.gas for s in baseline}
+    regressions = []
+    for sample in current:
+        gas = previous.get((sample.operation, sample.tranches))
+        if not gas:
+            continue
+        regression = Regression(sample.operation, sample.tranches, gas, sample.gas)
+        if regression.change_bps > threshold_bps:
+            regressions.append(regression)
+    return regressions
+
+
+def format_table(run: GasRun, baseline: Optional[GasRun] = None) -> str:
+    previous = (
+        {(s.operation, s.tranches): s.gas for s in baseline.samples} if baseline else {}
+    )
+    lines = [f"{'operation':<18}{'tranches':>10}{'gas':>12}{'delta':>10}"]
+    for sample in run.samples:
+        gas = previous.get((sample.operation, sample.tranches))
+        delta = f"{(sample.gas - gas) * 100 / gas:+.2f}%" if gas else "-"
+        lines.append(
+            f"{sample.operation:<18}{sample.tranches:>10}{sample.gas:>12}{delta:>10}"
+        )
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description=(
+            "Gas per operation and tranche count from test/MultiSourceGas.t.sol, "
+            "stored per commit."
+        )
+    )
+    parser.add_argument(
+        "--root", default="..", help="Repository root where forge is run."
+    )
+    parser.add_argument("--history", default=HISTORY_FILENAME)
+    parser.add_argument(
+        "--baseline",
+        default=None,
+        help="Commit to compare against. Defaults to the previous recorded commit.",
+    )
+    parser.add_argument(
+        "--threshold-bps",
+        type=int,
+        default=50,
+        help="Fail when any operation uses this much more gas than the baseline.",
+    )
+    parser.add_argument("--match-test", default=None)
+    parser.add_argument(
+        "--no-save", action="store_true", help="Compare without recording the run."
+    )
+    args = parser.parse_args()
+
+    commit = get_commit(args.root)
+    samples = parse_gas_report(run_gas_tests(args.root, args.match_test))
+    if not samples:
+        raise RuntimeError("No GAS_REPORT lines found in forge output")
+    run = GasRun(commit, int(time.time()), tuple(samples))
+    history = load_history(args.history)
+    baseline = get_baseline(history, args.baseline, exclude=commit)
+    if not args.no_save:
+        append_history(args.history, run)
+
+    print(format_table(run, baseline))
+    if baseline is None:
+        print("No baseline found, nothing to compare.")
+        sys.exit(0)
+    regressions = find_regressions(baseline.samples, run.samples, args.threshold_bps)
+    for regression in regressions:
+        print(
+            f"Regression: {regression.operation} with {regression.tranches} tranches "
+            f"{regression.baseline} -> {regression.current} "
+            f"(+{regression.change_bps / 100:.2f}%)"
+        )
+    sys.exit(1 if regressions else 0)
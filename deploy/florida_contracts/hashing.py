@@ -0,0 +1,165 @@
+from eth_abi import encode
+from eth_hash.auto import keccak
+
+from florida_contracts.structs import (
+    Auction,
+    ExecutionData,
+    Loan,
+    LoanOffer,
+    OfferExecution,
+    OfferValidator,
+    Tranche,
+)
+
+# Type hashes copied from src/lib/utils/Hash.sol. Some of them don't match the
+# keccak of the type string in the comments, the constants are what's used on chain.
+VALIDATOR_HASH = bytes.fromhex(
+    "4def3e04bd42194484d5f8a5b268ec0df03b9d9d0402606fe3100023c5d79ac4"
+)
+LOAN_OFFER_HASH = bytes.fromhex(
+    "a87df46e2d2684eb0bbc7abfb05483167cdccac6d7302078a9eaad540c119958"
+)
+OFFER_EXECUTION_HASH = bytes.fromhex(
+    "00c14ad24a24ef957b8af9ebdfbc5d353bba0d3b20bbd97fb243c9f5fb361282"
+)
+EXECUTION_DATA_HASH = bytes.fromhex(
+    "a5cb06a0c5f03000a6afa6b0d5080d0f863338257beb253058bc2c184ad7d4e1"
+)
+MULTI_SOURCE_LOAN_HASH = bytes.fromhex(
+    "47dba7e6940f0063b21c2ef8f7b0beaf1a2f4c2f84144c36b274ceec12e99b57"
+)
+TRANCHE_HASH = bytes.fromhex(
+    "6ac594952a72f2e6b24efaf9744b05c23b1b92ce25aa97d18a4338f484c41b95"
+)
+AUCTION_HASH = bytes.fromhex(
+    "091bb2c766793330514b24dc458b085f596716d69fcb631d53788558ff148646"
+)
+EIP712_DOMAIN_HASH = keccak(
+    b"EIP712Domain(string name,string version,uint256 chainId,address verifyingContract)"
+)
+
+MULTI_SOURCE_LOAN_NAME = "GONDI_MULTI_SOURCE_LOAN"
+MULTI_SOURCE_LOAN_VERSION = "3"
+
+
+def get_domain_separator(
+    verifying_contract: str,
+    chain_id: int,
+    name: str = MULTI_SOURCE_LOAN_NAME,
+    version: str = MULTI_SOURCE_LOAN_VERSION,
+) -> bytes:
+    return keccak(
+        encode(
+            ["bytes32", "bytes32", "bytes32", "uint256", "address"],
+            [
+                EIP712_DOMAIN_HASH,
+                keccak(name.encode()),
+                keccak(version.encode()),
+                chain_id,
+                verifying_contract,
+            ],
+        )
+    )
+
+
+def get_typed_data_hash(domain_separator: bytes, struct_hash: bytes) -> bytes:
+    return keccak(b"\x19\x01" + domain_separator + struct_hash)
+
+
+def hash_validator(validator: OfferValidator) -> bytes:
+    return keccak(
+        encode(
+            ["bytes32", "address", "bytes32"],
+            [VALIDATOR_HASH, validator.validator, keccak(validator.arguments)],
+        )
+    )
+
+
+def hash_loan_offer(offer: LoanOffer) -> bytes:
+    encoded_validators = b"".join(hash_validator(v) for v in offer.validators)
+    return keccak(
+        encode(
+            ["bytes32", "uint256", "address", "uint256", "uint256", "address"]
+            + ["uint256", "address", "uint256", "uint256", "uint256", "uint256"]
+            + ["uint256", "bytes32"],
+            [LOAN_OFFER_HASH, *offer[:12], keccak(encoded_validators)],
+        )
+    )
+
+
+def hash_offer_execution(offer_execution: OfferExecution) -> bytes:
+    return keccak(
+        encode(
+            ["bytes32", "bytes32", "uint256", "bytes32"],
+            [
+                OFFER_EXECUTION_HASH,
+                hash_loan_offer(offer_execution.offer),
+                offer_execution.amount,
+                keccak(offer_execution.lender_offer_signature),
+            ],
+        )
+    )
+
+
+def hash_execution_data(execution_data: ExecutionData) -> bytes:
+    encoded_offer_execution = b"".join(
+        hash_offer_execution(e) for e in execution_data.offer_execution
+    )
+    return keccak(
+        encode(
+            [
+                "bytes32",
+                "bytes32",
+                "uint256",
+                "uint256",
+                "uint256",
+                "address",
+                "bytes32",
+            ],
+            [
+                EXECUTION_DATA_HASH,
+                keccak(encoded_offer_execution),
+                execution_data.token_id,
+                execution_data.duration,
+                execution_data.expiration_time,
+                execution_data.principal_receiver,
+                keccak(execution_data.callback_data),
+            ],
+        )
+    )
+
+
+def hash_tranche(tranche: Tranche) -> bytes:
+    return keccak(
+        encode(
+            ["bytes32", "uint256", "uint256", "uint256", "address"]
+            + ["uint256", "uint256", "uint256"],
+            [TRANCHE_HASH, *tranche],
+        )
+    )
+
+
+def hash_loan(loan: Loan) -> bytes:
+    tranche_hashes = b"".join(hash_tranche(t) for t in loan.tranche)
+    return keccak(
+        encode(
+            ["bytes32", "address", "uint256", "address", "address", "uint256"]
+            + ["uint256", "uint256", "bytes32", "uint256"],
+            [
+                MULTI_SOURCE_LOAN_HASH,
+                *loan[:7],
+                keccak(tranche_hashes),
+                loan.protocol_fee,
+            ],
+        )
+    )
+
+
+def hash_auction(auction: Auction) -> bytes:
+    return keccak(
+        encode(
+            ["bytes32", "address", "uint256", "uint256", "uint256", "uint256"]
+            + ["address", "uint96", "address", "uint96", "address", "uint96"],
+            [AUCTION_HASH, *auction],
+        )
+    )
@@ -0,0 +1,28 @@
+from florida_contracts.structs import Loan
+
+# Mirrors src/lib/utils/Interest.sol and solmate's FixedPointMathLib.
+PRECISION = 10000
+SECONDS_PER_YEAR = 31536000
+
+
+def mul_div_down(x: int, y: int, denominator: int) -> int:
+    return x * y // denominator
+
+
+def mul_div_up(x: int, y: int, denominator: int) -> int:
+    return -(-x * y // denominator)
+
+
+def get_interest(amount: int, apr_bps: int, duration: int) -> int:
+    return mul_div_up(amount, apr_bps * duration, PRECISION * SECONDS_PER_YEAR)
+
+
+def get_total_owed(loan: Loan, timestamp: int) -> int:
+    return sum(
+        tranche.principal_amount
+        + tranche.accrued_interest
+        + get_interest(
+            tranche.principal_amount, tranche.apr_bps, timestamp - tranche.start_time
+        )
+        for tranche in loan.tranche
+    )
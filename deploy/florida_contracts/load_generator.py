@@ -0,0 +1,521 @@
+import argparse
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Mapping, NamedTuple, Optional, Sequence
+
+import numpy as np
+from eth_abi import encode
+from eth_hash.auto import keccak
+from eth_keys import keys
+
+from florida_contracts.events import (
+    LOAN_EXECUTION_DATA_TUPLE,
+    LOAN_REPAYMENT_DATA_TUPLE,
+    LOAN_TUPLE,
+    RENEGOTIATION_OFFER_TUPLE,
+    EventRegistry,
+    LoanEmitted,
+    LoanRefinanced,
+)
+from florida_contracts.hashing import get_typed_data_hash, hash_loan_offer
+from florida_contracts.rpc import RpcClient, RpcError, encode_call, get_selector
+from florida_contracts.structs import (
+    ExecutionData,
+    Loan,
+    LoanExecutionData,
+    LoanOffer,
+    LoanRepaymentData,
+    OfferExecution,
+    OfferValidator,
+    RenegotiationOffer,
+    SignableRepaymentData,
+)
+from florida_contracts.utils import LOCAL, get_deployed_addresses
+
+EMIT_LOAN = "emitLoan"
+REPAY_LOAN = "repayLoan"
+REFINANCE_FULL = "refinanceFull"
+OPERATIONS = (EMIT_LOAN, REPAY_LOAN, REFINANCE_FULL)
+
+ZERO_ADDRESS = "0x" + "00" * 20
+MAX_UINT256 = 2**256 - 1
+# Explicit limit so reverting transactions are mined instead of failing estimation.
+TRANSACTION_GAS = 3_000_000
+LOAN_EVENTS = EventRegistry([LoanEmitted, LoanRefinanced])
+
+
+class Account(NamedTuple):
+    address: str
+    private_key: str
+
+
+class LoadConfig(NamedTuple):
+    operations: int = 1000
+    concurrency: int = 16
+    # Relative weight of each operation in the mix.
+    mix: Mapping[str, float] = {EMIT_LOAN: 0.5, REPAY_LOAN: 0.3, REFINANCE_FULL: 0.2}
+    borrowers: int = 50
+    lenders: int = 20
+    nfts_per_borrower: int = 5
+    principal_amount: int = 10**18
+    apr_bps: int = 1000
+    duration: int = 30 * 24 * 3600
+    # Collateral ids are minted from here so they don't collide with existing ones.
+    first_token_id: int = 10**12
+    seed: int = 0
+
+
+class OperationResult(NamedTuple):
+    operation: str
+    # "success", "reverted", "error" or "skipped" (nothing to act on).
+    status: str
+    latency: float
+    gas_used: int
+
+
+class OperationStats(NamedTuple):
+    operation: str
+    sent: int
+    succeeded: int
+    reverted: int
+    errors: int
+    skipped: int
+    latency_p50: float
+    latency_p90: float
+    latency_p99: float
+    mean_gas: float
+
+    @property
+    def revert_rate(self) -> float:
+        return self.reverted / self.sent if self.sent else 0.0
+
+
+class LoadReport(NamedTuple):
+    duration: float
+    stats: tuple[OperationStats, ...]
+
+    @property
+    def throughput(self) -> float:
+        return sum(s.succeeded for s in self.stats) / self.duration
+
+
+def derive_accounts(seed: int, label: str, count: int) -> list[Account]:
+    """Deterministic accounts, the same `seed` reuses the funded ones."""
+    private_keys = [keccak(f"{label}:{seed}:{i}".encode()) for i in range(count)]
+    return [
+        Account(
+            keys.PrivateKey(key).public_key.to_address(),
+            "0x" + key.hex(),
+        )
+        for key in private_keys
+    ]
+
+
+def sign_hash(private_key: str, digest: bytes) -> bytes:
+    signature = (
+        keys.PrivateKey(bytes.fromhex(private_key.removeprefix("0x")))
+        .sign_msg_hash(digest)
+        .to_bytes()
+    )
+    # eth-keys returns v as 0 / 1, ECDSA.recover expects 27 / 28.
+    return signature[:64] + bytes([signature[64] + 27])
+
+
+def get_operation_plan(config: LoadConfig) -> list[str]:
+    operations = [op for op in OPERATIONS if config.mix.get(op)]
+    return random.Random(config.seed).choices(
+        operations, [config.mix[op] for op in operations], k=config.operations
+    )
+
+
+def summarize(results: Sequence[OperationResult], duration: float) -> LoadReport:
+    stats = []
+    for operation in OPERATIONS:
+        operation_results = [r for r in results if r.operation == operation]
+        if not operation_results:
+            continue
+        sent = [r for r in operation_results if r.status != "skipped"]
+        latencies = np.array([r.latency for r in sent]) if sent else np.zeros(1)
+        succeeded = [r for r in sent if r.status == "success"]
+        p50, p90, p99 = np.percentile(latencies, [50, 90, 99])
+        stats.append(
+            OperationStats(
+                operation,
+                len(sent),
+                len(succeeded),
+                sum(r.status == "reverted" for r in sent),
+                sum(r.status == "error" for r in sent),
+                len(operation_results) - len(sent),
+                float(p50),
+                float(p90),
+                float(p99),
+                float(np.mean([r.gas_used for r in succeeded])) if succeeded else 0.0,
+            )
+        )
+    return LoadReport(duration, tuple(stats))
+
+
+def format_report(report: LoadReport) -> str:
+    lines = [
+        f"{'operation':<15}{'sent':>7}{'ok':>7}{'revert':>8}{'error':>7}{'skip':>6}"
+        f"{'p50 ms':>9}{'p90 ms':>9}{'p99 ms':>9}{'gas':>10}"
+    ]
+    for s in report.stats:
+        lines.append(
+            f"{s.operation:<15}{s.sent:>7}{s.succeeded:>7}{s.reverted:>8}{s.errors:>7}"
+            f"{s.skipped:>6}{s.latency_p50 * 1000:>9.1f}{s.latency_p90 * 1000:>9.1f}"
+            f"{s.latency_p99 * 1000:>9.1f}{s.mean_gas:>10.0f}"
+        )
+    lines.append(
+        f"{report.duration:.1f}s, {report.throughput:.1f} successful operations/s"
+    )
+    return "\n".join(lines)
+
+
+class LoadGenerator:
+    """Drives `MultiSourceLoan` on Anvil. Accounts are funded with `anvil_setBalance`
+    and the sample token/collection `mint`, and send through impersonation, so only
+    lender offers need real signatures. Those are all signed before the run starts.
+
+    Every `emitLoan` consumes a single use offer, `repayLoan` and lender initiated
+    `refinanceFull` act on a random active loan. Operations with nothing to act on
+    (no free collateral or no active loan) are reported as skipped."""
+
+    def __init__(
+        self,
+        rpc_url: str,
+        addresses: Mapping[str, str],
+        config: LoadConfig = LoadConfig(),
+    ):
+        self.config = config
+        self._rpc_url = rpc_url
+        self._rpc = RpcClient(rpc_url)
+        self.loan_contract = addresses["MultiSourceLoan"].lower()
+        self.currency = addresses["ERC20"].lower()
+        self.collection = addresses["ERC721"].lower()
+        self._random = random.Random(config.seed)
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.borrowers: list[Account] = []
+        self.lenders: list[Account] = []
+        self._offers: deque[tuple[LoanOffer, bytes]] = deque()
+        self._free_collateral: deque[tuple[str, int]] = deque()
+        self._active_loans: dict[int, Loan] = {}
+        self._renegotiation_ids = 0
+
+    def setup(self, plan: Sequence[str]):
+        config = self.config
+        self.borrowers = derive_accounts(config.seed, "borrower", config.borrowers)
+        self.lenders = derive_accounts(config.seed, "lender", config.lenders)
+        accounts = self.borrowers + self.lenders
+        self._rpc.batch(
+            [("anvil_setBalance", [a.address, hex(10**21)]) for a in accounts]
+            + [("anvil_impersonateAccount", [a.address]) for a in accounts]
+        )
+
+        # Enough for every planned operation to hit the same account.
+        funding = config.principal_amount * (config.operations + 1) * 2
+        transactions = []
+        for account in accounts:
+            transactions += [
+                (
+                    account.address,
+                    self.currency,
+                    encode_call(
+                        "mint(address,uint256)",
+                        ("address", "uint256"),
+                        (account.address, funding),
+                    ),
+                ),
+                (
+                    account.address,
+                    self.currency,
+                    encode_call(
+                        "approve(address,uint256)",
+                        ("address", "uint256"),
+                        (self.loan_contract, MAX_UINT256),
+                    ),
+                ),
+            ]
+        for i, borrower in enumerate(self.borrowers):
+            for j in range(config.nfts_per_borrower):
+                token_id = config.first_token_id + i * config.nfts_per_borrower + j
+                transactions.append(
+                    (
+                        borrower.address,
+                        self.collection,
+                        encode_call(
+                            "mint(address,uint256)",
+                            ("address", "uint256"),
+                            (borrower.address, token_id),
+                        ),
+                    )
+                )
+                self._free_collateral.append((borrower.address, token_id))
+            transactions.append(
+                (
+                    borrower.address,
+                    self.collection,
+                    encode_call(
+                        "setApprovalForAll(address,bool)",
+                        ("address", "bool"),
+                        (self.loan_contract, True),
+                    ),
+                )
+            )
+        hashes = self._rpc.batch(
+            [("eth_sendTransaction", [_get_transaction(*t)]) for t in transactions]
+        )
+        receipts = self._wait_for_receipts(self._rpc, hashes)
+        failed = [r["transactionHash"] for r in receipts if int(r["status"], 16) != 1]
+        if failed:
+            raise RuntimeError(f"Setup transactions reverted: {failed}")
+        self._random.shuffle(self._free_collateral)
+        self._presign_offers(sum(op == EMIT_LOAN for op in plan))
+
+    def run(self, plan: Optional[Sequence[str]] = None) -> LoadReport:
+        plan = plan if plan is not None else get_operation_plan(self.config)
+        if not self.lenders:
+            self.setup(plan)
+        start = time.monotonic()
+        with ThreadPoolExecutor(max_workers=self.config.concurrency) as executor:
+            results = list(executor.map(self._execute, plan))
+        return summarize(results, time.monotonic() - start)
+
+    def _presign_offers(self, count: int):
+        chain_id = int(self._rpc.call("eth_chainId", []), 16)
+        block = self._rpc.call("eth_getBlockByNumber", ["latest", False])
+        expiration = int(block["timestamp"], 16) + 7 * 24 * 3600
+        domain_separator = bytes.fromhex(
+            self._rpc.eth_call(
+                self.loan_contract, "0x" + get_selector("DOMAIN_SEPARATOR()").hex()
+            ).removeprefix("0x")
+        )
+        # Offer ids only need to be unique per lender and above `minOfferId`.
+        first_offer_id = int(time.time() * 1000) << 20
+        offers = [
+            LoanOffer(
+                first_offer_id + i,
+                self.lenders[i % len(self.lenders)].address,
+                0,
+                0,
+                self.collection,
+                0,
+                self.currency,
+                self.config.principal_amount,
+                self.config.apr_bps,
+                expiration,
+                self.config.duration,
+                0,
+                # A single zero validator accepts any token of the collection.
+                (OfferValidator(ZERO_ADDRESS, b""),),
+            )
+            for i in range(count)
+        ]
+        private_keys = {lender.address: lender.private_key for lender in self.lenders}
+        for offer in offers:
+            digest = get_typed_data_hash(domain_separator, hash_loan_offer(offer))
+            self._offers.append((offer, sign_hash(private_keys[offer.lender], digest)))
+
+    def _execute(self, operation: str) -> OperationResult:
+        if operation == EMIT_LOAN:
+            return self._emit_loan()
+        if operation == REPAY_LOAN:
+            return self._repay_loan()
+        return self._refinance_full()
+
+    def _emit_loan(self) -> OperationResult:
+        with self._lock:
+            if not self._free_collateral or not self._offers:
+                return OperationResult(EMIT_LOAN, "skipped", 0.0, 0)
+            borrower, token_id = self._free_collateral.popleft()
+            offer, signature = self._offers.popleft()
+        execution_data = ExecutionData(
+            (OfferExecution(offer, offer.principal_amount, signature),),
+            token_id,
+            offer.duration,
+            offer.expiration_time,
+            borrower,
+        )
+        data = get_selector(f"emitLoan({LOAN_EXECUTION_DATA_TUPLE})") + encode(
+            [LOAN_EXECUTION_DATA_TUPLE],
+            [LoanExecutionData(execution_data, borrower).to_abi()],
+        )
+        result, receipt = self._send(EMIT_LOAN, borrower, data)
+        with self._lock:
+            loan = _get_loan(receipt) if result.status == "success" else None
+            if loan is not None:
+                self._active_loans[loan[0]] = loan[1]
+            else:
+                self._free_collateral.append((borrower, token_id))
+        return result
+
+    def _repay_loan(self) -> OperationResult:
+        with self._lock:
+            if not self._active_loans:
+                return OperationResult(REPAY_LOAN, "skipped", 0.0, 0)
+            loan_id = self._random.choice(list(self._active_loans))
+            loan = self._active_loans.pop(loan_id)
+        data = get_selector(f"repayLoan({LOAN_REPAYMENT_DATA_TUPLE})") + encode(
+            [LOAN_REPAYMENT_DATA_TUPLE],
+            [LoanRepaymentData(SignableRepaymentData(loan_id), loan).to_abi()],
+        )
+        result, _ = self._send(REPAY_LOAN, loan.borrower, data)
+        with self._lock:
+            if result.status == "success":
+                self._free_collateral.append(
+                    (loan.borrower.lower(), loan.nft_collateral_token_id)
+                )
+            else:
+                self._active_loans[loan_id] = loan
+        return result
+
+    def _refinance_full(self) -> OperationResult:
+        with self._lock:
+            if not self._active_loans:
+                return OperationResult(REFINANCE_FULL, "skipped", 0.0, 0)
+            loan_id = self._random.choice(list(self._active_loans))
+            current = {
+                tranche.lender.lower()
+                for tranche in self._active_loans[loan_id].tranche
+            }
+            candidates = [
+                account for account in self.lenders if account.address not in current
+            ]
+            if not candidates:
+                return OperationResult(REFINANCE_FULL, "skipped", 0.0, 0)
+            loan = self._active_loans.pop(loan_id)
+            lender = self._random.choice(candidates)
+            self._renegotiation_ids += 1
+            renegotiation_id = self._renegotiation_ids
+        # Same principal and end time, better apr: the strictly better case. The
+        # transaction lands in a block no earlier than `now`, so the new end time
+        # is never earlier than the loan's.
+        block = self._get_rpc().call("eth_getBlockByNumber", ["latest", False])
+        now = int(block["timestamp"], 16)
+        apr_bps = min(tranche.apr_bps for tranche in loan.tranche) * 2 // 3
+        offer = RenegotiationOffer(
+            renegotiation_id,
+            loan_id,
+            lender.address,
+            0,
+            tuple(range(len(loan.tranche))),
+            loan.principal_amount,
+            apr_bps,
+            loan.end_time,
+            max(loan.end_time - now, 0),
+        )
+        data = get_selector(
+            f"refinanceFull({RENEGOTIATION_OFFER_TUPLE},{LOAN_TUPLE},bytes)"
+        ) + encode(
+            [RENEGOTIATION_OFFER_TUPLE, LOAN_TUPLE, "bytes"],
+            [tuple(offer), loan.to_abi(), b""],
+        )
+        result, receipt = self._send(REFINANCE_FULL, lender.address, data)
+        with self._lock:
+            refinanced = _get_loan(receipt) if result.status == "success" else None
+            if refinanced is not None:
+                self._active_loans[refinanced[0]] = refinanced[1]
+            else:
+                self._active_loans[loan_id] = loan
+        return result
+
+    def _send(
+        self, operation: str, sender: str, data: bytes
+    ) -> tuple[OperationResult, Optional[dict]]:
+        rpc = self._get_rpc()
+        start = time.monotonic()
+        try:
+            transaction_hash = rpc.call(
+                "eth_sendTransaction",
+                [_get_transaction(sender, self.loan_contract, "0x" + data.hex())],
+            )
+            receipt = self._wait_for_receipts(rpc, [transaction_hash])[0]
+        except (RpcError, RuntimeError, OSError):
+            return (
+                OperationResult(operation, "error", time.monotonic() - start, 0),
+                None,
+            )
+        latency = time.monotonic() - start
+        status = "success" if int(receipt["status"], 16) == 1 else "reverted"
+        return (
+            OperationResult(operation, status, latency, int(receipt["gasUsed"], 16)),
+            receipt,
+        )
+
+    def _get_rpc(self) -> RpcClient:
+        # One client per worker thread.
+        if not hasattr(self._local, "rpc"):
+            self._local.rpc = RpcClient(self._rpc_url)
+        return self._local.rpc
+
+    @staticmethod
+    def _wait_for_receipts(
+        rpc: RpcClient, transactions: Sequence[str], timeout: float = 120
+    ) -> list[dict]:
+        deadline = time.monotonic() + timeout
+        receipts: dict[str, dict] = {}
+        while True:
+            pending = [tx for tx in transactions if tx not in receipts]
+            results = rpc.batch([("eth_getTransactionReceipt", [tx]) for tx in pending])
+            receipts.update(
+                (tx, receipt) for tx, receipt in zip(pending, results) if receipt
+            )
+            if len(receipts) == len(transactions):
+                return [receipts[tx] for tx in transactions]
+            if time.monotonic() > deadline:
+                raise RuntimeError(f"Timed out waiting for {len(pending)} receipts")
+            time.sleep(0.05)
+
+
+def _get_loan(receipt: dict) -> Optional[tuple[int, Loan]]:
+    for log in receipt["logs"]:
+        decoded = LOAN_EVENTS.decode_log(log)
+        if decoded is None:
+            continue
+        event, values = decoded
+        if event is LoanEmitted:
+            return values[0], Loan.from_abi(values[2])
+        return values[2], Loan.from_abi(values[3])
+    return None
+
+
+def _get_transaction(sender: str, to: str, data: str) -> dict:
+    return {"from": sender, "to": to, "data": data, "gas": hex(TRANSACTION_GAS)}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Load test MultiSourceLoan on a local Anvil deployment."
+    )
+    parser.add_argument("--rpc-url", default="http://127.0.0.1:8545")
+    parser.add_argument("--operations", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--emit", type=float, default=0.5)
+    parser.add_argument("--repay", type=float, default=0.3)
+    parser.add_argument("--refinance", type=float, default=0.2)
+    parser.add_argument("--borrowers", type=int, default=50)
+    parser.add_argument("--lenders", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    generator = LoadGenerator(
+        args.rpc_url,
+        get_deployed_addresses(LOCAL),
+        LoadConfig(
+            operations=args.operations,
+            concurrency=args.concurrency,
+            mix={
+                EMIT_LOAN: args.emit,
+                REPAY_LOAN: args.repay,
+                REFINANCE_FULL: args.refinance,
+            },
+            borrowers=args.borrowers,
+            lenders=args.lenders,
+            seed=args.seed,
+        ),
+    )
+    print(format_report(generator.run()))
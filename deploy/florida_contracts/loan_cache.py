@@ -0,0 +1,238 @@
+import threading
+from collections import OrderedDict
+from typing import Callable, Iterable, NamedTuple, Optional
+
+from florida_contracts.events import (
+    EventRegistry,
+    LoanEmitted,
+    LoanForeclosed,
+    LoanLiquidated,
+    LoanRefinanced,
+    LoanRefinancedFromNewOffers,
+    LoanRepaid,
+)
+from florida_contracts.hashing import hash_loan
+from florida_contracts.rpc import RpcClient, encode_call, to_block_tag
+from florida_contracts.structs import Loan
+
+CACHE_EVENTS = EventRegistry(
+    [
+        LoanEmitted,
+        LoanRefinanced,
+        LoanRefinancedFromNewOffers,
+        LoanRepaid,
+        LoanLiquidated,
+        LoanForeclosed,
+    ]
+)
+
+# Rough footprint of a cached entry (tuples, ints and address strings).
+_ENTRY_BYTES = 1024
+_TRANCHE_BYTES = 512
+
+# (contract, loanId) -> Loan, typically backed by the indexer.
+LoanLoader = Callable[[str, int], Optional[Loan]]
+
+
+class CachedLoan(NamedTuple):
+    loan: Loan
+    loan_hash: bytes
+    verified_block: Optional[int]
+
+
+class CacheStats(NamedTuple):
+    hits: int
+    misses: int
+    evictions: int
+    invalidations: int
+    entries: int
+    size_bytes: int
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+
+class LoanCache:
+    """LRU cache of `MultiSourceLoan` loans and their `Hash.hash(Loan)`, keyed by
+    (contract, loanId) and bounded by entry count and estimated memory."""
+
+    def __init__(
+        self,
+        max_entries: int = 100_000,
+        max_bytes: int = 256 * 2**20,
+        loader: Optional[LoanLoader] = None,
+        rpc: Optional[RpcClient] = None,
+    ):
+        self._max_entries = max_entries
+        self._max_bytes = max_bytes
+        self._loader = loader
+        self._rpc = rpc
+        self._entries: OrderedDict[tuple[str, int], CachedLoan] = OrderedDict()
+        self._size = 0
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._invalidations = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def stats(self) -> CacheStats:
+        return CacheStats(
+            self._hits,
+            self._misses,
+            self._evictions,
+            self._invalidations,
+            len(self._entries),
+            self._size,
+        )
+
+    def get(self, contract: str, loan_id: int) -> Optional[CachedLoan]:
+        key = (contract.lower(), loan_id)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self._hits += 1
+                return entry
+            self._misses += 1
+        if self._loader is None:
+            return None
+        loan = self._loader(contract, loan_id)
+        return self.put(contract, loan_id, loan) if loan is not None else None
+
+    def put(
+        self,
+        contract: str,
+        loan_id: int,
+        loan: Loan,
+        verified_block: Optional[int] = None,
+    ) -> CachedLoan:
+        entry = CachedLoan(loan, hash_loan(loan), verified_block)
+        key = (contract.lower(), loan_id)
+        with self._lock:
+            self._remove(key)
+            self._entries[key] = entry
+            self._size += _get_size(loan)
+            while self._entries and (
+                len(self._entries) > self._max_entries or self._size > self._max_bytes
+            ):
+                self._size -= _get_size(self._entries.popitem(last=False)[1].loan)
+                self._evictions += 1
+        return entry
+
+    def invalidate(self, contract: str, loan_id: int):
+        with self._lock:
+            if self._remove((contract.lower(), loan_id)):
+                self._invalidations += 1
+
+    def apply_log(self, log: dict) -> bool:
+        decoded = CACHE_EVENTS.decode_log(log)
+        if decoded is None:
+            return False
+        event, values = decoded
+        contract = log["address"]
+        block = _get_block_number(log)
+        if event is LoanEmitted:
+            self.put(contract, values[0], Loan.from_abi(values[2]), block)
+        elif event is LoanRefinanced:
+            self.invalidate(contract, values[1])
+            self.put(contract, values[2], Loan.from_abi(values[3]), block)
+        elif event is LoanRefinancedFromNewOffers:
+            self.invalidate(contract, values[0])
+            self.put(contract, values[1], Loan.from_abi(values[2]), block)
+        else:
+            self.invalidate(contract, values[0])
+        return True
+
+    def verify(
+        self, keys: Iterable[tuple[str, int]], block: int
+    ) -> dict[tuple[str, int], bool]:
+        """Check cached hashes against `getLoanHash` in a single batch pinned to `block`.
+        Stale entries are dropped, valid ones get `verified_block` bumped, unless they
+        were replaced in the meantime."""
+        if self._rpc is None:
+            raise RuntimeError("verify requires an rpc client")
+        with self._lock:
+            entries = [
+                (
+                    (contract.lower(), loan_id),
+                    self._entries.get((contract.lower(), loan_id)),
+                )
+                for contract, loan_id in keys
+            ]
+        entries = [(key, entry) for key, entry in entries if entry is not None]
+        results = self._rpc.batch(
+            [
+                (
+                    "eth_call",
+                    [
+                        {
+                            "to": contract,
+                            "data": encode_call(
+                                "getLoanHash(uint256)", ["uint256"], [loan_id]
+                            ),
+                        },
+                        to_block_tag(block),
+                    ],
+                )
+                for (contract, loan_id), _ in entries
+            ]
+        )
+        valid = {}
+        with self._lock:
+            for (key, entry), result in zip(entries, results):
+                on_chain = bytes.fromhex(result.removeprefix("0x"))
+                valid[key] = on_chain == entry.loan_hash
+                # Skip entries replaced or removed while the batch was in flight, the
+                # newer loan wasn't checked.
+                if self._entries.get(key) is not entry:
+                    continue
+                if valid[key]:
+                    self._entries[key] = entry._replace(verified_block=block)
+                else:
+                    self._remove(key)
+                    self._invalidations += 1
+        return valid
+
+    def get_verified(
+        self,
+        keys: Iterable[tuple[str, int]],
+        block: int,
+        max_age: int = 0,
+    ) -> dict[tuple[str, int], CachedLoan]:
+        """Loans for `keys` whose hash matched the chain within `max_age` blocks of `block`."""
+        keys = [(contract.lower(), loan_id) for contract, loan_id in keys]
+        entries = {key: self.get(*key) for key in keys}
+        stale = [
+            key
+            for key, entry in entries.items()
+            if entry is not None
+            and (entry.verified_block is None or entry.verified_block + max_age < block)
+        ]
+        if stale:
+            self.verify(stale, block)
+        with self._lock:
+            return {key: self._entries[key] for key in keys if key in self._entries}
+
+    def _remove(self, key: tuple[str, int]) -> bool:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return False
+        self._size -= _get_size(entry.loan)
+        return True
+
+
+def _get_size(loan: Loan) -> int:
+    return _ENTRY_BYTES + _TRANCHE_BYTES * len(loan.tranche)
+
+
+def _get_block_number(log: dict) -> Optional[int]:
+    block = log.get("blockNumber")
+    if isinstance(block, str):
+        return int(block, 16)
+    return block
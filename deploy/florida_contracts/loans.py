@@ -0,0 +1,41 @@
+from florida_contracts.interest import PRECISION, mul_div_down, mul_div_up
+from florida_contracts.structs import Loan
+
+# Mirrors the refinance/tranche rules of src/lib/loans/MultiSourceLoan.sol
+MAX_RATIO_TRANCHE_MIN_PRINCIPAL = 2
+DEFAULT_MIN_IMPROVEMENT_APR = 1000
+
+
+def get_unlocked_time(
+    tranche_start_time: int, loan_end_time: int, min_lock_period: int
+) -> int:
+    delta = loan_end_time - tranche_start_time
+    return tranche_start_time + mul_div_up(delta, min_lock_period, PRECISION)
+
+
+def get_loan_locked_time(loan: Loan, min_lock_period: int) -> int:
+    # `_isLoanLocked` is true once `block.timestamp` is strictly past this value.
+    return loan.end_time - mul_div_up(loan.duration, min_lock_period, PRECISION)
+
+
+def get_min_tranche_principal(loan_principal: int, max_tranches: int) -> int:
+    return loan_principal // (MAX_RATIO_TRANCHE_MIN_PRINCIPAL * max_tranches)
+
+
+def is_tranche_strictly_better(
+    current_apr_bps: int, target_apr_bps: int, min_improvement_apr: int
+) -> bool:
+    if target_apr_bps > current_apr_bps:
+        return False
+    return (
+        mul_div_down(current_apr_bps - target_apr_bps, PRECISION, current_apr_bps)
+        >= min_improvement_apr
+    )
+
+
+def get_min_beatable_apr(target_apr_bps: int, min_improvement_apr: int) -> int:
+    # Smallest tranche apr that `target_apr_bps` strictly improves on:
+    # floor((c - t) * 10000 / c) >= m  <=>  c * (10000 - m) >= t * 10000
+    if min_improvement_apr >= PRECISION:
+        raise ValueError("No tranche can be improved upon")
+    return max(-(-target_apr_bps * PRECISION // (PRECISION - min_improvement_apr)), 1)
@@ -0,0 +1,334 @@
+from bisect import bisect_left, insort
+from heapq import merge
+from typing import Callable, Iterator, NamedTuple, Optional
+
+from florida_contracts.events import (
+    AllOffersCancelled,
+    EventRegistry,
+    LoanEmitted,
+    LoanRefinancedFromNewOffers,
+    OfferCancelled,
+)
+from florida_contracts.interest import PRECISION, SECONDS_PER_YEAR, get_interest
+from florida_contracts.loans import get_min_tranche_principal
+from florida_contracts.structs import ExecutionData, Loan, LoanOffer, OfferExecution
+
+OFFER_EVENTS = EventRegistry(
+    [LoanEmitted, LoanRefinancedFromNewOffers, OfferCancelled, AllOffersCancelled]
+)
+
+# (offer, tokenId) -> whether the offer's validators accept the token.
+ValidatorCheck = Callable[[LoanOffer, int], bool]
+
+
+class SignedOffer(NamedTuple):
+    offer: LoanOffer
+    signature: bytes
+
+    @property
+    def key(self) -> tuple[str, int]:
+        return self.offer.lender.lower(), self.offer.offer_id
+
+
+class _Slot:
+    __slots__ = ("signed", "amount", "available")
+
+    def __init__(self, signed: SignedOffer, amount: int, available: int):
+        self.signed = signed
+        self.amount = amount
+        self.available = available
+
+    @property
+    def offer(self) -> LoanOffer:
+        return self.signed.offer
+
+
+class OfferBook:
+    """Signed `LoanOffer`s for a single `MultiSourceLoan`, indexed by
+    (collection, currency, tokenId) and sorted by aprBps. Collection offers
+    are stored under tokenId 0."""
+
+    def __init__(
+        self, max_tranches: int, validator_check: Optional[ValidatorCheck] = None
+    ):
+        self._max_tranches = max_tranches
+        self._validator_check = validator_check
+        self._offers: dict[tuple[str, int], SignedOffer] = {}
+        self._used: dict[tuple[str, int], int] = {}
+        self._min_offer_id: dict[str, int] = {}
+        self._buckets: dict[tuple[str, str, int], list[tuple[int, int, str, int]]] = {}
+
+    def __len__(self) -> int:
+        return len(self._offers)
+
+    def add_offer(self, offer: LoanOffer, signature: bytes = b""):
+        signed = SignedOffer(offer, signature)
+        self.remove_offer(offer.lender, offer.offer_id)
+        self._offers[signed.key] = signed
+        insort(
+            self._buckets.setdefault(_bucket_key(offer), []),
+            (offer.apr_bps, _fee_ratio(offer), *signed.key),
+        )
+
+    def remove_offer(self, lender: str, offer_id: int):
+        signed = self._offers.pop((lender.lower(), offer_id), None)
+        if signed is None:
+            return
+        key = _bucket_key(signed.offer)
+        bucket = self._buckets[key]
+        del bucket[
+            bisect_left(
+                bucket, (signed.offer.apr_bps, _fee_ratio(signed.offer), *signed.key)
+            )
+        ]
+        if not bucket:
+            del self._buckets[key]
+
+    def cancel_all_offers(self, lender: str, min_offer_id: int):
+        lender = lender.lower()
+        self._min_offer_id[lender] = min_offer_id
+        for key in [k for k in self._offers if k[0] == lender and k[1] <= min_offer_id]:
+            self.remove_offer(*key)
+
+    def set_used_capacity(self, lender: str, offer_id: int, used: int):
+        self._used[(lender.lower(), offer_id)] = used
+
+    def offer_executed(self, lender: str, offer_id: int, amount: int):
+        key = (lender.lower(), offer_id)
+        signed = self._offers.get(key)
+        if signed is not None and signed.offer.capacity == 0:
+            self.remove_offer(lender, offer_id)
+        else:
+            self._used[key] = self._used.get(key, 0) + amount
+
+    def apply_log(self, log: dict) -> bool:
+        decoded = OFFER_EVENTS.decode_log(log)
+        if decoded is None:
+            return False
+        event, values = decoded
+        if event is LoanEmitted:
+            self._loan_emitted(values[1], Loan.from_abi(values[2]))
+        elif event is LoanRefinancedFromNewOffers:
+            self._loan_emitted(values[3], Loan.from_abi(values[2]))
+        elif event is OfferCancelled:
+            self.remove_offer(*values)
+        elif event is AllOffersCancelled:
+            self.cancel_all_offers(*values)
+        return True
+
+    def candidates(
+        self, collection: str, currency: str, token_id: int, duration: int, now: int
+    ) -> Iterator[tuple[SignedOffer, int]]:
+        """Offers that `_validateOfferExecution` would accept, cheapest first,
+        together with the amount still available in each."""
+        collection, currency = collection.lower(), currency.lower()
+        buckets = [self._buckets.get((collection, currency, token_id), [])]
+        if token_id != 0:
+            buckets.append(self._buckets.get((collection, currency, 0), []))
+        for _, _, lender, offer_id in merge(*buckets):
+            signed = self._offers[(lender, offer_id)]
+            offer = signed.offer
+            if (
+                offer.expiration_time < now
+                or offer.duration == 0
+                or offer.duration < duration
+                or offer.apr_bps == 0
+                # `minOfferId` defaults to 0, so offer id 0 never executes.
+                or offer_id <= self._min_offer_id.get(lender, 0)
+                or not self._accepts_token(offer, token_id)
+            ):
+                continue
+            available = offer.principal_amount
+            if offer.capacity != 0:
+                available = min(
+                    available, offer.capacity - self._used.get((lender, offer_id), 0)
+                )
+            if available > 0:
+                yield signed, available
+
+    def match(
+        self,
+        collection: str,
+        currency: str,
+        token_id: int,
+        principal_amount: int,
+        duration: int,
+        now: int,
+        expiration_time: int,
+        principal_receiver: str,
+        callback_data: bytes = b"",
+    ) -> Optional[ExecutionData]:
+        """Cheapest (blended apr) set of offers that fills `principal_amount`.
+
+        Offers are taken greedily by apr and placed at the seniority that leaves
+        them the most room under `principalAmount`/`maxSeniorRepayment`. Every
+        tranche is kept above `_getMinTranchePrincipal`. Returns None if the
+        book can't fill the request.
+        """
+        min_tranche = max(
+            get_min_tranche_principal(principal_amount, self._max_tranches), 1
+        )
+        slots: list[_Slot] = []
+        remaining = principal_amount
+        for signed, available in self.candidates(
+            collection, currency, token_id, duration, now
+        ):
+            if remaining < min_tranche:
+                remaining -= self._top_up(slots, remaining, duration)
+                if remaining == 0:
+                    break
+                if not self._make_room(slots, remaining, min_tranche):
+                    return None
+                remaining = min_tranche
+            if len(slots) == self._max_tranches:
+                break
+            position, amount = _best_position(
+                slots, signed.offer, min(available, remaining), duration
+            )
+            if amount < min_tranche:
+                continue
+            slots.insert(position, _Slot(signed, amount, available))
+            remaining -= amount
+            if remaining == 0:
+                break
+        if remaining:
+            remaining -= self._top_up(slots, remaining, duration)
+        if remaining or not slots:
+            return None
+        return ExecutionData(
+            tuple(
+                OfferExecution(slot.offer, slot.amount, slot.signed.signature)
+                for slot in slots
+            ),
+            token_id,
+            duration,
+            expiration_time,
+            principal_receiver,
+            callback_data,
+        )
+
+    def _accepts_token(self, offer: LoanOffer, token_id: int) -> bool:
+        # Mirrors `_checkValidators`.
+        if offer.nft_collateral_token_id != 0:
+            return offer.nft_collateral_token_id == token_id
+        if not offer.validators:
+            return token_id == 0
+        if len(offer.validators) == 1 and int(offer.validators[0].validator, 16) == 0:
+            return True
+        return self._validator_check is not None and self._validator_check(
+            offer, token_id
+        )
+
+    def _loan_emitted(self, offer_ids: list[int], loan: Loan):
+        for offer_id, tranche in zip(offer_ids, loan.tranche):
+            self.offer_executed(tranche.lender, offer_id, tranche.principal_amount)
+
+    @staticmethod
+    def _top_up(slots: list[_Slot], remaining: int, duration: int) -> int:
+        # Grow existing tranches (cheapest first) to absorb what's left.
+        added = 0
+        for index in sorted(range(len(slots)), key=lambda i: slots[i].offer.apr_bps):
+            slot = slots[index]
+            extra = min(
+                remaining - added,
+                slot.available - slot.amount,
+                _max_increase(slots, index + 1, slot.offer.apr_bps, duration),
+                slot.offer.principal_amount - sum(s.amount for s in slots[: index + 1]),
+            )
+            if extra > 0:
+                slot.amount += extra
+                added += extra
+            if added == remaining:
+                break
+        return added
+
+    @staticmethod
+    def _make_room(slots: list[_Slot], remaining: int, min_tranche: int) -> bool:
+        # Shrink the most expensive tranche so the last one can reach the minimum.
+        needed = min_tranche - remaining
+        for slot in sorted(slots, key=lambda s: s.offer.apr_bps, reverse=True):
+            if slot.amount - needed >= min_tranche:
+                slot.amount -= needed
+                return True
+        return False
+
+
+def get_blended_apr_bps(execution_data: ExecutionData) -> int:
+    total = sum(e.amount for e in execution_data.offer_execution)
+    weighted = sum(e.amount * e.offer.apr_bps for e in execution_data.offer_execution)
+    return weighted // total if total else 0
+
+
+def _best_position(
+    slots: list[_Slot], offer: LoanOffer, amount: int, duration: int
+) -> tuple[int, int]:
+    best_position, best_amount = 0, 0
+    before = 0
+    senior_repayment = 0
+    for position in range(len(slots) + 1):
+        if senior_repayment > offer.max_senior_repayment:
+            break
+        candidate = min(
+            amount,
+            offer.principal_amount - before,
+            _max_increase(slots, position, offer.apr_bps, duration),
+        )
+        if candidate > best_amount:
+            best_position, best_amount = position, candidate
+        if position < len(slots):
+            slot = slots[position]
+            before += slot.amount
+            senior_repayment += slot.amount + get_interest(
+                slot.amount, slot.offer.apr_bps, duration
+            )
+    return best_position, best_amount
+
+
+def _max_increase(slots: list[_Slot], start: int, apr_bps: int, duration: int) -> int:
+    # Largest principal that can be added ahead of `slots[start:]` without breaking
+    # their `principalAmount` (cumulative) and `maxSeniorRepayment` limits.
+    limit = None
+    before = sum(s.amount for s in slots[:start])
+    senior_repayment = sum(
+        s.amount + get_interest(s.amount, s.offer.apr_bps, duration)
+        for s in slots[:start]
+    )
+    for slot in slots[start:]:
+        offer = slot.offer
+        room = min(
+            offer.principal_amount - before - slot.amount,
+            _max_with_interest(
+                offer.max_senior_repayment - senior_repayment, apr_bps, duration
+            ),
+        )
+        limit = room if limit is None else min(limit, room)
+        before += slot.amount
+        senior_repayment += slot.amount + get_interest(
+            slot.amount, offer.apr_bps, duration
+        )
+    return max(limit, 0) if limit is not None else 2**256 - 1
+
+
+def _max_with_interest(slack: int, apr_bps: int, duration: int) -> int:
+    # Largest x with x + getInterest(x, apr, duration) <= slack.
+    if slack <= 0:
+        return 0
+    denominator = PRECISION * SECONDS_PER_YEAR
+    amount = slack * denominator // (denominator + apr_bps * duration)
+    while amount > 0 and amount + get_interest(amount, apr_bps, duration) > slack:
+        amount -= 1
+    return amount
+
+
+def _fee_ratio(offer: LoanOffer) -> int:
+    return (
+        offer.fee * PRECISION // offer.principal_amount if offer.principal_amount else 0
+    )
+
+
+def _bucket_key(offer: LoanOffer) -> tuple[str, str, int]:
+    return (
+        offer.nft_collateral_address.lower(),
+        offer.principal_address.lower(),
+        offer.nft_collateral_token_id,
+    )
@@ -0,0 +1,323 @@
+from functools import lru_cache
+from typing import Iterable, NamedTuple, Optional
+
+from eth_abi import decode
+from eth_hash.auto import keccak
+
+from florida_contracts.events import DataUpdated, Event, EventRegistry
+from florida_contracts.interest import mul_div_down, mul_div_up
+from florida_contracts.structs import (
+    AprFactors,
+    AprPremium,
+    CollectionData,
+    LoanOffer,
+    OfferExecution,
+    PrincipalFactors,
+)
+from florida_contracts.views import ViewAggregator, ViewCall, unwrap_results
+
+# Mirrors src/lib/pools/OraclePoolOfferHandler.sol
+PRECISION = 10**27
+TOLERANCE_FLOOR = 2 * 10**25
+TOLERANCE_HISTORICAL_FLOOR = 5 * 10**25
+
+RANGE_CODE = 1
+MERKLE_ROOT_CODE = 2
+INDIVIDUAL_CODE = 3
+
+_ZERO_KEY = bytes(32)
+_UINT64_MASK = 2**64 - 1
+_UINT96_MASK = 2**96 - 1
+_UINT128_MASK = 2**128 - 1
+
+AprPremiumSet = Event("AprPremiumSet", ("uint256",))
+AprFactorsSet = Event("AprFactorsSet", ("(uint128,uint128)",))
+CollectionFactorsSet = Event(
+    "CollectionFactorsSet",
+    ("address[]", "uint96[]", "bytes[]", "(uint128,uint128)[]"),
+)
+OracleSet = Event("OracleSet", ("address",))
+
+OFFER_HANDLER_EVENTS = EventRegistry(
+    [AprPremiumSet, AprFactorsSet, CollectionFactorsSet, OracleSet, DataUpdated]
+)
+
+
+class OfferValidationError(ValueError):
+    """Raised with the name of the custom error `validateOffer` would revert with."""
+
+
+class FactorKey(NamedTuple):
+    collection: str
+    duration: int
+    extra: bytes = b""
+
+    @property
+    def hash(self) -> bytes:
+        return get_factors_hash(self.collection, self.duration, self.extra)
+
+
+class OfferLimits(NamedTuple):
+    max_principal: int
+    min_apr: int
+
+
+def get_factors_hash(collection: str, duration: int, extra: bytes = b"") -> bytes:
+    return keccak(
+        bytes.fromhex(collection[2:])
+        + (duration & _UINT96_MASK).to_bytes(12, "big")
+        + extra
+    )
+
+
+def get_factor_key(offer: LoanOffer) -> Optional[FactorKey]:
+    """Key `_getFactors` reads for `offer`. None when it falls through to the zero
+    key (several validators or a non zero validator), i.e. a max principal of 0."""
+    if not offer.validators:
+        return FactorKey(offer.nft_collateral_address, offer.duration)
+    if len(offer.validators) > 1 or int(offer.validators[0].validator, 16) != 0:
+        return None
+    code, data = _decode_validation_data(offer.validators[0].arguments)
+    if code == RANGE_CODE:
+        # The on chain range check uses `<min && >max` and can never fail.
+        extra = data
+    elif code == MERKLE_ROOT_CODE:
+        # `MerkleProofLib.verify` result is ignored on chain, only the root matters.
+        extra = _decode(["bytes32[]", "bytes32"], data)[1]
+    elif code == INDIVIDUAL_CODE:
+        if _decode(["uint256"], data)[0] != offer.nft_collateral_token_id:
+            raise OfferValidationError("InvalidInputError")
+        extra = data
+    else:
+        raise OfferValidationError("InvalidInputError")
+    return FactorKey(offer.nft_collateral_address, offer.duration, extra)
+
+
+def calculate_apr_premium(
+    apr_factors: AprFactors, total_assets: int, undeployed_assets: int
+) -> int:
+    return (
+        mul_div_up(
+            total_assets - undeployed_assets,
+            apr_factors.utilization_factor,
+            total_assets * PRECISION,
+        )
+        + apr_factors.min_premium
+    ) & _UINT128_MASK
+
+
+def is_outdated(data: CollectionData, duration: int, tolerance: int, now: int) -> bool:
+    return now - data.updated > mul_div_down(duration, tolerance, PRECISION)
+
+
+@lru_cache(maxsize=4096)
+def _decode_validation_data(arguments: bytes) -> tuple[int, bytes]:
+    return _decode(["(uint8,bytes)"], arguments)[0]
+
+
+def _decode(types: list[str], data: bytes) -> tuple:
+    try:
+        return decode(types, data)
+    except Exception:
+        # `abi.decode` reverts without a custom error.
+        raise OfferValidationError("Revert") from None
+
+
+class OracleOfferHandler:
+    """Local replica of `OraclePoolOfferHandler.validateOffer`. State is loaded with
+    `warm` (batched view calls pinned to one block) and can be kept current with
+    `apply_log`. Lookups for keys that weren't loaded raise `KeyError`."""
+
+    def __init__(
+        self,
+        handler: str,
+        pool: str,
+        oracle_floor_key: bytes,
+        oracle_historical_floor_key: bytes,
+    ):
+        self.handler = handler.lower()
+        self.pool = pool.lower()
+        self.oracle: Optional[str] = None
+        self._floor_key = oracle_floor_key
+        self._historical_floor_key = oracle_historical_floor_key
+        self.apr_premium = AprPremium(_UINT128_MASK, 0)
+        self.apr_factors = AprFactors(0, 0)
+        self.apr_update_tolerance = 0
+        # `calculateAprPremium()` at the last warm block.
+        self.calculated_apr_premium = 0
+        # `getBaseApr()` of the pool's base interest allocator. The pool passes
+        # `getBaseAprWithUpdate()`, which can be slightly ahead of it.
+        self.base_rate = 0
+        self._factors: dict[bytes, PrincipalFactors] = {
+            _ZERO_KEY: PrincipalFactors(0, 0)
+        }
+        self._oracle_data: dict[tuple[str, int, bytes], CollectionData] = {}
+
+    def warm(
+        self,
+        aggregator: ViewAggregator,
+        keys: Iterable[FactorKey] = (),
+        block: Optional[int] = None,
+    ) -> int:
+        keys = list(dict.fromkeys(keys))
+        calls = [
+            ViewCall(self.handler, "getAprPremium()", (), ("uint128", "uint128")),
+            ViewCall(self.handler, "getAprFactors()", (), ("uint128", "uint128")),
+            ViewCall(self.handler, "getAprUpdateTolerance()"),
+            ViewCall(self.handler, "calculateAprPremium()", (), ("uint128",)),
+            ViewCall(self.handler, "getOracle()", (), ("address",)),
+            ViewCall(self.pool, "getBaseInterestAllocator()", (), ("address",)),
+        ] + [self._get_factors_call(key) for key in keys]
+        block, results = aggregator.execute(calls, block)
+        values = unwrap_results(results)
+        premium, factors, tolerance, calculated, oracle, allocator = values[:6]
+        self.apr_premium = AprPremium(*premium)
+        self.apr_factors = AprFactors(*factors)
+        self.apr_update_tolerance = tolerance
+        self.calculated_apr_premium = calculated
+        if self.oracle != oracle.lower():
+            self.oracle = oracle.lower()
+            self._oracle_data.clear()
+        for key, value in zip(keys, values[6:]):
+            self._factors[key.hash] = value
+
+        periods = list(dict.fromkeys((k.collection.lower(), k.duration) for k in keys))
+        oracle_keys = [
+            (collection, duration & _UINT64_MASK, key)
+            for collection, duration in periods
+            for key in (self._floor_key, self._historical_floor_key)
+        ]
+        calls = [ViewCall(allocator, "getBaseApr()")] + [
+            ViewCall(
+                self.oracle,
+                "getData(address,uint64,bytes4)",
+                key,
+                ("(uint128,uint128)",),
+                CollectionData,
+            )
+            for key in oracle_keys
+        ]
+        values = unwrap_results(aggregator.execute(calls, block).results)
+        self.base_rate = values[0]
+        self._oracle_data.update(zip(oracle_keys, values[1:]))
+        return block
+
+    def warm_offers(
+        self,
+        aggregator: ViewAggregator,
+        offers: Iterable[LoanOffer],
+        block: Optional[int] = None,
+    ) -> int:
+        keys = []
+        for offer in offers:
+            try:
+                key = get_factor_key(offer)
+            except OfferValidationError:
+                continue
+            if key is not None:
+                keys.append(key)
+        return self.warm(aggregator, keys, block)
+
+    def set_factors(self, key: FactorKey, factors: PrincipalFactors):
+        self._factors[key.hash] = factors
+
+    def set_oracle_data(
+        self, collection: str, period: int, key: bytes, data: CollectionData
+    ):
+        self._oracle_data[(collection.lower(), period & _UINT64_MASK, key)] = data
+
+    def get_apr_premium(self, now: int) -> int:
+        if now - self.apr_premium.updated_ts > self.apr_update_tolerance:
+            return self.calculated_apr_premium
+        return self.apr_premium.value
+
+    def get_min_apr(self, now: int) -> int:
+        return self.base_rate + self.get_apr_premium(now)
+
+    def get_max_principal(self, offer: LoanOffer, now: int) -> int:
+        collection = offer.nft_collateral_address.lower()
+        period = offer.duration & _UINT64_MASK
+        floor = self._oracle_data[(collection, period, self._floor_key)]
+        historical = self._oracle_data[(collection, period, self._historical_floor_key)]
+        if is_outdated(floor, offer.duration, TOLERANCE_FLOOR, now) or is_outdated(
+            historical, offer.duration, TOLERANCE_HISTORICAL_FLOOR, now
+        ):
+            raise OfferValidationError("OutdatedValueError")
+        key = get_factor_key(offer)
+        factors = self._factors[key.hash if key is not None else _ZERO_KEY]
+        return min(
+            mul_div_down(floor.value, factors.floor, PRECISION) & _UINT128_MASK,
+            mul_div_down(historical.value, factors.historical_floor, PRECISION)
+            & _UINT128_MASK,
+        )
+
+    def get_limits(self, offer: LoanOffer, now: int) -> OfferLimits:
+        min_apr = self.get_min_apr(now)
+        return OfferLimits(self.get_max_principal(offer, now), min_apr)
+
+    def validate(self, offer_execution: OfferExecution, now: int) -> tuple[int, int]:
+        """Same checks and order as `validateOffer`, returning (principal, apr)."""
+        offer = offer_execution.offer
+        max_principal, min_apr = self.get_limits(offer, now)
+        if offer_execution.amount > max_principal:
+            raise OfferValidationError("InvalidPrincipalAmountError")
+        if min_apr > offer.apr_bps:
+            raise OfferValidationError("InvalidAprError")
+        if offer.max_senior_repayment != 0:
+            raise OfferValidationError("InvalidMaxSeniorRepaymentError")
+        return offer_execution.amount, offer.apr_bps
+
+    def check(self, offer_execution: OfferExecution, now: int) -> Optional[str]:
+        """Name of the error `validateOffer` would revert with, None if it passes."""
+        try:
+            self.validate(offer_execution, now)
+        except OfferValidationError as e:
+            return str(e)
+        return None
+
+    def apply_log(self, log: dict, timestamp: int) -> bool:
+        decoded = OFFER_HANDLER_EVENTS.decode_log(log)
+        if decoded is None:
+            return False
+        event, values = decoded
+        address = log["address"].lower()
+        if event is DataUpdated:
+            if address != self.oracle:
+                return False
+            collection, period, key, value = values
+            self.set_oracle_data(
+                collection, period, key, CollectionData(value, timestamp)
+            )
+            return True
+        if address != self.handler:
+            return False
+        if event is AprPremiumSet:
+            self.apr_premium = AprPremium(values[0], timestamp)
+        elif event is AprFactorsSet:
+            self.apr_factors = AprFactors(*values[0])
+        elif event is CollectionFactorsSet:
+            for collection, duration, extra, factors in zip(*values):
+                self.set_factors(
+                    FactorKey(collection, duration, extra), PrincipalFactors(*factors)
+                )
+        else:
+            self.oracle = values[0].lower()
+            self._oracle_data.clear()
+        return True
+
+    def _get_factors_call(self, key: FactorKey) -> ViewCall:
+        if key.extra:
+            return ViewCall(
+                self.handler,
+                "getPrincipalFactors(address,uint96,bytes)",
+                (key.collection, key.duration & _UINT96_MASK, key.extra),
+                ("(uint128,uint128)",),
+                PrincipalFactors,
+            )
+        return ViewCall(
+            self.handler,
+            "getCollectionFactors(address,uint96)",
+            (key.collection, key.duration & _UINT96_MASK),
+            ("(uint128,uint128)",),
+            PrincipalFactors,
+        )
@@ -0,0 +1,256 @@
+import subprocess
+import time
+from typing import Iterable, Mapping, NamedTuple, Optional, Sequence
+
+from florida_contracts.rpc import RpcClient, encode_call
+from florida_contracts.structs import CollectionData
+from florida_contracts.views import ViewAggregator, ViewCall, unwrap_results
+
+BPS = 10000
+SET_DATA = "setData(address,uint64,bytes4,uint128)"
+SET_DATA_TYPES = ("address", "uint64", "bytes4", "uint128")
+MULTICALL = "multicall(bytes[])"
+
+TX_BASE_GAS = 21_000
+# Cold slot write (new key), owner check, `DataUpdated` event, calldata and
+# the multicall delegatecall, with some headroom.
+SET_DATA_GAS = 40_000
+DEFAULT_MAX_GAS = 15_000_000
+
+
+class FeedKey(NamedTuple):
+    collection: str
+    period: int
+    key: bytes
+
+
+class FeedUpdate(NamedTuple):
+    key: FeedKey
+    current: CollectionData
+    value: int
+
+    @property
+    def deviation_bps(self) -> int:
+        if self.current.value == 0:
+            return BPS if self.value else 0
+        return abs(self.value - self.current.value) * BPS // self.current.value
+
+
+class CycleReport(NamedTuple):
+    block: int
+    read: int
+    changed: int
+    transactions: tuple[str, ...]
+    gas_used: int
+    # Seconds spent reading state, submitting and waiting for receipts.
+    read_latency: float
+    submit_latency: float
+    confirm_latency: float
+
+    @property
+    def latency(self) -> float:
+        return self.read_latency + self.submit_latency + self.confirm_latency
+
+
+def read_oracle_data(
+    aggregator: ViewAggregator,
+    oracle: str,
+    keys: Iterable[FeedKey],
+    block: Optional[int] = None,
+) -> tuple[int, dict[FeedKey, CollectionData]]:
+    keys = list(keys)
+    block, results = aggregator.execute(
+        [
+            ViewCall(
+                oracle,
+                "getData(address,uint64,bytes4)",
+                tuple(key),
+                ("(uint128,uint128)",),
+                CollectionData,
+            )
+            for key in keys
+        ],
+        block,
+    )
+    return block, dict(zip(keys, unwrap_results(results)))
+
+
+def get_changed(
+    current: Mapping[FeedKey, CollectionData],
+    target: Mapping[FeedKey, int],
+    tolerance_bps: int,
+    now: Optional[int] = None,
+    max_age: Optional[int] = None,
+) -> list[FeedUpdate]:
+    """Keys whose value moved by more than `tolerance_bps`, were never set, or
+    (with `max_age`) are older than `max_age` seconds at `now`, which is then
+    required. Largest deviation first."""
+    if max_age is not None and now is None:
+        raise ValueError("now is required with max_age")
+    updates = []
+    for key, value in target.items():
+        data = current.get(key, CollectionData(0, 0))
+        update = FeedUpdate(key, data, value)
+        if (
+            data.updated == 0
+            or update.deviation_bps > tolerance_bps
+            or (max_age is not None and now - data.updated > max_age)
+        ):
+            updates.append(update)
+    updates.sort(key=lambda update: update.deviation_bps, reverse=True)
+    return updates
+
+
+def pack_updates(
+    updates: Sequence[FeedUpdate],
+    max_gas: int = DEFAULT_MAX_GAS,
+    update_gas: int = SET_DATA_GAS,
+    base_gas: int = TX_BASE_GAS,
+) -> list[list[FeedUpdate]]:
+    """Split `updates` into the fewest groups whose estimated gas fits `max_gas`."""
+    per_group = max((max_gas - base_gas) // update_gas, 1)
+    return [list(updates[i : i + per_group]) for i in range(0, len(updates), per_group)]
+
+
+def encode_set_data(update: FeedUpdate) -> str:
+    return encode_call(SET_DATA, SET_DATA_TYPES, (*update.key, update.value))
+
+
+class OracleFeeder:
+    """Pushes the changed subset of a feed to `Oracle`. With `use_multicall` each
+    group of updates goes out as a single `multicall(bytes[])` transaction (for
+    oracles inheriting `Multicall`, the delegatecall keeps `onlyOwner` happy).
+    `Oracle` itself doesn't, so by default every update is its own `setData`
+    transaction and groups are submitted back to back with consecutive nonces,
+    bounded by `max_gas` per group."""
+
+    def __init__(
+        self,
+        rpc_url: str,
+        private_key: str,
+        oracle: str,
+        aggregator: Optional[ViewAggregator] = None,
+        tolerance_bps: int = 100,
+        max_age: Optional[int] = None,
+        max_gas: int = DEFAULT_MAX_GAS,
+        use_multicall: bool = False,
+        receipt_timeout: float = 120,
+    ):
+        self._rpc_url = rpc_url
+        self._private_key = private_key
+        self.oracle = oracle
+        self._rpc = RpcClient(rpc_url)
+        self._aggregator = aggregator or ViewAggregator(self._rpc)
+        self.tolerance_bps = tolerance_bps
+        self.max_age = max_age
+        self.max_gas = max_gas
+        self.use_multicall = use_multicall
+        self._receipt_timeout = receipt_timeout
+        self._sender = _get_sender(private_key)
+
+    def run_cycle(self, target: Mapping[FeedKey, int]) -> CycleReport:
+        start = time.monotonic()
+        block, current = read_oracle_data(self._aggregator, self.oracle, target)
+        now = int(
+            self._rpc.call("eth_getBlockByNumber", [hex(block), False])["timestamp"], 16
+        )
+        updates = get_changed(current, target, self.tolerance_bps, now, self.max_age)
+        read_done = time.monotonic()
+
+        nonce = int(
+            self._rpc.call("eth_getTransactionCount", [self._sender, "pending"]), 16
+        )
+        transactions = []
+        for group in pack_updates(updates, self.max_gas):
+            if self.use_multicall:
+                transactions.append(
+                    self._send(nonce, len(group), MULTICALL, [_to_array(group)])
+                )
+                nonce += 1
+                continue
+            for update in group:
+                transactions.append(
+                    self._send(
+                        nonce,
+                        1,
+                        SET_DATA,
+                        [
+                            update.key.collection,
+                            str(update.key.period),
+                            "0x" + update.key.key.hex(),
+                            str(update.value),
+                        ],
+                    )
+                )
+                nonce += 1
+        submit_done = time.monotonic()
+
+        receipts = self._wait_for_receipts(transactions)
+        failed = [r["transactionHash"] for r in receipts if int(r["status"], 16) != 1]
+        if failed:
+            raise RuntimeError(f"Oracle update reverted: {failed}")
+        return CycleReport(
+            block,
+            len(target),
+            len(updates),
+            tuple(transactions),
+            sum(int(r["gasUsed"], 16) for r in receipts),
+            read_done - start,
+            submit_done - read_done,
+            time.monotonic() - submit_done,
+        )
+
+    def _send(self, nonce: int, updates: int, signature: str, args: list[str]) -> str:
+        cmd = [
+            "cast",
+            "send",
+            "--async",
+            "--nonce",
+            str(nonce),
+            "--gas-limit",
+            str(TX_BASE_GAS + updates * SET_DATA_GAS),
+            "--private-key",
+            self._private_key,
+            "--rpc-url",
+            self._rpc_url,
+            self.oracle,
+            signature,
+            *args,
+        ]
+        output = subprocess.run(cmd, stdout=subprocess.PIPE, text=True)
+        if output.returncode != 0:
+            raise RuntimeError(f"Could not send: {self.oracle} {signature}")
+        return output.stdout.strip()
+
+    def _wait_for_receipts(self, transactions: Sequence[str]) -> list[dict]:
+        deadline = time.monotonic() + self._receipt_timeout
+        receipts: dict[str, dict] = {}
+        while len(receipts) < len(transactions):
+            pending = [tx for tx in transactions if tx not in receipts]
+            results = self._rpc.batch(
+                [("eth_getTransactionReceipt", [tx]) for tx in pending]
+            )
+            receipts.update(
+                (tx, receipt) for tx, receipt in zip(pending, results) if receipt
+            )
+            if len(receipts) == len(transactions):
+                break
+            if time.monotonic() > deadline:
+                raise RuntimeError(f"Timed out waiting for {len(pending)} receipts")
+            time.sleep(0.5)
+        return [receipts[tx] for tx in transactions]
+
+
+def _to_array(group: Sequence[FeedUpdate]) -> str:
+    return "[" + ",".join(encode_set_data(update) for update in group) + "]"
+
+
+def _get_sender(private_key: str) -> str:
+    output = subprocess.run(
+        ["cast", "wallet", "address", "--private-key", private_key],
+        stdout=subprocess.PIPE,
+        text=True,
+    )
+    if output.returncode != 0:
+        raise RuntimeError("Could not derive sender address")
+    return output.stdout.strip()
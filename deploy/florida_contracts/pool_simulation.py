@@ -0,0 +1,378 @@
+import math
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import NamedTuple, Optional, Sequence
+
+import numpy as np
+
+from florida_contracts.interest import PRECISION, SECONDS_PER_YEAR
+from florida_contracts.structs import Fees, OptimalIdleRange
+
+# Mirrors src/lib/pools/Pool.sol and src/lib/pools/FeeManager.sol
+PRINCIPAL_PRECISION = 10**20
+FEE_PRECISION = 10**20
+LOAN_BUFFER_TIME = 7 * 24 * 3600
+
+DAY = 24 * 3600
+DEFAULT_QUANTILES = (0.01, 0.05, 0.25, 0.5, 0.75, 0.95, 0.99)
+
+
+class SimulationConfig(NamedTuple):
+    paths: int = 10_000
+    horizon: int = 365 * DAY
+    step: int = DAY
+    initial_assets: float = 1000.0
+    fees: Fees = Fees(0, 10**19)
+    optimal_idle_range: OptimalIdleRange = OptimalIdleRange(5 * 10**18, 15 * 10**18)
+    # MultiSourceLoan protocol fee, taken out of the apr the pool earns.
+    protocol_fee: int = 100
+    max_total_withdrawal_queues: int = 4
+    # Defaults to `getMinTimeBetweenWithdrawalQueues`.
+    queue_interval: Optional[int] = None
+    base_apr_bps: int = 300
+    loan_duration: int = 30 * DAY
+    loan_apr_bps: int = 1500
+    loan_apr_volatility_bps: int = 300
+    loans_per_day: float = 5.0
+    loan_size: float = 10.0
+    loan_size_sigma: float = 0.5
+    # Daily probability of an outstanding loan being repaid before maturity.
+    early_repayment_hazard: float = 0.02
+    default_probability: float = 0.02
+    recovery_mean: float = 0.8
+    recovery_std: float = 0.2
+    # From maturity to `loanLiquidation`: liquidation trigger plus auction.
+    liquidation_delay: int = 4 * DAY
+    deposits_per_day: float = 1.0
+    deposit_size: float = 20.0
+    deposit_size_sigma: float = 0.5
+    # Daily fraction of non pending shares requested for withdrawal.
+    withdrawal_rate: float = 0.002
+    # A queue is filled once it got this fraction of what it's entitled to.
+    fill_fraction: float = 0.99
+    seed: int = 0
+
+    @property
+    def queue_steps(self) -> int:
+        interval = self.queue_interval
+        if interval is None:
+            interval = math.ceil(
+                (self.loan_duration + LOAN_BUFFER_TIME)
+                / self.max_total_withdrawal_queues
+            )
+        return max(math.ceil(interval / self.step), 1)
+
+
+class PathResults(NamedTuple):
+    # (paths, steps) at the end of every step.
+    share_price: np.ndarray
+    idle_fraction: np.ndarray
+    # Seconds from queue deployment until filled, one per deployed queue.
+    queue_fill_times: np.ndarray
+
+
+class RiskReport(NamedTuple):
+    paths: int
+    quantiles: tuple[float, ...]
+    final_share_price: np.ndarray
+    annualized_return: np.ndarray
+    max_drawdown: np.ndarray
+    mean_idle_fraction: np.ndarray
+    queue_fill_time: np.ndarray
+    elapsed: float
+
+
+def process_fees(fees: Fees, principal: np.ndarray, interest: np.ndarray) -> np.ndarray:
+    """`FeeManager.processFees` over arrays."""
+    return (
+        principal * fees.management_fee + interest * fees.performance_fee
+    ) / FEE_PRECISION
+
+
+def get_liquidation_fees(
+    fees: Fees, principal: np.ndarray, received: np.ndarray
+) -> np.ndarray:
+    """Fees charged by `Pool.loanLiquidation`."""
+    return np.where(
+        received > principal,
+        process_fees(fees, principal, received - principal),
+        process_fees(fees, received, np.zeros_like(received)),
+    )
+
+
+def get_repayment_kernel(config: SimulationConfig) -> np.ndarray:
+    """Fraction of a non defaulting cohort repaid at each step after origination,
+    whatever is left is repaid at maturity."""
+    loan_steps = max(math.ceil(config.loan_duration / config.step), 1)
+    hazard = 1 - (1 - config.early_repayment_hazard) ** (config.step / DAY)
+    kernel = hazard * (1 - hazard) ** np.arange(loan_steps)
+    kernel[-1] = 1 - kernel[:-1].sum()
+    return kernel
+
+
+def simulate_paths(
+    config: SimulationConfig, paths: int, seed: np.random.SeedSequence
+) -> PathResults:
+    """Runs `paths` independent pools, every step is applied to all of them at once.
+
+    Loans are grouped in cohorts by the step they terminate at. For each one the
+    pool keeps its share of principal, `sum(principal * netApr)` and
+    `sum(principal * netApr * startTime)`, so the outstanding value (`Pool`
+    assumes every loan is repaid) is a closed form at any time. Deploying a queue
+    scales every future cohort by the pool's remaining fraction, which is what
+    `netPoolFraction` does on chain. Amounts are floats, so on chain rounding
+    isn't reproduced."""
+    rng = np.random.default_rng(seed)
+    step = config.step
+    steps = config.horizon // step
+    kernel = get_repayment_kernel(config)
+    loan_steps = len(kernel)
+    default_offset = loan_steps + math.ceil(config.liquidation_delay / step)
+    width = steps + default_offset + 1
+    day_fraction = step / DAY
+    interest_denominator = PRECISION * SECONDS_PER_YEAR
+    idle_range = config.optimal_idle_range
+    idle_min = idle_range.min / PRINCIPAL_PRECISION
+    idle_max = idle_range.max / PRINCIPAL_PRECISION
+    idle_mid = ((idle_range.min + idle_range.max) >> 1) / PRINCIPAL_PRECISION
+    base_growth = 1 + config.base_apr_bps * step / interest_denominator
+    queue_steps = config.queue_steps
+
+    # Pool's share of repaid cohorts: principal, sum(P * apr), sum(P * apr * start).
+    principal = np.zeros((paths, width))
+    apr_sum = np.zeros((paths, width))
+    apr_time = np.zeros((paths, width))
+    # Same for defaulted cohorts, plus liquidation proceeds.
+    defaulted = np.zeros((paths, width))
+    defaulted_apr_sum = np.zeros((paths, width))
+    defaulted_apr_time = np.zeros((paths, width))
+    proceeds = np.zeros((paths, width))
+    cohorts = (
+        principal,
+        apr_sum,
+        apr_time,
+        defaulted,
+        defaulted_apr_sum,
+        defaulted_apr_time,
+        proceeds,
+    )
+    # Running totals of outstanding cohorts.
+    outstanding = np.zeros(paths)
+    outstanding_apr = np.zeros(paths)
+    outstanding_apr_time = np.zeros(paths)
+
+    idle = np.full(paths, config.initial_assets * idle_mid)
+    allocated = np.full(paths, config.initial_assets * (1 - idle_mid))
+    supply = np.full(paths, config.initial_assets)
+    pending_shares = np.zeros(paths)
+
+    share_price = np.empty((paths, steps))
+    idle_fraction = np.empty((paths, steps))
+    fill_times = []
+
+    for t in range(steps):
+        now = t * step
+        allocated *= base_growth
+
+        # Repayments and liquidations due this step.
+        repaid = principal[:, t]
+        interest = (apr_sum[:, t] * now - apr_time[:, t]) / interest_denominator
+        received = proceeds[:, t]
+        lost = defaulted[:, t]
+        idle += (
+            repaid
+            + interest
+            - process_fees(config.fees, repaid, interest)
+            + received
+            - get_liquidation_fees(config.fees, lost, received)
+        )
+        outstanding -= repaid + lost
+        outstanding_apr -= apr_sum[:, t] + defaulted_apr_sum[:, t]
+        outstanding_apr_time -= apr_time[:, t] + defaulted_apr_time[:, t]
+
+        total_assets = (
+            idle
+            + allocated
+            + outstanding
+            + (outstanding_apr * now - outstanding_apr_time) / interest_denominator
+        )
+
+        # LP deposits at the current share price, then withdrawal requests.
+        deposits = (
+            rng.poisson(config.deposits_per_day * day_fraction, paths)
+            * config.deposit_size
+            * rng.lognormal(0, config.deposit_size_sigma, paths)
+        )
+        supply += deposits * supply / total_assets
+        idle += deposits
+        total_assets += deposits
+        pending_shares += (
+            (supply - pending_shares)
+            * config.withdrawal_rate
+            * day_fraction
+            * rng.exponential(1, paths)
+        )
+
+        if t > 0 and t % queue_steps == 0:
+            fraction = np.where(supply > 0, pending_shares / supply, 0)
+            liquid = (idle + allocated) * fraction
+            fill_times.append(
+                _get_fill_times(
+                    principal[:, t + 1 :] + defaulted[:, t + 1 :],
+                    liquid,
+                    fraction,
+                    config.fill_fraction,
+                )
+                * step
+            )
+            # `_reallocateOnWithdrawal`: idle first, then the base allocator.
+            from_idle = np.minimum(idle, liquid)
+            idle -= from_idle
+            allocated -= liquid - from_idle
+            remaining = (1 - fraction)[:, None]
+            for cohort in cohorts:
+                cohort[:, t + 1 :] *= remaining
+            outstanding *= 1 - fraction
+            outstanding_apr *= 1 - fraction
+            outstanding_apr_time *= 1 - fraction
+            total_assets *= 1 - fraction
+            supply -= pending_shares
+            pending_shares[:] = 0
+
+        # Originations, bounded by undeployed assets (`InsufficientAssetsError`).
+        loans = rng.poisson(config.loans_per_day * day_fraction, paths)
+        volume = np.minimum(
+            loans * config.loan_size * rng.lognormal(0, config.loan_size_sigma, paths),
+            idle + allocated,
+        )
+        apr = np.maximum(
+            config.loan_apr_bps
+            + config.loan_apr_volatility_bps * rng.standard_normal(paths),
+            0,
+        )
+        net_apr = apr * (PRECISION - config.protocol_fee) / PRECISION
+        default_fraction = np.where(
+            loans > 0,
+            rng.binomial(loans, config.default_probability) / np.maximum(loans, 1),
+            0,
+        )
+        from_idle = np.minimum(idle, volume)
+        idle -= from_idle
+        allocated -= volume - from_idle
+
+        performing = volume * (1 - default_fraction)
+        window = slice(t + 1, t + 1 + loan_steps)
+        principal[:, window] += np.outer(performing, kernel)
+        apr_sum[:, window] += np.outer(performing * net_apr, kernel)
+        apr_time[:, window] += np.outer(performing * net_apr * now, kernel)
+        lost = volume * default_fraction
+        column = t + default_offset
+        defaulted[:, column] += lost
+        defaulted_apr_sum[:, column] += lost * net_apr
+        defaulted_apr_time[:, column] += lost * net_apr * now
+        proceeds[:, column] += lost * np.maximum(
+            rng.normal(config.recovery_mean, config.recovery_std, paths), 0
+        )
+        outstanding += volume
+        outstanding_apr += volume * net_apr
+        outstanding_apr_time += volume * net_apr * now
+
+        # `reallocate` whenever the idle fraction leaves the optimal range.
+        undeployed = idle + allocated
+        current = np.where(undeployed > 0, idle / np.maximum(undeployed, 1e-18), 0)
+        outside = (current < idle_min) | (current >= idle_max)
+        idle = np.where(outside, undeployed * idle_mid, idle)
+        allocated = undeployed - idle
+
+        share_price[:, t] = np.where(
+            supply > 0, total_assets / np.maximum(supply, 1e-18), 1
+        )
+        idle_fraction[:, t] = idle / np.maximum(total_assets, 1e-18)
+
+    return PathResults(
+        share_price,
+        idle_fraction,
+        np.concatenate(fill_times) if fill_times else np.empty(0),
+    )
+
+
+def run_simulation(
+    config: SimulationConfig = SimulationConfig(),
+    workers: Optional[int] = None,
+    quantiles: Sequence[float] = DEFAULT_QUANTILES,
+) -> RiskReport:
+    """Splits `config.paths` across a process pool, one independent seed per chunk."""
+    start = time.monotonic()
+    workers = max(min(workers or os.cpu_count() or 1, config.paths), 1)
+    sizes = [len(chunk) for chunk in np.array_split(np.arange(config.paths), workers)]
+    seeds = np.random.SeedSequence(config.seed).spawn(workers)
+    if workers == 1:
+        results = [simulate_paths(config, sizes[0], seeds[0])]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(
+                executor.map(simulate_paths, [config] * workers, sizes, seeds)
+            )
+    share_price = np.concatenate([r.share_price for r in results])
+    idle_fraction = np.concatenate([r.idle_fraction for r in results])
+    fill_times = np.concatenate([r.queue_fill_times for r in results])
+    fill_times = fill_times[~np.isnan(fill_times)]
+
+    final = share_price[:, -1]
+    years = config.horizon / SECONDS_PER_YEAR
+    drawdown = 1 - share_price / np.maximum.accumulate(share_price, axis=1)
+    quantiles = tuple(quantiles)
+    return RiskReport(
+        config.paths,
+        quantiles,
+        np.quantile(final, quantiles),
+        np.quantile(np.maximum(final, 0) ** (1 / years) - 1, quantiles),
+        np.quantile(drawdown.max(axis=1), quantiles),
+        np.quantile(idle_fraction.mean(axis=1), quantiles),
+        (
+            np.quantile(fill_times, quantiles)
+            if len(fill_times)
+            else np.full(len(quantiles), np.nan)
+        ),
+        time.monotonic() - start,
+    )
+
+
+def format_report(report: RiskReport) -> str:
+    lines = [
+        f"{'quantile':<22}" + "".join(f"{q:>10.2f}" for q in report.quantiles),
+    ]
+    for name, values, scale, spec in (
+        ("share price", report.final_share_price, 1, ".4f"),
+        ("annualized return %", report.annualized_return, 100, ".2f"),
+        ("max drawdown %", report.max_drawdown, 100, ".2f"),
+        ("mean idle %", report.mean_idle_fraction, 100, ".2f"),
+        ("queue fill days", report.queue_fill_time, 1 / DAY, ".1f"),
+    ):
+        lines.append(f"{name:<22}" + "".join(f"{v * scale:>10{spec}}" for v in values))
+    lines.append(f"{report.paths} paths in {report.elapsed:.1f}s")
+    return "\n".join(lines)
+
+
+def _get_fill_times(
+    schedule: np.ndarray,
+    liquid: np.ndarray,
+    fraction: np.ndarray,
+    fill_fraction: float,
+) -> np.ndarray:
+    """Steps until a queue owning `fraction` of the scheduled principal, plus
+    `liquid` paid on deployment, has received `fill_fraction` of it. NaN for paths
+    where nothing was pending."""
+    claims = schedule * fraction[:, None]
+    received = np.cumsum(claims, axis=1)
+    total = liquid + received[:, -1]
+    needed = fill_fraction * total - liquid
+    filled = received >= needed[:, None] - 1e-12
+    steps = np.where(needed <= 0, 0, filled.argmax(axis=1) + 1).astype(float)
+    steps[fraction <= 0] = np.nan
+    return steps
+
+
+if __name__ == "__main__":
+    print(format_report(run_simulation()))
@@ -0,0 +1,159 @@
+from bisect import bisect_left, insort
+from typing import Iterator, NamedTuple, Optional
+
+from florida_contracts.events import (
+    EventRegistry,
+    LoanEmitted,
+    LoanForeclosed,
+    LoanLiquidated,
+    LoanRefinanced,
+    LoanRefinancedFromNewOffers,
+    LoanRepaid,
+    LoanSentToLiquidator,
+    MinAprImprovementUpdated,
+    MinLockPeriodUpdated,
+)
+from florida_contracts.loans import (
+    DEFAULT_MIN_IMPROVEMENT_APR,
+    get_loan_locked_time,
+    get_min_beatable_apr,
+    get_unlocked_time,
+)
+from florida_contracts.structs import Loan, Tranche
+
+LOAN_EVENTS = EventRegistry(
+    [
+        LoanEmitted,
+        LoanRefinanced,
+        LoanRefinancedFromNewOffers,
+        LoanRepaid,
+        LoanLiquidated,
+        LoanForeclosed,
+        LoanSentToLiquidator,
+        MinLockPeriodUpdated,
+        MinAprImprovementUpdated,
+    ]
+)
+
+
+class TrancheRef(NamedTuple):
+    loan_id: int
+    index: int
+    tranche: Tranche
+    # Lender refis are accepted while `unlocked_at <= block.timestamp <= refinanceable_until`.
+    unlocked_at: int
+    refinanceable_until: int
+
+    def is_refinanceable(self, now: int) -> bool:
+        return self.unlocked_at <= now <= self.refinanceable_until
+
+
+class RefinanceIndex:
+    """Live tranches of a single `MultiSourceLoan`, bucketed by (collection, currency)
+    and sorted by aprBps so `beatable` is a bisect plus a scan over the matches."""
+
+    def __init__(
+        self,
+        min_lock_period: int,
+        min_improvement_apr: int = DEFAULT_MIN_IMPROVEMENT_APR,
+    ):
+        self._min_lock_period = min_lock_period
+        self._min_improvement_apr = min_improvement_apr
+        self._loans: dict[int, Loan] = {}
+        self._tranches: dict[tuple[int, int], TrancheRef] = {}
+        self._buckets: dict[tuple[str, str], list[tuple[int, int, int]]] = {}
+
+    def __len__(self) -> int:
+        return len(self._tranches)
+
+    def get_loan(self, loan_id: int) -> Optional[Loan]:
+        return self._loans.get(loan_id)
+
+    def add_loan(self, loan_id: int, loan: Loan):
+        self.remove_loan(loan_id)
+        self._loans[loan_id] = loan
+        bucket = self._buckets.setdefault(_bucket_key(loan), [])
+        for index, tranche in enumerate(loan.tranche):
+            self._tranches[(loan_id, index)] = self._get_ref(loan_id, index, loan)
+            insort(bucket, (tranche.apr_bps, loan_id, index))
+
+    def remove_loan(self, loan_id: int):
+        loan = self._loans.pop(loan_id, None)
+        if loan is None:
+            return
+        key = _bucket_key(loan)
+        bucket = self._buckets[key]
+        for index, tranche in enumerate(loan.tranche):
+            del self._tranches[(loan_id, index)]
+            del bucket[bisect_left(bucket, (tranche.apr_bps, loan_id, index))]
+        if not bucket:
+            del self._buckets[key]
+
+    def set_min_lock_period(self, min_lock_period: int):
+        self._min_lock_period = min_lock_period
+        for loan_id, loan in self._loans.items():
+            for index in range(len(loan.tranche)):
+                self._tranches[(loan_id, index)] = self._get_ref(loan_id, index, loan)
+
+    def set_min_improvement_apr(self, min_improvement_apr: int):
+        self._min_improvement_apr = min_improvement_apr
+
+    def beatable(
+        self,
+        collection: str,
+        currency: str,
+        apr_bps: int,
+        now: int,
+        max_principal: Optional[int] = None,
+    ) -> Iterator[TrancheRef]:
+        """Tranches a `refinancePartial` at `apr_bps` strictly improves on, highest apr first."""
+        bucket = self._buckets.get((collection.lower(), currency.lower()))
+        if not bucket:
+            return
+        min_apr = get_min_beatable_apr(apr_bps, self._min_improvement_apr)
+        start = bisect_left(bucket, (min_apr, 0, 0))
+        for i in range(len(bucket) - 1, start - 1, -1):
+            _, loan_id, index = bucket[i]
+            ref = self._tranches[(loan_id, index)]
+            if (
+                max_principal is not None
+                and ref.tranche.principal_amount > max_principal
+            ):
+                continue
+            if ref.is_refinanceable(now):
+                yield ref
+
+    def apply_log(self, log: dict) -> bool:
+        decoded = LOAN_EVENTS.decode_log(log)
+        if decoded is None:
+            return False
+        event, values = decoded
+        if event is LoanEmitted:
+            self.add_loan(values[0], Loan.from_abi(values[2]))
+        elif event is LoanRefinanced:
+            self.remove_loan(values[1])
+            self.add_loan(values[2], Loan.from_abi(values[3]))
+        elif event is LoanRefinancedFromNewOffers:
+            self.remove_loan(values[0])
+            self.add_loan(values[1], Loan.from_abi(values[2]))
+        elif event is MinLockPeriodUpdated:
+            self.set_min_lock_period(values[0])
+        elif event is MinAprImprovementUpdated:
+            self.set_min_improvement_apr(values[0])
+        else:
+            self.remove_loan(values[0])
+        return True
+
+    def _get_ref(self, loan_id: int, index: int, loan: Loan) -> TrancheRef:
+        tranche = loan.tranche[index]
+        return TrancheRef(
+            loan_id,
+            index,
+            tranche,
+            get_unlocked_time(tranche.start_time, loan.end_time, self._min_lock_period),
+            min(get_loan_locked_time(loan, self._min_lock_period), loan.end_time - 1),
+        )
+
+
+def _bucket_key(loan: Loan) -> tuple[str, str]:
+    return loan.nft_collateral_address.lower(), loan.principal_address.lower()
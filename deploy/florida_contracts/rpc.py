@@ -0,0 +1,89 @@
+import itertools
+import json
+import urllib.request
+from typing import Any, Optional, Sequence
+
+from eth_abi import decode, encode
+from eth_hash.auto import keccak
+
+
+class RpcError(RuntimeError):
+    pass
+
+
+def get_selector(signature: str) -> bytes:
+    return keccak(signature.encode())[:4]
+
+
+def encode_call(signature: str, types: Sequence[str], args: Sequence[Any]) -> str:
+    return "0x" + (get_selector(signature) + encode(list(types), list(args))).hex()
+
+
+def decode_result(types: Sequence[str], result: str) -> tuple[Any, ...]:
+    return decode(list(types), bytes.fromhex(result.removeprefix("0x")))
+
+
+def to_block_tag(block: Optional[int | str]) -> str:
+    if block is None:
+        return "latest"
+    return hex(block) if isinstance(block, int) else block
+
+
+class RpcClient:
+    def __init__(self, rpc_url: str, timeout: float = 30):
+        self.rpc_url = rpc_url
+        self.timeout = timeout
+        self._ids = itertools.count(1)
+
+    def call(self, method: str, params: list) -> Any:
+        return self.batch([(method, params)])[0]
+
+    def batch(
+        self, requests: Sequence[tuple[str, list]], raise_errors: bool = True
+    ) -> list[Any]:
+        """Send all requests as one JSON-RPC batch, results in request order.
+        With `raise_errors=False` failed requests come back as `RpcError` instances."""
+        if not requests:
+            return []
+        payload = [
+            {
+                "jsonrpc": "2.0",
+                "id": next(self._ids),
+                "method": method,
+                "params": params,
+            }
+            for method, params in requests
+        ]
+        responses = self._post(payload)
+        if isinstance(responses, dict):
+            # Some providers answer a rejected batch with a single error object.
+            raise RpcError(responses.get("error", responses))
+        by_id = {response["id"]: response for response in responses}
+        results = []
+        for request in payload:
+            response = by_id.get(request["id"])
+            if response is None:
+                raise RpcError(f"Missing response for {request['method']}")
+            if "error" in response:
+                error = RpcError(f"{request['method']}: {response['error']}")
+                if raise_errors:
+                    raise error
+                results.append(error)
+            else:
+                results.append(response["result"])
+        return results
+
+    def block_number(self) -> int:
+        return int(self.call("eth_blockNumber", []), 16)
+
+    def eth_call(self, to: str, data: str, block: Optional[int | str] = None) -> str:
+        return self.call("eth_call", [{"to": to, "data": data}, to_block_tag(block)])
+
+    def _post(self, payload: Any) -> Any:
+        request = urllib.request.Request(
+            self.rpc_url,
+            data=json.dumps(payload).encode(),
+            headers={"Content-Type": "application/json"},
+        )
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            return json.loads(response.read())
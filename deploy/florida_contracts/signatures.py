@@ -0,0 +1,210 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterable, NamedTuple, Optional, Sequence
+
+from eth_keys import keys
+from eth_keys.exceptions import BadSignature, ValidationError
+
+from florida_contracts.hashing import get_typed_data_hash, hash_loan_offer
+from florida_contracts.matching import SignedOffer
+from florida_contracts.rpc import RpcClient, RpcError, to_block_tag
+from florida_contracts.views import ViewAggregator, ViewCall, unwrap_results
+
+# Mirrors @openzeppelin/utils/cryptography/ECDSA.sol
+MAX_S = 0x7FFFFFFFFFFFFFFFFFFFFFFFFFFFFFFF5D576E7357A4501DDFE92F46681B20A0
+# Mirrors src/lib/loans/MultiSourceLoan.sol
+MAGICVALUE_1271 = bytes.fromhex("1626ba7e")
+
+# Below this, spinning up worker processes costs more than recovering inline.
+MIN_PARALLEL_SIGNATURES = 256
+
+
+class SignatureError(ValueError):
+    """Raised with the name of the custom error `_checkSignature` would revert with."""
+
+
+class SignatureReport(NamedTuple):
+    block: int
+    valid: tuple[SignedOffer, ...]
+    # (lender, offerId) -> error name.
+    invalid: dict[tuple[str, int], str]
+
+
+def recover(digest: bytes, signature: bytes) -> str:
+    """`ECDSA.recover(bytes32,bytes)`, lowercase address."""
+    if len(signature) != 65:
+        raise SignatureError("ECDSAInvalidSignatureLength")
+    r = int.from_bytes(signature[:32], "big")
+    s = int.from_bytes(signature[32:64], "big")
+    if s > MAX_S:
+        raise SignatureError("ECDSAInvalidSignatureS")
+    v = signature[64]
+    # The ecrecover precompile returns address(0) for any other v.
+    if v not in (27, 28):
+        raise SignatureError("ECDSAInvalidSignature")
+    try:
+        public_key = keys.Signature(
+            vrs=(v - 27, r, s)
+        ).recover_public_key_from_msg_hash(digest)
+    except (BadSignature, ValidationError):
+        raise SignatureError("ECDSAInvalidSignature")
+    return "0x" + public_key.to_canonical_address().hex()
+
+
+def check_eoa_signature(signer: str, digest: bytes, signature: bytes) -> Optional[str]:
+    """Name of the error `_checkSignature` reverts with for an EOA, None if valid."""
+    try:
+        recovered = recover(digest, signature)
+    except SignatureError as e:
+        return str(e)
+    return None if recovered == signer.lower() else "InvalidSignatureError"
+
+
+def check_eoa_signatures(
+    items: Sequence[tuple[str, bytes, bytes]], workers: Optional[int] = None
+) -> list[Optional[str]]:
+    """`check_eoa_signature` for every (signer, digest, signature), split across a
+    process pool in contiguous chunks."""
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(items) < MIN_PARALLEL_SIGNATURES:
+        return _check_chunk(items)
+    size = -(-len(items) // workers)
+    chunks = [items[i : i + size] for i in range(0, len(items), size)]
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return [
+            error for chunk in executor.map(_check_chunk, chunks) for error in chunk
+        ]
+
+
+def get_offer_digest(domain_separator: bytes, signed: SignedOffer) -> bytes:
+    return get_typed_data_hash(domain_separator, hash_loan_offer(signed.offer))
+
+
+class OfferSignatureValidator:
+    """Checks lender signatures the way `_validateOfferExecution` does, before offers
+    reach the `OfferBook`. Lenders registered as loan managers are skipped (they're
+    validated through `validateOffer`), other contracts go through ERC-1271 and
+    EOAs are recovered locally. EOA results don't depend on chain state, so they're
+    cached; contract results are checked again on every call."""
+
+    def __init__(
+        self,
+        rpc: RpcClient,
+        aggregator: ViewAggregator,
+        loan_contract: str,
+        workers: Optional[int] = None,
+    ):
+        self._rpc = rpc
+        self._aggregator = aggregator
+        self.loan_contract = loan_contract.lower()
+        self.workers = workers
+        self.domain_separator: Optional[bytes] = None
+        self.loan_manager_registry: Optional[str] = None
+        self._eoa_results: dict[tuple[str, bytes, bytes], Optional[str]] = {}
+
+    def load(self, block: Optional[int] = None) -> int:
+        block, results = self._aggregator.execute(
+            [
+                ViewCall(self.loan_contract, "DOMAIN_SEPARATOR()", (), ("bytes32",)),
+                ViewCall(
+                    self.loan_contract, "getLoanManagerRegistry()", (), ("address",)
+                ),
+            ],
+            block,
+        )
+        self.domain_separator, registry = unwrap_results(results)
+        self.loan_manager_registry = registry.lower()
+        return block
+
+    def validate(
+        self, offers: Iterable[SignedOffer], block: Optional[int] = None
+    ) -> SignatureReport:
+        if self.domain_separator is None:
+            block = self.load(block)
+        elif block is None:
+            block = self._rpc.block_number()
+        offers = list(offers)
+        signers = list(dict.fromkeys(signed.key[0] for signed in offers))
+        codes = self._rpc.batch(
+            [("eth_getCode", [signer, to_block_tag(block)]) for signer in signers]
+        )
+        contracts = [
+            signer for signer, code in zip(signers, codes) if code not in ("0x", "")
+        ]
+        contract_set = set(contracts)
+
+        errors: dict[tuple[str, int], Optional[str]] = {}
+        eoa_offers = []
+        contract_offers = []
+        for signed in offers:
+            if signed.key[0] in contract_set:
+                contract_offers.append(signed)
+            else:
+                eoa_offers.append(signed)
+
+        pending = []
+        for signed in eoa_offers:
+            cache_key = (
+                signed.key[0],
+                get_offer_digest(self.domain_separator, signed),
+                signed.signature,
+            )
+            if cache_key in self._eoa_results:
+                errors[signed.key] = self._eoa_results[cache_key]
+            else:
+                pending.append((signed, cache_key))
+        results = check_eoa_signatures([key for _, key in pending], self.workers)
+        for (signed, cache_key), error in zip(pending, results):
+            self._eoa_results[cache_key] = error
+            errors[signed.key] = error
+
+        errors.update(
+            self._check_contract_signatures(contracts, contract_offers, block)
+        )
+        valid = tuple(signed for signed in offers if errors[signed.key] is None)
+        invalid = {key: error for key, error in errors.items() if error is not None}
+        return SignatureReport(block, valid, invalid)
+
+    def _check_contract_signatures(
+        self, contracts: list[str], offers: list[SignedOffer], block: int
+    ) -> dict[tuple[str, int], Optional[str]]:
+        """Loan manager lookups and `isValidSignature` calls in a single
+        aggregated request at `block`."""
+        if not offers:
+            return {}
+        calls = [
+            ViewCall(
+                self.loan_manager_registry,
+                "isLoanManager(address)",
+                (contract,),
+                ("bool",),
+            )
+            for contract in contracts
+        ] + [
+            ViewCall(
+                signed.key[0],
+                "isValidSignature(bytes32,bytes)",
+                (get_offer_digest(self.domain_separator, signed), signed.signature),
+                ("bytes4",),
+            )
+            for signed in offers
+        ]
+        results = self._aggregator.execute(calls, block).results
+        is_loan_manager = {}
+        for contract, result in zip(contracts, results):
+            if not result.success:
+                raise RpcError(f"isLoanManager({contract}) failed: {result.value}")
+            is_loan_manager[contract] = result.value
+        errors = {}
+        for signed, result in zip(offers, results[len(contracts) :]):
+            if is_loan_manager[signed.key[0]]:
+                errors[signed.key] = None
+            elif not result.success or result.value != MAGICVALUE_1271:
+                errors[signed.key] = "InvalidSignatureError"
+            else:
+                errors[signed.key] = None
+        return errors
+
+
+def _check_chunk(items: Sequence[tuple[str, bytes, bytes]]) -> list[Optional[str]]:
+    return [check_eoa_signature(*item) for item in items]
@@ -0,0 +1,186 @@
+from typing import NamedTuple
+
+
+class Auction(NamedTuple):
+    loan_address: str
+    loan_id: int
+    highest_bid: int
+    trigger_fee: int
+    min_bid: int
+    highest_bidder: str
+    duration: int
+    asset: str
+    start_time: int
+    originator: str
+    last_bid_time: int
+
+    @property
+    def expiration(self) -> int:
+        return self.start_time + self.duration
+
+
+class Tranche(NamedTuple):
+    loan_id: int
+    floor: int
+    principal_amount: int
+    lender: str
+    accrued_interest: int
+    start_time: int
+    apr_bps: int
+
+
+class Loan(NamedTuple):
+    borrower: str
+    nft_collateral_token_id: int
+    nft_collateral_address: str
+    principal_address: str
+    principal_amount: int
+    start_time: int
+    duration: int
+    tranche: tuple[Tranche, ...]
+    protocol_fee: int
+
+    @classmethod
+    def from_abi(cls, values) -> "Loan":
+        return cls(*values[:7], tuple(Tranche(*t) for t in values[7]), values[8])
+
+    def to_abi(self) -> tuple:
+        return (*self[:7], tuple(tuple(t) for t in self.tranche), self.protocol_fee)
+
+    @property
+    def end_time(self) -> int:
+        return self.start_time + self.duration
+
+
+class OfferValidator(NamedTuple):
+    validator: str
+    arguments: bytes
+
+
+class LoanOffer(NamedTuple):
+    offer_id: int
+    lender: str
+    fee: int
+    capacity: int
+    nft_collateral_address: str
+    nft_collateral_token_id: int
+    principal_address: str
+    principal_amount: int
+    apr_bps: int
+    expiration_time: int
+    duration: int
+    max_senior_repayment: int
+    validators: tuple[OfferValidator, ...] = ()
+
+    def to_abi(self) -> tuple:
+        return (*self[:12], tuple(tuple(v) for v in self.validators))
+
+
+class OfferExecution(NamedTuple):
+    offer: LoanOffer
+    amount: int
+    lender_offer_signature: bytes = b""
+
+    def to_abi(self) -> tuple:
+        return (self.offer.to_abi(), self.amount, self.lender_offer_signature)
+
+
+class ExecutionData(NamedTuple):
+    offer_execution: tuple[OfferExecution, ...]
+    token_id: int
+    duration: int
+    expiration_time: int
+    principal_receiver: str
+    callback_data: bytes = b""
+
+    def to_abi(self) -> tuple:
+        return (
+            tuple(e.to_abi() for e in self.offer_execution),
+            *self[1:],
+        )
+
+
+class OutstandingValues(NamedTuple):
+    principal_amount: int
+    accrued_interest: int
+    sum_apr: int
+    last_ts: int
+
+
+class QueueAccounting(NamedTuple):
+    this_queue_fraction: int
+    net_pool_fraction: int
+
+
+class DeployedQueue(NamedTuple):
+    contract_address: str
+    deployed_time: int
+
+
+class CollectionData(NamedTuple):
+    value: int
+    updated: int
+
+
+class PrincipalFactors(NamedTuple):
+    floor: int
+    historical_floor: int
+
+
+class AprFactors(NamedTuple):
+    min_premium: int
+    utilization_factor: int
+
+
+class AprPremium(NamedTuple):
+    value: int
+    updated_ts: int
+
+
+class LoanExecutionData(NamedTuple):
+    execution_data: ExecutionData
+    borrower: str
+    borrower_offer_signature: bytes = b""
+
+    def to_abi(self) -> tuple:
+        return (self.execution_data.to_abi(), *self[1:])
+
+
+class SignableRepaymentData(NamedTuple):
+    loan_id: int
+    callback_data: bytes = b""
+    should_delegate: bool = False
+
+
+class LoanRepaymentData(NamedTuple):
+    data: SignableRepaymentData
+    loan: Loan
+    borrower_signature: bytes = b""
+
+    def to_abi(self) -> tuple:
+        return (tuple(self.data), self.loan.to_abi(), self.borrower_signature)
+
+
+class RenegotiationOffer(NamedTuple):
+    renegotiation_id: int
+    loan_id: int
+    lender: str
+    fee: int
+    tranche_index: tuple[int, ...]
+    principal_amount: int
+    apr_bps: int
+    expiration_time: int
+    duration: int
+
+
+class Fees(NamedTuple):
+    # `FeeManager.PRECISION` (1e20) units.
+    management_fee: int
+    performance_fee: int
+
+
+class OptimalIdleRange(NamedTuple):
+    # `Pool.PRINCIPAL_PRECISION` (1e20) units, `mid` is set by the pool.
+    min: int
+    max: int
+    mid: int = 0
@@ -0,0 +1,146 @@
+from typing import Iterable, NamedTuple, Optional
+
+import numpy as np
+from eth_abi import decode, encode
+
+from florida_contracts.structs import LoanOffer, OfferValidator
+
+# EIP-2028 calldata costs.
+ZERO_BYTE_GAS = 4
+NON_ZERO_BYTE_GAS = 16
+
+BIT_VECTOR = "bit_vector"
+PACKED_LIST = "packed_list"
+RANGE = "range"
+
+# A bit vector this long costs more calldata gas than a block holds.
+_MAX_BIT_VECTOR_TOKEN_ID = 2**26
+
+
+class TokenSetEncoding(NamedTuple):
+    kind: str
+    validator: OfferValidator
+    calldata_gas: int
+
+
+def get_calldata_gas(data: bytes) -> int:
+    zeros = data.count(0)
+    return zeros * ZERO_BYTE_GAS + (len(data) - zeros) * NON_ZERO_BYTE_GAS
+
+
+def get_validator_calldata_gas(validator: OfferValidator) -> int:
+    return get_calldata_gas(
+        encode(["address", "bytes"], [validator.validator, validator.arguments])
+    )
+
+
+def encode_bit_vector(token_ids: np.ndarray) -> bytes:
+    # `validateNFTBitVector` checks `bitVector[id >> 3] & (0x80 >> (id & 7))`,
+    # i.e. MSB first within each byte, which is numpy's default bit order.
+    bits = np.zeros((int(token_ids[-1]) >> 3) + 1 << 3, dtype=np.bool_)
+    bits[token_ids] = True
+    return np.packbits(bits).tobytes()
+
+
+def encode_packed_list(token_ids: np.ndarray | list[int]) -> tuple[int, bytes]:
+    # Sorted, fixed width, big endian: what `validateTokenIdPackedList` binary searches.
+    bytes_per_token_id = max((int(token_ids[-1]).bit_length() + 7) >> 3, 1)
+    if isinstance(token_ids, np.ndarray):
+        packed = token_ids.astype(">u8").view(np.uint8).reshape(-1, 8)
+        return bytes_per_token_id, packed[:, 8 - bytes_per_token_id :].tobytes()
+    return bytes_per_token_id, b"".join(
+        token_id.to_bytes(bytes_per_token_id, "big") for token_id in token_ids
+    )
+
+
+class TokenSetValidators(NamedTuple):
+    bit_vector: Optional[str] = None
+    packed_list: Optional[str] = None
+    range: Optional[str] = None
+
+    def encode_all(self, token_ids: Iterable[int]) -> list[TokenSetEncoding]:
+        ids = _normalize(token_ids)
+        if not len(ids):
+            raise ValueError("Empty token set")
+        low, high = int(ids[0]), int(ids[-1])
+        encodings = []
+        if self.range and high - low + 1 == len(ids):
+            encodings.append(
+                self._encoding(
+                    RANGE, self.range, encode(["uint256", "uint256"], [low, high])
+                )
+            )
+        if self.bit_vector and high < _MAX_BIT_VECTOR_TOKEN_ID:
+            encodings.append(
+                self._encoding(BIT_VECTOR, self.bit_vector, encode_bit_vector(ids))
+            )
+        if self.packed_list:
+            bytes_per_token_id, packed = encode_packed_list(ids)
+            encodings.append(
+                self._encoding(
+                    PACKED_LIST,
+                    self.packed_list,
+                    encode(["uint64", "bytes"], [bytes_per_token_id, packed]),
+                )
+            )
+        return encodings
+
+    def encode(self, token_ids: Iterable[int]) -> TokenSetEncoding:
+        """Cheapest (calldata gas) validator accepting exactly `token_ids`."""
+        encodings = self.encode_all(token_ids)
+        if not encodings:
+            raise ValueError("No validator can encode this token set")
+        return min(encodings, key=lambda e: e.calldata_gas)
+
+    def check(self, offer: LoanOffer, token_id: int) -> bool:
+        """`ValidatorCheck` for `OfferBook`: evaluates the offer's validators locally."""
+        return all(self._validates(v, token_id) for v in offer.validators)
+
+    def _validates(self, validator: OfferValidator, token_id: int) -> bool:
+        address = validator.validator.lower()
+        if self.range and address == self.range.lower():
+            low, high = decode(["uint256", "uint256"], validator.arguments)
+            return low <= token_id <= high
+        if self.bit_vector and address == self.bit_vector.lower():
+            bit_vector = validator.arguments
+            return token_id < len(bit_vector) << 3 and bool(
+                bit_vector[token_id >> 3] & (0x80 >> (token_id & 7))
+            )
+        if self.packed_list and address == self.packed_list.lower():
+            bytes_per_token_id, packed = decode(
+                ["uint64", "bytes"], validator.arguments
+            )
+            if not 0 < bytes_per_token_id <= 32 or not packed:
+                return False
+            if token_id >> (bytes_per_token_id << 3):
+                return False
+            target = token_id.to_bytes(bytes_per_token_id, "big")
+            left, right = 0, len(packed) // bytes_per_token_id
+            while left < right:
+                mid = (left + right) >> 1
+                value = packed[
+                    mid * bytes_per_token_id : (mid + 1) * bytes_per_token_id
+                ]
+                if value < target:
+                    left = mid + 1
+                else:
+                    right = mid
+            return (
+                packed[left * bytes_per_token_id : (left + 1) * bytes_per_token_id]
+                == target
+            )
+        return False
+
+    @staticmethod
+    def _encoding(kind: str, address: str, arguments: bytes) -> TokenSetEncoding:
+        validator = OfferValidator(address, arguments)
+        return TokenSetEncoding(kind, validator, get_validator_calldata_gas(validator))
+
+
+def _normalize(token_ids: Iterable[int]) -> np.ndarray | list[int]:
+    if isinstance(token_ids, np.ndarray):
+        return np.unique(token_ids.astype(np.uint64))
+    token_ids = list(token_ids)
+    if token_ids and max(token_ids) < 2**63 and min(token_ids) >= 0:
+        return np.unique(np.asarray(token_ids, dtype=np.uint64))
+    return sorted(set(token_ids))
@@ -2,6 +2,8 @@ import os
 import re
 import subprocess
 
+import yaml
+
 VALID_URLS = {
     "http://127.0.0.1:8545",
     "http://localhost:8545",
@@ -30,6 +32,13 @@ def get_network_params(network):
     return variables
 
 
+def get_deployed_addresses(network, directory="."):
+    if network not in NETWORK_MAPPER:
+        raise KeyError(f"{network} not found.")
+    with open(os.path.join(directory, f"deployed_{network}.yml")) as f:
+        return yaml.load(f, Loader=yaml.Loader)
+
+
 def get_deployed_address(output):
     return re.findall("Deployed to: (.*)", output.stdout)[0]
 
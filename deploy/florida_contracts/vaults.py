@@ -0,0 +1,253 @@
+from typing import NamedTuple, Optional, Sequence
+
+from florida_contracts.events import Event, EventRegistry
+from florida_contracts.rpc import encode_call
+from florida_contracts.views import get_arg_types
+
+# Mirrors src/lib/UserVault.sol
+ETH = "0xeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeee"
+
+ERC721Deposited = Event("ERC721Deposited", ("uint256", "address", "uint256"))
+ERC721Withdrawn = Event("ERC721Withdrawn", ("uint256", "address", "uint256"))
+OldERC721Deposited = Event("OldERC721Deposited", ("uint256", "address", "uint256"))
+OldERC721Withdrawn = Event("OldERC721Withdrawn", ("uint256", "address", "uint256"))
+ERC20Deposited = Event("ERC20Deposited", ("uint256", "address", "uint256"))
+ERC20Withdrawn = Event("ERC20Withdrawn", ("uint256", "address", "uint256"))
+
+VAULT_EVENTS = EventRegistry(
+    [
+        ERC721Deposited,
+        ERC721Withdrawn,
+        OldERC721Deposited,
+        OldERC721Withdrawn,
+        ERC20Deposited,
+        ERC20Withdrawn,
+    ]
+)
+
+
+class VaultContents(NamedTuple):
+    erc721s: frozenset[tuple[str, int]]
+    old_erc721s: frozenset[tuple[str, int]]
+    # token -> amount, `ETH` for native balance.
+    erc20s: dict[str, int]
+
+
+class _Vault:
+    __slots__ = ("erc721s", "old_erc721s", "erc20s")
+
+    def __init__(self):
+        self.erc721s: set[tuple[str, int]] = set()
+        self.old_erc721s: set[tuple[str, int]] = set()
+        self.erc20s: dict[str, int] = {}
+
+
+class VaultIndex:
+    """Contents of every `UserVault` vault, rebuilt from its events. Membership and
+    owner lookups are O(1); `get_contents` copies the vault's current holdings."""
+
+    def __init__(self):
+        self._vaults: dict[int, _Vault] = {}
+        self._erc721_owners: dict[tuple[str, int], int] = {}
+        self._old_erc721_owners: dict[tuple[str, int], int] = {}
+
+    def __len__(self) -> int:
+        return len(self._vaults)
+
+    def get_contents(self, vault_id: int) -> VaultContents:
+        vault = self._vaults.get(vault_id)
+        if vault is None:
+            return VaultContents(frozenset(), frozenset(), {})
+        return VaultContents(
+            frozenset(vault.erc721s), frozenset(vault.old_erc721s), dict(vault.erc20s)
+        )
+
+    def get_erc721_vault(self, collection: str, token_id: int) -> Optional[int]:
+        return self._erc721_owners.get((collection.lower(), token_id))
+
+    def get_old_erc721_vault(self, collection: str, token_id: int) -> Optional[int]:
+        return self._old_erc721_owners.get((collection.lower(), token_id))
+
+    def get_erc20_balance(self, vault_id: int, token: str) -> int:
+        vault = self._vaults.get(vault_id)
+        return vault.erc20s.get(token.lower(), 0) if vault is not None else 0
+
+    def apply_log(self, log: dict) -> bool:
+        decoded = VAULT_EVENTS.decode_log(log)
+        if decoded is None:
+            return False
+        event, (vault_id, asset, value) = decoded
+        vault = self._vaults.setdefault(vault_id, _Vault())
+        key = (asset, value)
+        if event is ERC721Deposited:
+            vault.erc721s.add(key)
+            self._erc721_owners[key] = vault_id
+        elif event is ERC721Withdrawn:
+            vault.erc721s.discard(key)
+            self._erc721_owners.pop(key, None)
+        elif event is OldERC721Deposited:
+            vault.old_erc721s.add(key)
+            self._old_erc721_owners[key] = vault_id
+        elif event is OldERC721Withdrawn:
+            vault.old_erc721s.discard(key)
+            self._old_erc721_owners.pop(key, None)
+        elif event is ERC20Deposited:
+            vault.erc20s[asset] = vault.erc20s.get(asset, 0) + value
+        else:
+            # Withdrawals always take the whole balance.
+            vault.erc20s.pop(asset, None)
+        return True
+
+
+class VaultGasModel(NamedTuple):
+    """Upper bound estimates, override with measured values for a given chain."""
+
+    transaction: int = 21_000
+    # Per call: vault checks, whitelist lookup and calldata head.
+    call: int = 15_000
+    erc721_deposit: int = 60_000
+    old_erc721_deposit: int = 80_000
+    erc721_withdrawal: int = 45_000
+    old_erc721_withdrawal: int = 50_000
+    erc20_withdrawal: int = 40_000
+    # `burnAndWithdraw` burns the vault and always tries to send ETH.
+    burn: int = 40_000
+
+
+class PlannedCall(NamedTuple):
+    signature: str
+    args: tuple
+    gas: int
+
+    @property
+    def data(self) -> str:
+        return encode_call(self.signature, get_arg_types(self.signature), self.args)
+
+
+def plan_deposits(
+    vault_id: int,
+    erc721s: Sequence[tuple[str, int]] = (),
+    old_erc721s: Sequence[tuple[str, int]] = (),
+    max_gas: int = 15_000_000,
+    gas_model: VaultGasModel = VaultGasModel(),
+) -> list[PlannedCall]:
+    """`depositERC721s`/`depositOldERC721s` calls, one collection per call, each
+    holding as many tokens as fit under `max_gas`."""
+    calls = []
+    for signature, items, item_gas in (
+        (
+            "depositERC721s(uint256,address,uint256[])",
+            erc721s,
+            gas_model.erc721_deposit,
+        ),
+        (
+            "depositOldERC721s(uint256,address,uint256[])",
+            old_erc721s,
+            gas_model.old_erc721_deposit,
+        ),
+    ):
+        by_collection: dict[str, list[int]] = {}
+        for collection, token_id in items:
+            by_collection.setdefault(collection, []).append(token_id)
+        per_call = _get_capacity(max_gas, gas_model, item_gas)
+        for collection, token_ids in by_collection.items():
+            for i in range(0, len(token_ids), per_call):
+                chunk = token_ids[i : i + per_call]
+                calls.append(
+                    PlannedCall(
+                        signature,
+                        (vault_id, collection, chunk),
+                        _get_gas(gas_model, item_gas, len(chunk)),
+                    )
+                )
+    return calls
+
+
+def plan_withdrawals(
+    vault_id: int,
+    contents: VaultContents,
+    max_gas: int = 15_000_000,
+    gas_model: VaultGasModel = VaultGasModel(),
+) -> list[PlannedCall]:
+    """Empties a vault. Withdrawals require the vault to be burnt by the caller, so
+    the first call is a `burnAndWithdraw` packed with as much as fits, the rest
+    goes out through `withdrawERC721s`/`withdrawOldERC721s`/`withdrawERC20s`."""
+    erc721s = sorted(contents.erc721s)
+    old_erc721s = sorted(contents.old_erc721s)
+    tokens = sorted(token for token in contents.erc20s if token != ETH)
+
+    budget = max_gas - gas_model.transaction - gas_model.call - gas_model.burn
+    if budget < 0:
+        raise ValueError(f"max_gas {max_gas} can't fit burnAndWithdraw")
+    first = []
+    for items, item_gas in (
+        (erc721s, gas_model.erc721_withdrawal),
+        (old_erc721s, gas_model.old_erc721_withdrawal),
+        (tokens, gas_model.erc20_withdrawal),
+    ):
+        count = min(len(items), budget // item_gas)
+        budget -= count * item_gas
+        first.append(count)
+    calls = [
+        PlannedCall(
+            "burnAndWithdraw(uint256,address[],uint256[],address[],uint256[],address[])",
+            (
+                vault_id,
+                *_split(erc721s[: first[0]]),
+                *_split(old_erc721s[: first[1]]),
+                tokens[: first[2]],
+            ),
+            max_gas - budget,
+        )
+    ]
+
+    for signature, items, item_gas, start in (
+        (
+            "withdrawERC721s(uint256,address[],uint256[])",
+            erc721s,
+            gas_model.erc721_withdrawal,
+            first[0],
+        ),
+        (
+            "withdrawOldERC721s(uint256,address[],uint256[])",
+            old_erc721s,
+            gas_model.old_erc721_withdrawal,
+            first[1],
+        ),
+    ):
+        per_call = _get_capacity(max_gas, gas_model, item_gas)
+        for i in range(start, len(items), per_call):
+            chunk = items[i : i + per_call]
+            calls.append(
+                PlannedCall(
+                    signature,
+                    (vault_id, *_split(chunk)),
+                    _get_gas(gas_model, item_gas, len(chunk)),
+                )
+            )
+    per_call = _get_capacity(max_gas, gas_model, gas_model.erc20_withdrawal)
+    for i in range(first[2], len(tokens), per_call):
+        chunk = tokens[i : i + per_call]
+        calls.append(
+            PlannedCall(
+                "withdrawERC20s(uint256,address[])",
+                (vault_id, chunk),
+                _get_gas(gas_model, gas_model.erc20_withdrawal, len(chunk)),
+            )
+        )
+    return calls
+
+
+def _get_capacity(max_gas: int, gas_model: VaultGasModel, item_gas: int) -> int:
+    capacity = (max_gas - gas_model.transaction - gas_model.call) // item_gas
+    if capacity < 1:
+        raise ValueError(f"max_gas {max_gas} can't fit a single item")
+    return capacity
+
+
+def _get_gas(gas_model: VaultGasModel, item_gas: int, items: int) -> int:
+    return gas_model.transaction + gas_model.call + item_gas * items
+
+
+def _split(items: Sequence[tuple[str, int]]) -> tuple[list[str], list[int]]:
+    return [collection for collection, _ in items], [token_id for _, token_id in items]
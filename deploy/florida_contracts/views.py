@@ -0,0 +1,347 @@
+import urllib.error
+from typing import Any, Iterable, NamedTuple, Optional, Sequence
+
+from florida_contracts.rpc import (
+    RpcClient,
+    RpcError,
+    decode_result,
+    encode_call,
+    to_block_tag,
+)
+from florida_contracts.structs import DeployedQueue, OutstandingValues, QueueAccounting
+
+# Deployed at the same address on mainnet and most testnets. Not part of a local
+# deployment, so the aggregator falls back to plain JSON-RPC batches without it.
+MULTICALL3_ADDRESS = "0xcA11bde05977b3631167028862bE2a173976CA11"
+AGGREGATE3 = "aggregate3((address,bool,bytes)[])"
+AGGREGATE3_RESULT = "(bool,bytes)[]"
+
+DEFAULT_MAX_BATCH_SIZE = 100
+DEFAULT_MAX_MULTICALL_SIZE = 500
+
+
+class ViewCall(NamedTuple):
+    to: str
+    signature: str
+    args: tuple = ()
+    returns: tuple[str, ...] = ("uint256",)
+    # Optional NamedTuple the (single) returned tuple is wrapped in.
+    struct: Optional[type] = None
+
+    @property
+    def data(self) -> str:
+        return encode_call(self.signature, get_arg_types(self.signature), self.args)
+
+    def decode(self, result: str) -> Any:
+        values = decode_result(self.returns, result)
+        value = values[0] if len(values) == 1 else values
+        return self.struct(*value) if self.struct is not None else value
+
+
+class CallResult(NamedTuple):
+    success: bool
+    # Decoded return value on success, the error (or raw revert data) otherwise.
+    value: Any
+
+
+class ViewResults(NamedTuple):
+    block: int
+    results: tuple[CallResult, ...]
+
+
+def get_arg_types(signature: str) -> list[str]:
+    inner = signature[signature.index("(") + 1 : -1]
+    types, depth, start = [], 0, 0
+    for i, char in enumerate(inner):
+        if char == "(":
+            depth += 1
+        elif char == ")":
+            depth -= 1
+        elif char == "," and depth == 0:
+            types.append(inner[start:i])
+            start = i + 1
+    if inner:
+        types.append(inner[start:])
+    return types
+
+
+class ViewAggregator:
+    """Runs many view calls pinned to a single block. Calls go out as JSON-RPC
+    batches of `eth_call`, or packed into Multicall3 `aggregate3` calls when
+    `multicall_address` is set. Batches the provider rejects are split in half
+    and `max_batch_size` shrinks accordingly for the following requests."""
+
+    def __init__(
+        self,
+        rpc: RpcClient,
+        max_batch_size: int = DEFAULT_MAX_BATCH_SIZE,
+        multicall_address: Optional[str] = None,
+        max_multicall_size: int = DEFAULT_MAX_MULTICALL_SIZE,
+    ):
+        self._rpc = rpc
+        self.max_batch_size = max_batch_size
+        self._multicall_address = multicall_address
+        self._max_multicall_size = max_multicall_size
+
+    def execute(
+        self, calls: Sequence[ViewCall], block: Optional[int] = None
+    ) -> ViewResults:
+        if block is None:
+            block = self._rpc.block_number()
+        if self._multicall_address is None:
+            results = self._execute_batches(calls, block)
+        else:
+            results = self._execute_multicalls(calls, block)
+        return ViewResults(block, tuple(results))
+
+    def _execute_batches(
+        self, calls: Sequence[ViewCall], block: int
+    ) -> list[CallResult]:
+        raw = self._send([(call.to, call.data) for call in calls], block)
+        results = []
+        for call, result in zip(calls, raw):
+            if isinstance(result, RpcError):
+                results.append(CallResult(False, result))
+            else:
+                results.append(_decode(call, result))
+        return results
+
+    def _execute_multicalls(
+        self, calls: Sequence[ViewCall], block: int
+    ) -> list[CallResult]:
+        chunks = [
+            calls[i : i + self._max_multicall_size]
+            for i in range(0, len(calls), self._max_multicall_size)
+        ]
+        results = []
+        for chunk, result in zip(chunks, self._send_multicalls(chunks, block)):
+            results.extend(result)
+        return results
+
+    def _send_multicalls(
+        self, chunks: list[Sequence[ViewCall]], block: int
+    ) -> list[list[CallResult]]:
+        aggregates = [
+            ViewCall(
+                self._multicall_address,
+                AGGREGATE3,
+                ([(call.to, True, bytes.fromhex(call.data[2:])) for call in chunk],),
+                (AGGREGATE3_RESULT,),
+            )
+            for chunk in chunks
+        ]
+        raw = self._send([(call.to, call.data) for call in aggregates], block)
+        results = []
+        for chunk, aggregate, result in zip(chunks, aggregates, raw):
+            if not isinstance(result, RpcError):
+                results.append(
+                    [
+                        (
+                            _decode(call, "0x" + data.hex())
+                            if success
+                            else CallResult(False, data)
+                        )
+                        for call, (success, data) in zip(
+                            chunk, aggregate.decode(result)
+                        )
+                    ]
+                )
+            elif len(chunk) > 1:
+                # Most likely over the provider gas cap for eth_call.
+                half = len(chunk) // 2
+                split = self._send_multicalls([chunk[:half], chunk[half:]], block)
+                results.append(split[0] + split[1])
+            else:
+                results.append([CallResult(False, result)])
+        return results
+
+    def _send(self, calls: Sequence[tuple[str, str]], block: int) -> list[Any]:
+        results = []
+        start = 0
+        while start < len(calls):
+            chunk = calls[start : start + self.max_batch_size]
+            try:
+                results.extend(
+                    self._rpc.batch(
+                        [
+                            (
+                                "eth_call",
+                                [{"to": to, "data": data}, to_block_tag(block)],
+                            )
+                            for to, data in chunk
+                        ],
+                        raise_errors=False,
+                    )
+                )
+            except (RpcError, urllib.error.HTTPError):
+                if len(chunk) == 1:
+                    raise
+                self.max_batch_size = max(len(chunk) // 2, 1)
+                continue
+            start += len(chunk)
+        return results
+
+
+def _decode(call: ViewCall, result: str) -> CallResult:
+    try:
+        return CallResult(True, call.decode(result))
+    except Exception as e:
+        # e.g. empty return data from a call to an address without code.
+        return CallResult(False, e)
+
+
+def total_assets(pool: str) -> ViewCall:
+    return ViewCall(pool, "totalAssets()")
+
+
+def get_undeployed_assets(pool: str) -> ViewCall:
+    return ViewCall(pool, "getUndeployedAssets()")
+
+
+def get_outstanding_values(pool: str) -> ViewCall:
+    return ViewCall(
+        pool,
+        "getOutstandingValues()",
+        returns=("(uint128,uint128,uint128,uint128)",),
+        struct=OutstandingValues,
+    )
+
+
+def get_pending_queue_index(pool: str) -> ViewCall:
+    return ViewCall(pool, "getPendingQueueIndex()")
+
+
+def get_max_total_withdrawal_queues(pool: str) -> ViewCall:
+    return ViewCall(pool, "getMaxTotalWithdrawalQueues()")
+
+
+def get_deployed_queue(pool: str, index: int) -> ViewCall:
+    return ViewCall(
+        pool,
+        "getDeployedQueue(uint256)",
+        (index,),
+        ("(address,uint96)",),
+        DeployedQueue,
+    )
+
+
+def get_outstanding_values_for_queue(pool: str, index: int) -> ViewCall:
+    return ViewCall(
+        pool,
+        "getOutstandingValuesForQueue(uint256)",
+        (index,),
+        ("(uint128,uint128,uint128,uint128)",),
+        OutstandingValues,
+    )
+
+
+def get_accounting_values_for_queue(pool: str, index: int) -> ViewCall:
+    return ViewCall(
+        pool,
+        "getAccountingValuesForQueue(uint256)",
+        (index,),
+        ("(uint128,uint128)",),
+        QueueAccounting,
+    )
+
+
+def get_next_token_id(withdrawal_queue: str) -> ViewCall:
+    return ViewCall(withdrawal_queue, "getNextTokenId()")
+
+
+def get_available(withdrawal_queue: str, token_id: int) -> ViewCall:
+    return ViewCall(withdrawal_queue, "getAvailable(uint256)", (token_id,))
+
+
+class QueueSnapshot(NamedTuple):
+    index: int
+    deployed_queue: DeployedQueue
+    outstanding_values: OutstandingValues
+    accounting_values: QueueAccounting
+
+
+class PoolSnapshot(NamedTuple):
+    pool: str
+    block: int
+    total_assets: int
+    undeployed_assets: int
+    outstanding_values: OutstandingValues
+    pending_queue_index: int
+    queues: tuple[QueueSnapshot, ...]
+
+
+def get_pool_snapshots(
+    aggregator: ViewAggregator, pools: Iterable[str], block: Optional[int] = None
+) -> list[PoolSnapshot]:
+    """Pool accounting and every withdrawal queue slot, all read at the same block."""
+    pools = list(pools)
+    per_pool = [
+        total_assets,
+        get_undeployed_assets,
+        get_outstanding_values,
+        get_pending_queue_index,
+        get_max_total_withdrawal_queues,
+    ]
+    block, results = aggregator.execute(
+        [call(pool) for pool in pools for call in per_pool], block
+    )
+    values = unwrap_results(results)
+    pool_values = [
+        values[i : i + len(per_pool)] for i in range(0, len(values), len(per_pool))
+    ]
+
+    per_queue = [
+        get_deployed_queue,
+        get_outstanding_values_for_queue,
+        get_accounting_values_for_queue,
+    ]
+    # Slots go up to and including `getMaxTotalWithdrawalQueues` (the next queue to activate).
+    queue_calls = [
+        call(pool, index)
+        for pool, pool_value in zip(pools, pool_values)
+        for index in range(pool_value[4] + 1)
+        for call in per_queue
+    ]
+    queue_values = iter(unwrap_results(aggregator.execute(queue_calls, block).results))
+
+    snapshots = []
+    for pool, pool_value in zip(pools, pool_values):
+        queues = tuple(
+            QueueSnapshot(
+                index, next(queue_values), next(queue_values), next(queue_values)
+            )
+            for index in range(pool_value[4] + 1)
+        )
+        snapshots.append(PoolSnapshot(pool, block, *pool_value[:4], queues))
+    return snapshots
+
+
+def get_withdrawal_availability(
+    aggregator: ViewAggregator,
+    withdrawal_queues: Iterable[str],
+    block: Optional[int] = None,
+) -> dict[tuple[str, int], int]:
+    """`getAvailable` for every position minted so far by each queue, keyed by
+    (queue, tokenId)."""
+    withdrawal_queues = list(withdrawal_queues)
+    block, results = aggregator.execute(
+        [get_next_token_id(queue) for queue in withdrawal_queues], block
+    )
+    positions = [
+        (queue, token_id)
+        for queue, next_token_id in zip(withdrawal_queues, unwrap_results(results))
+        for token_id in range(next_token_id)
+    ]
+    results = aggregator.execute(
+        [get_available(queue, token_id) for queue, token_id in positions], block
+    ).results
+    return dict(zip(positions, unwrap_results(results)))
+
+
+def unwrap_results(results: Iterable[CallResult]) -> list[Any]:
+    values = []
+    for success, value in results:
+        if not success:
+            raise RpcError(f"View call failed: {value}")
+        values.append(value)
+    return values
@@ -0,0 +1,124 @@
+import pytest
+from eth_abi import encode
+
+from florida_contracts.auctions import (
+    AuctionBook,
+    TimeForMainLenderToBuyUpdated,
+    get_deadline,
+    get_min_bid,
+)
+from florida_contracts.events import (
+    AuctionSettled,
+    BidPlaced,
+    Event,
+    LoanLiquidationStarted,
+)
+from florida_contracts.structs import Auction
+
+COLLECTION = "0x00000000000000000000000000000000000000c0"
+BIDDER = "0x00000000000000000000000000000000000000b1"
+ZERO = "0x" + "00" * 20
+START = 1000
+DURATION = 3 * 24 * 3600
+EXPIRATION = START + DURATION
+MAX_EXTENSION = 24 * 3600
+
+
+def make_auction(highest_bid: int = 0, last_bid_time: int = 0) -> Auction:
+    return Auction(
+        ZERO,
+        1,
+        highest_bid,
+        100,
+        100,
+        BIDDER if highest_bid else ZERO,
+        DURATION,
+        ZERO,
+        START,
+        ZERO,
+        last_bid_time,
+    )
+
+
+def make_log(event: Event, *values) -> dict:
+    return {"topics": [event.topic], "data": "0x" + encode(event.types, values).hex()}
+
+
+def test_get_min_bid():
+    # `_placeBidChecks`: bid >= minBid and highestBid * 10500 / 10000 < bid.
+    assert get_min_bid(make_auction()) == 100
+    assert get_min_bid(make_auction(100)) == 106
+    assert get_min_bid(make_auction(1000)) == 1051
+
+
+def test_get_deadline():
+    # Ten minutes after the last bid, past the expiration but within the extension.
+    assert get_deadline(make_auction(100, EXPIRATION - 100), MAX_EXTENSION) == (
+        EXPIRATION + 500
+    )
+    assert get_deadline(make_auction(100, START + 1), MAX_EXTENSION) == EXPIRATION
+    assert get_deadline(
+        make_auction(100, EXPIRATION + MAX_EXTENSION - 100), MAX_EXTENSION
+    ) == (EXPIRATION + MAX_EXTENSION)
+
+
+def test_auction_book_bids():
+    book = AuctionBook(MAX_EXTENSION)
+    # Keys are case insensitive, logs decode to checksummed addresses.
+    book.liquidation_started(
+        "0x00000000000000000000000000000000000000C0", 7, make_auction()
+    )
+    assert (COLLECTION, 7) in book
+
+    quote = book.quote(COLLECTION, 7)
+    assert (quote.min_bid, quote.opens_at, quote.deadline) == (100, START, None)
+    # Without bids `placeBid` has no time limit.
+    assert quote.accepts(100, EXPIRATION + MAX_EXTENSION)
+    assert not quote.accepts(99, START)
+
+    book.bid_placed(COLLECTION, 7, BIDDER, 200, EXPIRATION - 100)
+    quote = book.quote(COLLECTION, 7)
+    assert (quote.min_bid, quote.deadline) == (211, EXPIRATION + 500)
+    assert quote.accepts(211, EXPIRATION + 499)
+    assert not quote.accepts(211, EXPIRATION + 500)
+    assert [key for key, _ in book.open_auctions(EXPIRATION + 499)] == [(COLLECTION, 7)]
+    assert list(book.open_auctions(EXPIRATION + 500)) == []
+
+    book.settled(COLLECTION, 7)
+    assert len(book) == 0
+    # Bids on auctions started before tracking are ignored.
+    book.bid_placed(COLLECTION, 8, BIDDER, 200, START)
+    assert len(book) == 0
+
+
+def test_auction_book_buyout_window():
+    book = AuctionBook(MAX_EXTENSION, time_for_main_lender_to_buy=3600)
+    book.liquidation_started(COLLECTION, 7, make_auction())
+    # `OptionToBuyStilValidError` while startTime + timeForMainLenderToBuy > now.
+    assert not book.quote(COLLECTION, 7).is_open(START + 3599)
+    assert book.quote(COLLECTION, 7).is_open(START + 3600)
+
+    book.set_time_for_main_lender_to_buy(60)
+    assert book.quote(COLLECTION, 7).opens_at == START + 60
+
+
+def test_auction_book_apply_log():
+    book = AuctionBook(MAX_EXTENSION)
+    assert book.apply_log(
+        make_log(LoanLiquidationStarted, COLLECTION, 7, make_auction())
+    )
+    assert book.apply_log(
+        make_log(BidPlaced, COLLECTION, 7, BIDDER, 200, ZERO, 1), EXPIRATION - 100
+    )
+    auction = book.get_auction(COLLECTION, 7)
+    assert (auction.highest_bidder.lower(), auction.highest_bid) == (BIDDER, 200)
+    assert auction.last_bid_time == EXPIRATION - 100
+
+    assert book.apply_log(make_log(TimeForMainLenderToBuyUpdated, 60))
+    assert book.quote(COLLECTION, 7).opens_at == START + 60
+    assert not book.apply_log({"topics": ["0x" + "00" * 32], "data": "0x"})
+
+    assert book.apply_log(
+        make_log(AuctionSettled, ZERO, 1, COLLECTION, 7, ZERO, 190, BIDDER, 5)
+    )
+    assert len(book) == 0
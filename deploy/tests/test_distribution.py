@@ -0,0 +1,129 @@
+from eth_abi import encode
+
+from florida_contracts.distribution import (
+    TRANSFER_TOPIC,
+    Liquidation,
+    Mismatch,
+    TokenTransfer,
+    get_payouts,
+    reconcile,
+)
+from florida_contracts.events import AuctionSettled
+from florida_contracts.structs import Loan, Tranche
+
+LOAN_ADDRESS = "0x00000000000000000000000000000000000000a0"
+BORROWER = "0x00000000000000000000000000000000000000b0"
+COLLECTION = "0x00000000000000000000000000000000000000c0"
+CURRENCY = "0x00000000000000000000000000000000000000e0"
+LENDER = "0x00000000000000000000000000000000000000d1"
+LOAN_MANAGER = "0x00000000000000000000000000000000000000d2"
+YEAR = 31536000
+
+
+def make_loan() -> Loan:
+    # Pending interest to the end of the loan: 100 * 10% = 10 for the first
+    # tranche, 50 * 20% for half a year = 5 for the second. Owed 115 and 55,
+    # 150 + 5 + 15 = 170 in total.
+    return Loan(
+        BORROWER,
+        1,
+        COLLECTION,
+        CURRENCY,
+        150,
+        0,
+        YEAR,
+        (
+            Tranche(1, 0, 100, LENDER, 5, 0, 1000),
+            Tranche(1, 0, 50, LOAN_MANAGER, 0, YEAR // 2, 2000),
+        ),
+        0,
+    )
+
+
+def get_amounts(liquidations: list[Liquidation]) -> list[tuple[int, int, int]]:
+    return [
+        (payout.loan_id, payout.tranche_index, payout.amount)
+        for payout in get_payouts(liquidations, [LOAN_MANAGER])
+    ]
+
+
+def test_get_payouts():
+    loan = make_loan()
+    liquidations = [
+        # `_handleTrancheExcess`: 30 excess split 115 : 55, rounded down.
+        Liquidation(LOAN_ADDRESS, 1, loan, 200, "0x01"),
+        # `_handleTrancheInsufficient`, in tranche order until proceeds run out.
+        Liquidation(LOAN_ADDRESS, 2, loan, 170),
+        Liquidation(LOAN_ADDRESS, 3, loan, 120),
+        Liquidation(LOAN_ADDRESS, 4, loan, 100),
+        Liquidation(LOAN_ADDRESS, 5, loan._replace(tranche=()), 100),
+    ]
+    assert get_amounts(liquidations) == [
+        (1, 0, 135),
+        (1, 1, 64),
+        (2, 0, 115),
+        (2, 1, 55),
+        (3, 0, 115),
+        (3, 1, 5),
+        (4, 0, 100),
+        (4, 1, 0),
+    ]
+    # One at a time gives the same result.
+    assert [get_amounts([liquidation]) for liquidation in liquidations] == [
+        [(1, 0, 135), (1, 1, 64)],
+        [(2, 0, 115), (2, 1, 55)],
+        [(3, 0, 115), (3, 1, 5)],
+        [(4, 0, 100), (4, 1, 0)],
+        [],
+    ]
+
+    payouts = get_payouts(
+        liquidations[:1], ["0x00000000000000000000000000000000000000D2"]
+    )
+    assert [(p.lender, p.token, p.is_loan_manager) for p in payouts] == [
+        (LENDER, CURRENCY, False),
+        (LOAN_MANAGER, CURRENCY, True),
+    ]
+    assert {p.transaction_hash for p in payouts} == {"0x01"}
+    assert get_payouts([]) == []
+
+
+def make_transfer_log(recipient: str, amount: int, transaction_hash: str) -> dict:
+    return {
+        "address": CURRENCY,
+        "topics": [
+            TRANSFER_TOPIC,
+            "0x" + "00" * 12 + LOAN_ADDRESS[2:],
+            "0x" + "00" * 12 + recipient[2:],
+        ],
+        "data": hex(amount),
+        "transactionHash": transaction_hash,
+    }
+
+
+def test_reconcile():
+    log = {
+        "data": "0x"
+        + encode(
+            AuctionSettled.types,
+            [LOAN_ADDRESS, 1, COLLECTION, 1, CURRENCY, 200, BORROWER, 5],
+        ).hex(),
+        "transactionHash": "0x01",
+    }
+    liquidation = Liquidation.from_log(log, make_loan())
+    assert (liquidation.loan_id, liquidation.proceeds) == (1, 200)
+    payouts = get_payouts([liquidation])
+
+    transfers = [
+        TokenTransfer.from_log(make_transfer_log(LENDER, 135, "0x01")),
+        TokenTransfer.from_log(make_transfer_log(LOAN_MANAGER, 60, "0x01")),
+        TokenTransfer.from_log(make_transfer_log(LOAN_MANAGER, 4, "0x01")),
+        # Trigger fees and other transactions are ignored.
+        TokenTransfer.from_log(make_transfer_log(BORROWER, 5, "0x01")),
+        TokenTransfer.from_log(make_transfer_log(LENDER, 1, "0x02")),
+    ]
+    assert reconcile(payouts, transfers) == []
+    assert reconcile(payouts, transfers[1:]) == [
+        Mismatch("0x01", CURRENCY, LENDER, 135, 0)
+    ]
+    assert TokenTransfer.from_log({"topics": [TRANSFER_TOPIC], "data": "0x"}) is None
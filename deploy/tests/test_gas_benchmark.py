@@ -0,0 +1,77 @@
+from florida_contracts.gas_benchmark import (
+    GasRun,
+    GasSample,
+    find_regressions,
+    format_table,
+    get_baseline,
+    parse_gas_report,
+)
+
+# Layout of `forge test --match-path test/MultiSourceGas.t.sol -vv` output, gas values
+# made up.
+FORGE_OUTPUT = """\
+Ran 2 tests for test/MultiSourceGas.t.sol:MultiSourceLoanTest
+[PASS] testEmitManySourcesGas() (gas: 9876543)
+Logs:
+  GAS_REPORT emitLoan 1 210000
+  GAS_REPORT emitLoan 2 265000
+
+[PASS] testRefinanceManyPartialSourcesGas() (gas: 4567890)
+Logs:
+  Refinance Many Partial:
+  Gas cost refinance. Refi:
+  0
+  98000
+  GAS_REPORT addNewTranche 1 98000
+  ------
+  GAS_REPORT addNewTranche 1 97000
+  GAS_REPORT addNewTranche 2 101000
+
+Suite result: ok. 2 passed; 0 failed; 0 skipped
+"""
+
+
+def test_parse_gas_report():
+    assert parse_gas_report(FORGE_OUTPUT) == [
+        GasSample("addNewTranche", 1, 97000),
+        GasSample("addNewTranche", 2, 101000),
+        GasSample("emitLoan", 1, 210000),
+        GasSample("emitLoan", 2, 265000),
+    ]
+    assert parse_gas_report("Suite result: ok. 0 passed") == []
+
+
+def test_gas_run_json():
+    run = GasRun("abc", 1, tuple(parse_gas_report(FORGE_OUTPUT)))
+    assert GasRun.from_json(run.to_json()) == run
+
+
+def test_get_baseline():
+    history = [GasRun("aaa", 1, ()), GasRun("bbb", 2, ()), GasRun("ccc", 3, ())]
+    assert get_baseline(history, exclude="ccc").commit == "bbb"
+    assert get_baseline(history, "aa", exclude="ccc").commit == "aaa"
+    assert get_baseline(history, "ddd") is None
+    assert get_baseline([], exclude="ccc") is None
+
+
+def test_find_regressions():
+    baseline = [GasSample("emitLoan", 1, 200000), GasSample("emitLoan", 2, 250000)]
+    current = [
+        GasSample("emitLoan", 1, 201000),
+        GasSample("emitLoan", 2, 260000),
+        GasSample("repayLoan", 1, 50000),
+    ]
+    # +0.5% is within 50 bps, +4% is not, repayLoan has no baseline.
+    (regression,) = find_regressions(baseline, current, 50)
+    assert regression.operation == "emitLoan" and regression.tranches == 2
+    assert regression.change_bps == 400
+
+
+def test_format_table():
+    baseline = GasRun("aaa", 1, (GasSample("emitLoan", 1, 200000),))
+    run = GasRun(
+        "bbb", 2, (GasSample("emitLoan", 1, 202000), GasSample("emitLoan", 2, 1))
+    )
+    lines = format_table(run, baseline).splitlines()
+    assert lines[1].split() == ["emitLoan", "1", "202000", "+1.00%"]
+    assert lines[2].split() == ["emitLoan", "2", "1", "-"]
@@ -0,0 +1,69 @@
+from typing import Callable, Optional
+
+from florida_contracts.loan_cache import LoanCache
+from florida_contracts.structs import Loan, Tranche
+
+CONTRACT = "0x00000000000000000000000000000000000000AA"
+KEY = (CONTRACT.lower(), 1)
+
+
+def make_loan(principal: int, tranches: int = 1) -> Loan:
+    tranche = Tranche(1, 0, principal, "0x" + "11" * 20, 0, 100, 500)
+    return Loan(
+        "0x" + "22" * 20,
+        7,
+        "0x" + "33" * 20,
+        "0x" + "44" * 20,
+        principal,
+        100,
+        86400,
+        (tranche,) * tranches,
+        0,
+    )
+
+
+class FakeRpc:
+    """Answers `getLoanHash` with `hashes`, running `during` before it returns."""
+
+    def __init__(
+        self, hashes: list[bytes], during: Optional[Callable[[], None]] = None
+    ):
+        self.hashes = hashes
+        self.during = during
+
+    def batch(self, requests, raise_errors=True):
+        if self.during is not None:
+            self.during()
+        return ["0x" + loan_hash.hex() for loan_hash in self.hashes]
+
+
+def test_verify_bumps_and_drops():
+    cache = LoanCache()
+    entry = cache.put(CONTRACT, 1, make_loan(100))
+    cache._rpc = FakeRpc([entry.loan_hash])
+    assert cache.verify([(CONTRACT, 1)], 10) == {KEY: True}
+    assert cache.get(CONTRACT, 1).verified_block == 10
+
+    cache._rpc = FakeRpc([b"\x00" * 32])
+    assert cache.verify([(CONTRACT, 1)], 11) == {KEY: False}
+    assert cache.get(CONTRACT, 1) is None
+    assert cache.stats.size_bytes == 0
+
+
+def test_verify_keeps_entry_replaced_during_batch():
+    cache = LoanCache()
+    old = cache.put(CONTRACT, 1, make_loan(100))
+    newer = make_loan(200, tranches=3)
+    cache._rpc = FakeRpc([old.loan_hash], lambda: cache.put(CONTRACT, 1, newer, 12))
+
+    assert cache.verify([(CONTRACT, 1)], 10) == {KEY: True}
+    entry = cache.get(CONTRACT, 1)
+    assert entry.loan == newer and entry.verified_block == 12
+    size = cache.stats.size_bytes
+
+    # A stale hash for the old loan doesn't drop the newer one either.
+    cache.put(CONTRACT, 1, make_loan(100))
+    cache._rpc = FakeRpc([b"\x00" * 32], lambda: cache.put(CONTRACT, 1, newer, 13))
+    assert cache.verify([(CONTRACT, 1)], 11) == {KEY: False}
+    assert cache.get(CONTRACT, 1).verified_block == 13
+    assert cache.stats.size_bytes == size
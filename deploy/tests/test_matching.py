@@ -0,0 +1,187 @@
+from florida_contracts.matching import OfferBook, get_blended_apr_bps
+from florida_contracts.structs import LoanOffer, OfferValidator
+
+COLLECTION = "0x00000000000000000000000000000000000000C0"
+CURRENCY = "0x00000000000000000000000000000000000000E0"
+RECEIVER = "0x00000000000000000000000000000000000000B0"
+TOKEN_ID = 7
+# A year, so getInterest(amount, apr) is amount * apr / 10000 rounded up.
+YEAR = 31536000
+NOW = 1000
+NO_LIMIT = 2**256 - 1
+
+
+def make_offer(
+    lender: int,
+    offer_id: int,
+    principal: int,
+    apr_bps: int,
+    max_senior_repayment: int = NO_LIMIT,
+    capacity: int = 0,
+    token_id: int = TOKEN_ID,
+    duration: int = YEAR,
+    expiration_time: int = NOW + 100,
+    validators: tuple[OfferValidator, ...] = (),
+) -> LoanOffer:
+    return LoanOffer(
+        offer_id,
+        f"0x{lender:040x}",
+        0,
+        capacity,
+        COLLECTION,
+        token_id,
+        CURRENCY,
+        principal,
+        apr_bps,
+        expiration_time,
+        duration,
+        max_senior_repayment,
+        validators,
+    )
+
+
+def match(book: OfferBook, principal: int, token_id: int = TOKEN_ID):
+    return book.match(
+        COLLECTION, CURRENCY, token_id, principal, YEAR, NOW, NOW + 10, RECEIVER
+    )
+
+
+def get_tranches(execution_data) -> list[tuple[int, int]]:
+    return [(e.offer.offer_id, e.amount) for e in execution_data.offer_execution]
+
+
+def test_match_cheapest_first():
+    book = OfferBook(max_tranches=4)
+    book.add_offer(make_offer(1, 1, principal=100, apr_bps=1000))
+    book.add_offer(make_offer(2, 2, principal=60, apr_bps=500))
+    book.add_offer(make_offer(3, 3, principal=1000, apr_bps=800))
+
+    execution_data = match(book, 100)
+    # Offer 2 caps ahead + amount at 60, so it takes 60 as the senior tranche and
+    # offer 3 the remaining 40 behind it. Offer 1 is the most expensive and unused.
+    assert get_tranches(execution_data) == [(2, 60), (3, 40)]
+    assert get_blended_apr_bps(execution_data) == (60 * 500 + 40 * 800) // 100
+    assert execution_data.token_id == TOKEN_ID
+    assert execution_data.principal_receiver == RECEIVER
+
+
+def test_match_places_senior_ahead_within_limits():
+    # Offer 1 only has capacity for 60 of its 100, offer 2 accepts nothing ahead of it.
+    book = OfferBook(max_tranches=4)
+    book.add_offer(
+        make_offer(
+            1, 1, principal=100, apr_bps=500, capacity=60, max_senior_repayment=44
+        )
+    )
+    book.add_offer(
+        make_offer(2, 2, principal=1000, apr_bps=800, max_senior_repayment=0)
+    )
+
+    # Offer 2 goes ahead: offer 1 then has 40 + 60 = 100 <= 100 principal and
+    # 40 + getInterest(40, 800) = 40 + 4 = 44 <= 44 senior repayment.
+    assert get_tranches(match(book, 100)) == [(2, 40), (1, 60)]
+
+    # With 43, 40 ahead is InvalidTrancheError on-chain and 39 leaves 1 unfilled.
+    book = OfferBook(max_tranches=4)
+    book.add_offer(
+        make_offer(
+            1, 1, principal=100, apr_bps=500, capacity=60, max_senior_repayment=43
+        )
+    )
+    book.add_offer(
+        make_offer(2, 2, principal=1000, apr_bps=800, max_senior_repayment=0)
+    )
+    assert match(book, 100) is None
+
+
+def test_match_keeps_tranches_above_minimum():
+    # 100 / (2 * 4 tranches) = 12 minimum tranche principal.
+    book = OfferBook(max_tranches=4)
+    book.add_offer(make_offer(1, 1, principal=95, apr_bps=500))
+    book.add_offer(make_offer(2, 2, principal=1000, apr_bps=800))
+
+    # Offer 1 would leave 5, below the minimum: it shrinks to 88 to leave 12.
+    assert get_tranches(match(book, 100)) == [(1, 88), (2, 12)]
+
+
+def test_match_max_tranches():
+    book = OfferBook(max_tranches=2)
+    for i in range(1, 4):
+        book.add_offer(make_offer(i, i, principal=40 * i, apr_bps=500 + i))
+    # Cumulative caps 40, 80, 120: two tranches can't reach 120.
+    assert get_tranches(match(book, 80)) == [(1, 40), (2, 40)]
+    assert match(book, 120) is None
+
+
+def test_candidates_skip_offers_that_revert():
+    book = OfferBook(max_tranches=4)
+    valid = make_offer(1, 1, principal=100, apr_bps=500)
+    book.add_offer(valid)
+    # InvalidDurationError, shorter than requested or 0.
+    book.add_offer(make_offer(2, 1, principal=100, apr_bps=500, duration=YEAR - 1))
+    book.add_offer(make_offer(3, 1, principal=100, apr_bps=500, duration=0))
+    # ExpiredOfferError.
+    book.add_offer(
+        make_offer(4, 1, principal=100, apr_bps=500, expiration_time=NOW - 1)
+    )
+    # ZeroInterestError.
+    book.add_offer(make_offer(5, 1, principal=100, apr_bps=0))
+    # CancelledOrExecutedOfferError, offerId <= minOfferId (0 by default).
+    book.add_offer(make_offer(6, 0, principal=100, apr_bps=500))
+    book.add_offer(make_offer(7, 3, principal=100, apr_bps=500))
+    book.cancel_all_offers(f"0x{7:040x}", 5)
+    # MaxCapacityExceededError once the capacity is used.
+    book.add_offer(make_offer(8, 1, principal=100, apr_bps=500, capacity=50))
+    book.set_used_capacity(f"0x{8:040x}", 1, 50)
+    # InvalidCollateralIdError.
+    book.add_offer(make_offer(9, 1, principal=100, apr_bps=500, token_id=8))
+
+    candidates = list(book.candidates(COLLECTION, CURRENCY, TOKEN_ID, YEAR, NOW))
+    assert [(signed.offer, available) for signed, available in candidates] == [
+        (valid, 100)
+    ]
+    # A 0 duration request doesn't let 0 duration offers through.
+    assert [
+        signed.offer
+        for signed, _ in book.candidates(COLLECTION, CURRENCY, TOKEN_ID, 0, NOW)
+    ] == [
+        valid,
+        make_offer(2, 1, principal=100, apr_bps=500, duration=YEAR - 1),
+    ]
+
+
+def test_candidates_collection_offers():
+    any_token = (OfferValidator("0x" + "00" * 20, b""),)
+    checked = (OfferValidator("0x" + "11" * 20, b"\x01"),)
+    book = OfferBook(
+        max_tranches=4, validator_check=lambda offer, token_id: token_id == 7
+    )
+    book.add_offer(make_offer(1, 1, 100, 500, token_id=0, validators=any_token))
+    book.add_offer(make_offer(2, 1, 100, 600, token_id=0, validators=checked))
+    book.add_offer(make_offer(3, 1, 100, 700, token_id=0))
+
+    def lenders(token_id: int) -> list[int]:
+        return [
+            int(signed.offer.lender, 16)
+            for signed, _ in book.candidates(COLLECTION, CURRENCY, token_id, YEAR, NOW)
+        ]
+
+    # No validators only matches token id 0, the validator check decides for others.
+    assert lenders(7) == [1, 2]
+    assert lenders(8) == [1]
+    assert lenders(0) == [1, 3]
+
+
+def test_offer_executed():
+    book = OfferBook(max_tranches=4)
+    book.add_offer(make_offer(1, 1, principal=100, apr_bps=500, capacity=150))
+    book.add_offer(make_offer(2, 1, principal=100, apr_bps=600))
+
+    book.offer_executed(f"0x{1:040x}", 1, 120)
+    book.offer_executed(f"0x{2:040x}", 1, 100)
+    # Capacity offers stay with what's left, others are spent.
+    candidates = list(book.candidates(COLLECTION, CURRENCY, TOKEN_ID, YEAR, NOW))
+    assert [(signed.offer.offer_id, available) for signed, available in candidates] == [
+        (1, 30)
+    ]
+    assert len(book) == 1
@@ -0,0 +1,244 @@
+import pytest
+from eth_abi import encode
+from eth_abi.packed import encode_packed
+from eth_hash.auto import keccak
+
+from florida_contracts.events import DataUpdated
+from florida_contracts.offer_handler import (
+    PRECISION,
+    AprPremiumSet,
+    CollectionFactorsSet,
+    FactorKey,
+    OfferValidationError,
+    OracleOfferHandler,
+    calculate_apr_premium,
+    get_factor_key,
+    get_factors_hash,
+)
+from florida_contracts.structs import (
+    AprFactors,
+    CollectionData,
+    LoanOffer,
+    OfferExecution,
+    OfferValidator,
+    PrincipalFactors,
+)
+from florida_contracts.views import CallResult, ViewResults
+
+HANDLER = "0x00000000000000000000000000000000000000a0"
+POOL = "0x00000000000000000000000000000000000000a1"
+ORACLE = "0x00000000000000000000000000000000000000a2"
+ALLOCATOR = "0x00000000000000000000000000000000000000a3"
+COLLECTION = "0x00000000000000000000000000000000000000c0"
+FLOOR_KEY = b"flr1"
+HISTORICAL_KEY = b"hfl1"
+DURATION = 30 * 24 * 3600
+NOW = 10**6
+ZERO = "0x" + "00" * 20
+
+
+def make_offer(
+    apr_bps: int = 1000,
+    validators: tuple[OfferValidator, ...] = (),
+    token_id: int = 7,
+    max_senior_repayment: int = 0,
+) -> LoanOffer:
+    return LoanOffer(
+        1,
+        POOL,
+        0,
+        0,
+        COLLECTION,
+        token_id,
+        ZERO,
+        10**20,
+        apr_bps,
+        NOW + 100,
+        DURATION,
+        max_senior_repayment,
+        validators,
+    )
+
+
+def make_validator(code: int, types: list[str], values: list) -> OfferValidator:
+    return OfferValidator(
+        ZERO, encode(["(uint8,bytes)"], [(code, encode(types, values))])
+    )
+
+
+def make_handler() -> OracleOfferHandler:
+    handler = OracleOfferHandler(HANDLER, POOL, FLOOR_KEY, HISTORICAL_KEY)
+    handler.oracle = ORACLE
+    handler.base_rate = 300
+    handler.calculated_apr_premium = 400
+    handler.apr_update_tolerance = 3600
+    handler.set_factors(
+        FactorKey(COLLECTION, DURATION),
+        PrincipalFactors(PRECISION // 2, 3 * PRECISION // 4),
+    )
+    # Max principal min(100 * 0.5, 80 * 0.75) = 50.
+    handler.set_oracle_data(COLLECTION, DURATION, FLOOR_KEY, CollectionData(100, NOW))
+    handler.set_oracle_data(
+        COLLECTION, DURATION, HISTORICAL_KEY, CollectionData(80, NOW)
+    )
+    return handler
+
+
+def test_get_factors_hash():
+    # `_hashKey`: keccak256(abi.encodePacked(collection, uint96(duration), extra)).
+    assert get_factors_hash(COLLECTION, DURATION, b"\x01") == keccak(
+        encode_packed(["address", "uint96", "bytes"], [COLLECTION, DURATION, b"\x01"])
+    )
+
+
+def test_get_factor_key():
+    assert get_factor_key(make_offer()) == FactorKey(COLLECTION, DURATION)
+
+    range_data = encode(["uint256", "uint256"], [1, 10])
+    offer = make_offer(validators=(make_validator(1, ["uint256", "uint256"], [1, 10]),))
+    assert get_factor_key(offer) == FactorKey(COLLECTION, DURATION, range_data)
+
+    root = b"\x11" * 32
+    offer = make_offer(
+        validators=(
+            make_validator(2, ["bytes32[]", "bytes32"], [[b"\x22" * 32], root]),
+        )
+    )
+    assert get_factor_key(offer).extra == root
+
+    offer = make_offer(validators=(make_validator(3, ["uint256"], [7]),))
+    assert get_factor_key(offer).extra == encode(["uint256"], [7])
+    with pytest.raises(OfferValidationError, match="InvalidInputError"):
+        get_factor_key(make_offer(validators=offer.validators, token_id=8))
+    with pytest.raises(OfferValidationError, match="InvalidInputError"):
+        get_factor_key(make_offer(validators=(make_validator(4, ["uint256"], [7]),)))
+
+    # Several validators or a non zero one read the zero key.
+    assert get_factor_key(make_offer(validators=offer.validators * 2)) is None
+    offer = make_offer(validators=(OfferValidator(HANDLER, b""),))
+    assert get_factor_key(offer) is None
+
+
+def test_calculate_apr_premium():
+    factors = AprFactors(100, 1000 * PRECISION)
+    # 750 / 1000 utilization * 1000 + 100.
+    assert calculate_apr_premium(factors, 1000, 250) == 850
+    # mulDivUp(1, 1000e27, 3e27) = 334.
+    assert calculate_apr_premium(factors, 3, 2) == 434
+
+
+def test_validate():
+    handler = make_handler()
+    handler.apr_premium = handler.apr_premium._replace(value=200, updated_ts=NOW)
+
+    assert handler.get_limits(make_offer(), NOW) == (50, 500)
+    assert handler.validate(OfferExecution(make_offer(500), 50), NOW) == (50, 500)
+    assert handler.check(OfferExecution(make_offer(500), 51), NOW) == (
+        "InvalidPrincipalAmountError"
+    )
+    assert handler.check(OfferExecution(make_offer(499), 50), NOW) == "InvalidAprError"
+    offer = make_offer(500, max_senior_repayment=1)
+    assert handler.check(OfferExecution(offer, 50), NOW) == (
+        "InvalidMaxSeniorRepaymentError"
+    )
+    # Past the update tolerance the premium is recalculated.
+    assert handler.get_min_apr(NOW + 3600) == 500
+    assert handler.get_min_apr(NOW + 3601) == 700
+    # The zero key has no factors.
+    offer = make_offer(500, validators=(OfferValidator(HANDLER, b""),))
+    assert handler.get_max_principal(offer, NOW) == 0
+
+
+def test_validate_outdated():
+    handler = make_handler()
+    # 30 days * 2% = 51840 seconds for the floor, 30 days * 5% = 129600 for the
+    # historical floor.
+    assert handler.check(OfferExecution(make_offer(), 1), NOW + 51840) is None
+    assert handler.check(OfferExecution(make_offer(), 1), NOW + 51841) == (
+        "OutdatedValueError"
+    )
+    handler.set_oracle_data(
+        COLLECTION, DURATION, FLOOR_KEY, CollectionData(100, NOW + 10**5)
+    )
+    assert handler.check(OfferExecution(make_offer(), 1), NOW + 129600) is None
+    assert handler.check(OfferExecution(make_offer(), 1), NOW + 129601) == (
+        "OutdatedValueError"
+    )
+
+
+class FakeAggregator:
+    def __init__(self, values: dict):
+        # Keyed by signature, or (signature, last argument) for calls with arguments.
+        self.values = values
+
+    def execute(self, calls, block=None) -> ViewResults:
+        results = []
+        for call in calls:
+            key = call.signature
+            if call.args:
+                key = (call.signature, call.args[-1])
+            results.append(CallResult(True, self.values[key]))
+        return ViewResults(block or 1, tuple(results))
+
+
+def test_warm():
+    handler = OracleOfferHandler(HANDLER, POOL, FLOOR_KEY, HISTORICAL_KEY)
+    floor = CollectionData(100, NOW)
+    historical = CollectionData(80, NOW)
+    aggregator = FakeAggregator(
+        {
+            "getAprPremium()": (200, NOW),
+            "getAprFactors()": (100, PRECISION),
+            "getAprUpdateTolerance()": 3600,
+            "calculateAprPremium()": 400,
+            "getOracle()": "0x00000000000000000000000000000000000000A2",
+            "getBaseInterestAllocator()": ALLOCATOR,
+            ("getCollectionFactors(address,uint96)", DURATION): PrincipalFactors(
+                PRECISION // 2, 3 * PRECISION // 4
+            ),
+            "getBaseApr()": 300,
+            ("getData(address,uint64,bytes4)", FLOOR_KEY): floor,
+            ("getData(address,uint64,bytes4)", HISTORICAL_KEY): historical,
+        }
+    )
+    # Offers whose factor key reverts are skipped.
+    invalid = make_offer(validators=(make_validator(4, ["uint256"], [7]),))
+    assert handler.warm_offers(aggregator, [make_offer(), invalid], 5) == 5
+    assert handler.oracle == ORACLE
+    assert handler.get_limits(make_offer(), NOW) == (50, 500)
+
+
+def test_apply_log():
+    handler = make_handler()
+
+    def make_log(address: str, event, *values) -> dict:
+        data = encode(event.types, values)
+        return {"address": address, "topics": [event.topic], "data": "0x" + data.hex()}
+
+    assert handler.apply_log(make_log(HANDLER, AprPremiumSet, 250), NOW)
+    assert handler.get_min_apr(NOW) == 550
+    # Only logs from the handler and its oracle apply.
+    assert not handler.apply_log(make_log(POOL, AprPremiumSet, 0), NOW)
+
+    key = FactorKey(COLLECTION, DURATION, b"\x01")
+    factors = (PRECISION, PRECISION)
+    assert handler.apply_log(
+        make_log(
+            HANDLER,
+            CollectionFactorsSet,
+            [COLLECTION],
+            [DURATION],
+            [b"\x01"],
+            [factors],
+        ),
+        NOW,
+    )
+    assert handler._factors[key.hash] == factors
+
+    log = make_log(ORACLE, DataUpdated, COLLECTION, DURATION, FLOOR_KEY, 40)
+    assert handler.apply_log(log, NOW + 1)
+    # min(40 * 0.5, 80 * 0.75)
+    assert handler.get_max_principal(make_offer(), NOW + 1) == 20
+    assert not handler.apply_log(
+        make_log(HANDLER, DataUpdated, COLLECTION, DURATION, FLOOR_KEY, 0), NOW
+    )
@@ -0,0 +1,117 @@
+from eth_abi import encode
+
+from florida_contracts.events import (
+    Event,
+    LoanEmitted,
+    LoanRefinanced,
+    LoanRepaid,
+    MinAprImprovementUpdated,
+)
+from florida_contracts.loans import get_min_beatable_apr, is_tranche_strictly_better
+from florida_contracts.refinance import RefinanceIndex
+from florida_contracts.structs import Loan, Tranche
+
+COLLECTION = "0x00000000000000000000000000000000000000c0"
+CURRENCY = "0x00000000000000000000000000000000000000e0"
+OTHER_CURRENCY = "0x00000000000000000000000000000000000000e1"
+LENDER = "0x00000000000000000000000000000000000000a1"
+BORROWER = "0x00000000000000000000000000000000000000b0"
+# 15%: lender refis need 15% of the tranche's remaining time to have passed and are
+# locked for the last 15% of the loan.
+MIN_LOCK_PERIOD = 1500
+START = 10000
+DURATION = 100000
+
+
+def make_loan(
+    loan_id: int, tranches: list[tuple[int, int, int]], currency: str = CURRENCY
+) -> Loan:
+    return Loan(
+        BORROWER,
+        1,
+        COLLECTION,
+        currency,
+        sum(principal for principal, _, _ in tranches),
+        START,
+        DURATION,
+        tuple(
+            Tranche(loan_id, 0, principal, LENDER, 0, start_time, apr_bps)
+            for principal, start_time, apr_bps in tranches
+        ),
+        0,
+    )
+
+
+def make_log(event: Event, *values) -> dict:
+    return {"topics": [event.topic], "data": "0x" + encode(event.types, values).hex()}
+
+
+def get_beatable(index: RefinanceIndex, apr_bps: int, now: int, **kwargs):
+    return [
+        (ref.loan_id, ref.index)
+        for ref in index.beatable(COLLECTION, CURRENCY, apr_bps, now, **kwargs)
+    ]
+
+
+def test_min_beatable_apr():
+    # `_checkTrancheStrictly`: (current - target) * 10000 / current >= 1000.
+    assert get_min_beatable_apr(900, 1000) == 1000
+    assert is_tranche_strictly_better(1000, 900, 1000)
+    assert not is_tranche_strictly_better(999, 900, 1000)
+    assert get_min_beatable_apr(901, 1000) == 1002
+    assert not is_tranche_strictly_better(1001, 901, 1000)
+
+
+def test_refinance_index():
+    index = RefinanceIndex(MIN_LOCK_PERIOD)
+    index.add_loan(1, make_loan(1, [(50, START, 1000), (30, START, 999)]))
+    index.add_loan(2, make_loan(2, [(20, START + 10000, 1500)]))
+    index.add_loan(3, make_loan(3, [(50, START, 2000)], OTHER_CURRENCY))
+    assert len(index) == 4
+
+    # Unlocked at 10000 + 15% of 100000 and 20000 + 15% of 90000 respectively.
+    ((ref,),) = [list(index.beatable(COLLECTION, CURRENCY, 900, 30000))]
+    assert (ref.loan_id, ref.index, ref.unlocked_at) == (1, 0, 25000)
+    assert get_beatable(index, 900, 33499) == [(1, 0)]
+    assert get_beatable(index, 900, 33500) == [(2, 0), (1, 0)]
+    # Locked once past end time - 15% of the duration.
+    assert get_beatable(index, 900, 95000) == [(2, 0), (1, 0)]
+    assert get_beatable(index, 900, 95001) == []
+    assert get_beatable(index, 900, 40000, max_principal=30) == [(2, 0)]
+
+    index.remove_loan(2)
+    assert get_beatable(index, 900, 40000) == [(1, 0)]
+    assert len(index) == 3
+
+
+def test_refinance_index_parameters():
+    index = RefinanceIndex(MIN_LOCK_PERIOD)
+    index.add_loan(1, make_loan(1, [(50, START, 1000), (30, START, 999)]))
+
+    index.set_min_improvement_apr(0)
+    assert get_beatable(index, 999, 40000) == [(1, 0), (1, 1)]
+    index.set_min_lock_period(3000)
+    assert get_beatable(index, 999, 40000) == [(1, 0), (1, 1)]
+    assert get_beatable(index, 999, 39999) == []
+    assert get_beatable(index, 999, 80001) == []
+
+
+def test_refinance_index_apply_log():
+    index = RefinanceIndex(MIN_LOCK_PERIOD)
+    loan = make_loan(1, [(50, START, 1000), (30, START, 999)])
+    assert index.apply_log(make_log(LoanEmitted, 1, [1, 2], loan.to_abi(), 0))
+    assert index.get_loan(1).tranche == loan.tranche
+
+    refinanced = make_loan(2, [(50, START, 1000), (30, START + 20000, 740)])
+    assert index.apply_log(make_log(LoanRefinanced, 0, 1, 2, refinanced.to_abi(), 0))
+    assert index.get_loan(1) is None
+    # The new tranche unlocks at 30000 + 15% of 80000 and 740 -> 700 is a 5.4% improvement.
+    assert get_beatable(index, 700, 42000) == [(2, 0)]
+
+    assert index.apply_log(make_log(MinAprImprovementUpdated, 500))
+    assert get_beatable(index, 700, 41999) == [(2, 0)]
+    assert get_beatable(index, 700, 42000) == [(2, 0), (2, 1)]
+
+    assert index.apply_log(make_log(LoanRepaid, 2, 0, 0))
+    assert len(index) == 0
+    assert not index.apply_log({"topics": ["0x" + "00" * 32], "data": "0x"})
@@ -0,0 +1,58 @@
+"""
+MerkleTree proof generation timings, not collected by `wake test`.
+
+With the suite moved to `tests/` like in CI:
+
+    python -m tests.benchmark_merkle --max-leaves 1000000
+
+Each row proves a random `--fraction` of the leaves; time per proven leaf should stay flat as
+the tree grows.
+"""
+import argparse
+import os
+import random
+import time
+
+from .utils import MerkleTree
+
+
+def build_tree(leaves: int) -> MerkleTree:
+    tree = MerkleTree(os.urandom(32) for _ in range(leaves))
+    tree.root
+    return tree
+
+
+def benchmark_multiproof(tree: MerkleTree, count: int, rounds: int) -> float:
+    """Best of `rounds` seconds for a multiproof of `count` random leaves."""
+    best = float("inf")
+    for _ in range(rounds):
+        indexes = sorted(random.sample(range(len(tree)), count))
+        start = time.perf_counter()
+        tree.get_multiproof(indexes)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="MerkleTree multiproof scaling")
+    parser.add_argument("--max-leaves", type=int, default=1_000_000)
+    parser.add_argument("--fraction", type=float, default=0.1, help="Share of leaves proven per multiproof.")
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    random.seed(args.seed)
+
+    print(f"{'leaves':>10}{'proven':>10}{'build (s)':>12}{'multiproof (s)':>16}{'ns/leaf':>10}")
+    leaves = 1_000
+    while leaves <= args.max_leaves:
+        start = time.perf_counter()
+        tree = build_tree(leaves)
+        build = time.perf_counter() - start
+        count = max(1, int(leaves * args.fraction))
+        elapsed = benchmark_multiproof(tree, count, args.rounds)
+        print(f"{leaves:>10}{count:>10}{build:>12.3f}{elapsed:>16.4f}{elapsed * 1e9 / count:>10.0f}")
+        leaves *= 10
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,38 @@
+"""
+Time to first failure of each flow scheduler, not collected by `wake test`.
+
+With the suite moved to `tests/` like in CI, against a build or model with a known bug:
+
+    python -m tests.benchmark_schedulers tests.test_erc721_fuzz:ERC721FuzzTest --campaigns 20
+
+Every scheduler runs the same seeded campaigns; fewer flows to the first failure than
+StaticScheduler (the `@flow` weights) means the scheduler finds the bug sooner.
+"""
+import argparse
+import importlib
+
+from wake.testing import *
+
+from .fuzz_scheduler import AdaptiveScheduler, StaticScheduler, compare_schedulers, format_comparison
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Flow scheduler time to first failure")
+    parser.add_argument("test", help="ScheduledFuzzTest subclass as module:Class.")
+    parser.add_argument("--campaigns", type=int, default=10)
+    parser.add_argument("--sequences", type=int, default=100, help="Sequences per campaign at most.")
+    parser.add_argument("--flows", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    module, name = args.test.split(":")
+    test_class = getattr(importlib.import_module(module), name)
+    with default_chain.connect():
+        results = compare_schedulers(
+            test_class, args.campaigns, args.sequences, args.flows, (StaticScheduler, AdaptiveScheduler), args.seed
+        )
+    print(format_comparison(results))
+
+
+if __name__ == "__main__":
+    main()
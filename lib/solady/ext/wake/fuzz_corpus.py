@@ -0,0 +1,110 @@
+"""
+Fuzz corpus: failing and novel sequences saved as small JSON files that replay deterministically.
+
+A sequence is fully determined by its seed (which seeds `pre_sequence`) and, for every flow it
+ran, the flow name and the seed its arguments and internal randomness were drawn from. Argument
+reprs are stored for reading only, replays regenerate them from the flow seed.
+"""
+import hashlib
+import json
+import os
+from dataclasses import asdict, dataclass, field, replace
+from typing import Callable, List, Optional, Tuple
+
+# Longer argument reprs are cut, they are only informative.
+MAX_ARG_REPR = 100
+
+
+@dataclass
+class CorpusStep:
+    flow: str
+    seed: int
+    args: List[str] = field(default_factory=list)
+
+
+@dataclass
+class CorpusEntry:
+    test: str
+    seed: int
+    steps: List[CorpusStep]
+    # Exception the sequence failed with, None for novel sequences.
+    failure: Optional[str] = None
+    minimized: bool = False
+
+    @property
+    def key(self) -> str:
+        steps = [(step.flow, step.seed) for step in self.steps]
+        return hashlib.sha256(json.dumps([self.test, self.seed, steps]).encode()).hexdigest()[:16]
+
+    def to_json(self) -> str:
+        return json.dumps(asdict(self))
+
+    @classmethod
+    def from_json(cls, data: str) -> "CorpusEntry":
+        values = json.loads(data)
+        values["steps"] = [CorpusStep(**step) for step in values["steps"]]
+        return cls(**values)
+
+
+def format_arg(arg) -> str:
+    text = repr(arg)
+    return text if len(text) <= MAX_ARG_REPR else text[:MAX_ARG_REPR - 3] + "..."
+
+
+class Corpus:
+    def __init__(self, directory: str):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def save(self, entry: CorpusEntry) -> str:
+        kind = "failure" if entry.failure is not None else "novel"
+        path = os.path.join(self.directory, f"{kind}-{entry.key}.json")
+        with open(path, "w") as f:
+            f.write(entry.to_json())
+        return path
+
+    def load(self) -> List[Tuple[str, CorpusEntry]]:
+        """
+        Every (path, entry), failures first.
+        """
+        entries = []
+        for name in sorted(os.listdir(self.directory)):
+            if name.endswith(".json"):
+                path = os.path.join(self.directory, name)
+                with open(path) as f:
+                    entries.append((path, CorpusEntry.from_json(f.read())))
+        return entries
+
+    def count(self, kind: str) -> int:
+        """
+        Number of "failure" or "novel" entries.
+        """
+        return sum(1 for name in os.listdir(self.directory) if name.startswith(f"{kind}-") and name.endswith(".json"))
+
+    def remove(self, path: str) -> None:
+        os.remove(path)
+
+
+def minimize(entry: CorpusEntry, fails: Callable[[CorpusEntry], bool], max_replays: int = 200) -> CorpusEntry:
+    """
+    Drop steps from a failing entry while `fails` still holds, removing chunks of halving size
+    (a simplified delta debugging) within `max_replays` replays.
+    """
+    steps = entry.steps
+    chunk = max(len(steps) // 2, 1)
+    replays = 0
+    while steps and replays < max_replays:
+        removed = False
+        i = 0
+        while i < len(steps) and replays < max_replays:
+            candidate = steps[:i] + steps[i + chunk:]
+            replays += 1
+            if fails(replace(entry, steps=candidate)):
+                steps = candidate
+                removed = True
+            else:
+                i += chunk
+        if chunk == 1 and not removed:
+            break
+        chunk = max(chunk // 2, 1)
+    return replace(entry, steps=steps, minimized=True)
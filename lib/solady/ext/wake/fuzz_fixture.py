@@ -0,0 +1,31 @@
+import copy
+from typing import Any, Dict, Tuple
+
+from wake.testing import *
+from wake.testing.fuzzing import *
+
+
+class FixtureFuzzTest(FuzzTest):
+    """
+    FuzzTest that deploys its contracts once in `setup_fixture` instead of every `pre_sequence`.
+
+    `run` reverts the chain after every sequence, so each one starts from the state right after
+    the fixture. The attributes named in `fixture_attributes` (the Python reference models) are
+    deep copied after `setup_fixture` and restored in `pre_sequence`, so every sequence starts
+    from the same chain and model state. Keep contracts and accounts out of those attributes,
+    they stay valid across reverts and don't need copying.
+    """
+
+    fixture_attributes: Tuple[str, ...] = ()
+    _fixture: Dict[str, Any]
+
+    def __init__(self):
+        self.setup_fixture()
+        self._fixture = copy.deepcopy({name: getattr(self, name) for name in self.fixture_attributes})
+
+    def setup_fixture(self) -> None:
+        pass
+
+    def pre_sequence(self) -> None:
+        for name, value in self._fixture.items():
+            setattr(self, name, copy.deepcopy(value))
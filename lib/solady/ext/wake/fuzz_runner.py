@@ -0,0 +1,269 @@
+"""
+Runs a FuzzTest campaign sharded across worker processes, each with its own chain.
+
+Every sequence is seeded from the campaign seed and its own number, and shard i runs sequences
+i, i + N, i + 2N, ... For tests whose flows only depend on the sequence seed (plain FuzzTest, or
+ScheduledFuzzTest with StaticScheduler) the merged report is the same for any number of workers,
+and a failing sequence is reproduced with `run_sequence(test_class, seed, flows)`.
+
+ScheduledFuzzTest also saves every failing sequence, shrunk, as a corpus entry (`reproducer`),
+replayed with `replay_reproducer(test_class, path, seed)`. With AdaptiveScheduler that is the
+only way to reproduce a failure: scheduling depends on the sequences that ran before in the
+shard, so the report varies with the number of workers. Tests with a configured corpus replay
+it, split across the shards, before exploring new sequences.
+
+Their profiles (see fuzz_stats) are merged into the report, printed when the campaign ends and
+written to `<FUZZ_STATS>/<test>.json` when the FUZZ_STATS environment variable is set.
+"""
+import copy
+import hashlib
+import json
+import multiprocessing
+import os
+import random
+import time
+import traceback
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional, Sequence, Type
+
+from wake.testing import *
+from wake.testing.fuzzing import *
+
+from .fuzz_corpus import CorpusEntry
+
+if TYPE_CHECKING:
+    from .fuzz_stats import FuzzStats
+
+
+_tx_listeners: List[Callable[[Any], None]] = []
+
+
+def add_tx_listener(listener: Callable[[Any], None], first: bool = False) -> None:
+    """
+    Call `listener` with every transaction sent on `default_chain`. The chain has a single
+    `tx_callback`, listeners let the runner and the tests observe transactions together. With
+    `first`, `listener` is called before the listeners added so far.
+    """
+    if not _tx_listeners:
+        default_chain.tx_callback = _dispatch_tx
+    if first:
+        _tx_listeners.insert(0, listener)
+    else:
+        _tx_listeners.append(listener)
+
+
+def remove_tx_listener(listener: Callable[[Any], None]) -> None:
+    _tx_listeners.remove(listener)
+    if not _tx_listeners:
+        default_chain.tx_callback = None
+
+
+def _dispatch_tx(tx) -> None:
+    for listener in list(_tx_listeners):
+        listener(tx)
+
+
+def get_sequence_seed(seed: int, sequence: int) -> int:
+    return int.from_bytes(hashlib.sha256(f"{seed}:{sequence}".encode()).digest()[:8], "big")
+
+
+def get_revert_key(error: Exception) -> str:
+    # Selector for errors wake couldn't decode, error name otherwise.
+    if isinstance(error, UnknownTransactionRevertedError):
+        return "0x" + bytes(error.data[:4]).hex() if len(error.data) >= 4 else "0x"
+    return type(error).__name__
+
+
+@dataclass
+class SequenceFailure:
+    # -1 for corpus entries.
+    sequence: int
+    seed: int
+    error: str
+    # Corpus entry reproducing the failure.
+    reproducer: Optional[str] = None
+
+
+@dataclass
+class ShardReport:
+    shard: int
+    sequences: int = 0
+    failures: List[SequenceFailure] = field(default_factory=list)
+    reverts: Counter = field(default_factory=Counter)
+    elapsed: float = 0.0
+    # Profile of tests that keep one (ScheduledFuzzTest).
+    stats: Optional["FuzzStats"] = None
+
+
+@dataclass
+class FuzzReport:
+    name: str
+    seed: int
+    shards: List[ShardReport]
+    elapsed: float
+
+    @property
+    def sequences(self) -> int:
+        return sum(shard.sequences for shard in self.shards)
+
+    @property
+    def failures(self) -> List[SequenceFailure]:
+        return sorted((f for shard in self.shards for f in shard.failures), key=lambda f: f.sequence)
+
+    @property
+    def reverts(self) -> Counter:
+        return sum((shard.reverts for shard in self.shards), Counter())
+
+    @property
+    def stats(self) -> Optional["FuzzStats"]:
+        stats = None
+        for shard in self.shards:
+            if shard.stats is None:
+                continue
+            if stats is None:
+                stats = copy.deepcopy(shard.stats)
+            else:
+                stats.merge(shard.stats)
+        return stats
+
+    def to_json(self) -> str:
+        stats = self.stats
+        return json.dumps({
+            "name": self.name,
+            "seed": self.seed,
+            "shards": len(self.shards),
+            "sequences": self.sequences,
+            "failures": len(self.failures),
+            "elapsed": self.elapsed,
+            "sequences_per_second": self.sequences / self.elapsed if self.elapsed else 0.0,
+            "stats": stats.to_dict() if stats is not None else None,
+        }, indent=2)
+
+    def format(self) -> str:
+        failures = self.failures
+        lines = [
+            f"{self.name}: {self.sequences} sequences in {len(self.shards)} shards, "
+            f"{self.sequences - len(failures)} passed, {len(failures)} failed, "
+            f"{self.elapsed:.1f}s ({self.sequences / self.elapsed if self.elapsed else 0:.2f} sequences/s), seed {self.seed}"
+        ]
+        for revert, count in self.reverts.most_common():
+            lines.append(f"  revert {revert}: {count}")
+        stats = self.stats
+        if stats is not None:
+            lines.append(stats.format())
+        for failure in failures:
+            if failure.sequence < 0:
+                lines.append(f"corpus entry {failure.reproducer} failed:")
+            else:
+                lines.append(f"sequence {failure.sequence} (seed {failure.seed}) failed:")
+                if failure.reproducer:
+                    lines.append(f"replay with replay_reproducer({self.name}, {failure.reproducer!r}, {self.seed})")
+            lines.append(failure.error)
+        return "\n".join(lines)
+
+    def check(self) -> None:
+        assert not self.failures, self.format()
+
+
+def run_sequence(test_class: Type[FuzzTest], seed: int, flows: int, test: Optional[FuzzTest] = None) -> None:
+    """
+    Run one sequence seeded with `seed` on the connected chain, `run` reverts the chain
+    afterwards.
+    """
+    if test is None:
+        test = test_class()
+    random.seed(seed)
+    test.run(1, flows)
+
+
+def replay_reproducer(test_class: Type[FuzzTest], path: str, seed: Optional[int] = None) -> None:
+    """
+    Replay the corpus entry at `path` on the connected chain. With the campaign `seed`, the test
+    is set up with the same random state as in the campaign's shards.
+    """
+    with open(path) as f:
+        entry = CorpusEntry.from_json(f.read())
+    if seed is not None:
+        random.seed(get_sequence_seed(seed, -1))
+    test_class().replay(entry)
+
+
+def run_sharded(
+    test_class: Type[FuzzTest],
+    sequences: int,
+    flows: int,
+    workers: Optional[int] = None,
+    seed: Optional[int] = None,
+    connect_kwargs: Optional[Dict[str, Any]] = None,
+) -> FuzzReport:
+    """
+    Run `sequences` sequences of `flows` flows over `workers` processes, defaulting to the
+    FUZZ_WORKERS environment variable or the CPU count. Must not be called with a connected
+    chain, every worker connects its own. Tests with a `prepare_campaign` class method
+    (ScheduledFuzzTest) are prepared before the workers are forked.
+    """
+    workers = min(workers or int(os.environ.get("FUZZ_WORKERS", 0)) or os.cpu_count() or 1, sequences)
+    if seed is None:
+        seed = random.getrandbits(64)
+    connect_kwargs = connect_kwargs or {}
+    if hasattr(test_class, "prepare_campaign"):
+        test_class.prepare_campaign(seed, sequences, flows)
+    args = [(test_class, shard, workers, range(shard, sequences, workers), flows, seed, connect_kwargs) for shard in range(workers)]
+
+    start = time.perf_counter()
+    if workers == 1:
+        shards = [_run_shard(*args[0])]
+    else:
+        with multiprocessing.get_context("fork").Pool(workers) as pool:
+            shards = pool.starmap(_run_shard, args)
+    report = FuzzReport(test_class.__name__, seed, shards, time.perf_counter() - start)
+
+    stats_dir = os.environ.get("FUZZ_STATS")
+    if stats_dir:
+        os.makedirs(stats_dir, exist_ok=True)
+        with open(os.path.join(stats_dir, f"{report.name}.json"), "w") as f:
+            f.write(report.to_json())
+    print(report.format())
+    return report
+
+
+def _run_shard(
+    test_class: Type[FuzzTest],
+    shard: int,
+    shards: int,
+    sequences: Sequence[int],
+    flows: int,
+    seed: int,
+    connect_kwargs: Dict[str, Any],
+) -> ShardReport:
+    report = ShardReport(shard)
+    start = time.perf_counter()
+
+    def tx_callback(tx) -> None:
+        if tx.error is not None:
+            report.reverts[get_revert_key(tx.error)] += 1
+
+    with default_chain.connect(**connect_kwargs):
+        add_tx_listener(tx_callback)
+        try:
+            random.seed(get_sequence_seed(seed, -1))
+            test = test_class()
+            if hasattr(test, "replay_corpus"):
+                for path, error in test.replay_corpus(shard, shards):
+                    report.failures.append(SequenceFailure(-1, 0, error, path))
+            for sequence in sequences:
+                sequence_seed = get_sequence_seed(seed, sequence)
+                try:
+                    run_sequence(test_class, sequence_seed, flows, test)
+                except Exception:
+                    error = traceback.format_exc()
+                    reproducer = test.minimize_last_failure() if hasattr(test, "minimize_last_failure") else None
+                    report.failures.append(SequenceFailure(sequence, sequence_seed, error, reproducer))
+                report.sequences += 1
+        finally:
+            remove_tx_listener(tx_callback)
+        report.stats = getattr(test, "stats", None)
+
+    report.elapsed = time.perf_counter() - start
+    return report
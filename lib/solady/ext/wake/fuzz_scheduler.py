@@ -0,0 +1,433 @@
+"""
+FuzzTest run loop with pluggable flow scheduling.
+
+`ScheduledFuzzTest.run` keeps FuzzTest's semantics (flow weights, `max_times`, preconditions,
+invariant periods) but lets a scheduler pick the next flow. `AdaptiveScheduler` favours flows
+that keep reaching behavior not seen before in the campaign: a new revert selector or event
+sequence in the transactions a flow sends, a new `get_model_state()`, or anything the flow
+reports with `observe`. A flow's novelty rate is a moving average, so flows that only repeat
+known behavior decay towards `floor` times their static weight. Event sequences are decoded
+only when something uses novelty: a scheduler with `uses_novelty` or a corpus saving novel
+sequences.
+
+Scheduler state carries over from one sequence to the next, so with `AdaptiveScheduler` the
+flows a sequence runs depend on the sequences that ran before it on the same instance, and its
+seed alone doesn't reproduce it. Sequences are therefore recorded as `CorpusEntry`s, which replay
+flow by flow with `replay`: failing ones are always saved (to a temporary directory when no
+corpus is configured) and minimized, ones that reached new behavior only to a configured corpus,
+up to `max_novel` entries. Behavior reached by replaying the corpus counts as seen.
+
+Flows, invariants and `pre_sequence` calls made by `run` are profiled into `stats` (see
+fuzz_stats), replays are not.
+
+`compare_schedulers` measures time to first failure of each scheduler on the same campaigns,
+`benchmark_schedulers` prints it for a test.
+"""
+import os
+import random
+import tempfile
+import time
+import traceback
+from collections import defaultdict
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Hashable, List, Optional, Sequence, Set, Tuple, Type, get_type_hints
+
+from wake.testing import *
+from wake.testing.fuzzing import *
+from wake.testing.fuzzing import generate
+
+from .fuzz_corpus import Corpus, CorpusEntry, CorpusStep, format_arg, minimize
+from .fuzz_runner import add_tx_listener, get_revert_key, get_sequence_seed, remove_tx_listener, run_sequence
+from .fuzz_stats import FuzzProfiler, FuzzStats
+
+
+def get_methods(test_class: type, marker: str) -> List[Callable]:
+    # Methods marked by wake's @flow / @invariant decorators, in FuzzTest order.
+    return [getattr(test_class, name) for name in dir(test_class) if getattr(getattr(test_class, name), marker, False) is True]
+
+
+class StaticScheduler:
+    """
+    Picks flows by their `@flow(weight=...)`, like FuzzTest.run.
+    """
+
+    # Whether `update` uses novelty, which needs the events of every transaction decoded.
+    uses_novelty: bool = False
+
+    def get_weight(self, flow: Callable) -> float:
+        return getattr(flow, "weight")
+
+    def choose(self, flows: List[Callable]) -> Callable:
+        return random.choices(flows, weights=[self.get_weight(f) for f in flows])[0]
+
+    def update(self, flow: Callable, novel: bool) -> None:
+        pass
+
+
+class AdaptiveScheduler(StaticScheduler):
+    uses_novelty = True
+    novelty: Dict[str, float]
+
+    def __init__(self, decay: float = 0.05, floor: float = 0.1):
+        self.decay = decay
+        self.floor = floor
+        self.novelty = {}
+
+    def get_weight(self, flow: Callable) -> float:
+        # Flows start optimistic (novelty 1) until they have been tried.
+        return getattr(flow, "weight") * (self.floor + self.novelty.get(flow.__name__, 1.0))
+
+    def update(self, flow: Callable, novel: bool) -> None:
+        rate = self.novelty.get(flow.__name__, 1.0)
+        self.novelty[flow.__name__] = rate + self.decay * (float(novel) - rate)
+
+
+class ScheduledFuzzTest(FuzzTest):
+    scheduler_class: Type[StaticScheduler] = StaticScheduler
+    scheduler: StaticScheduler
+    # Corpus directory, a per-test subdirectory of FUZZ_CORPUS takes precedence. No corpus if neither is set.
+    corpus_dir: Optional[str] = None
+    save_novel: bool = True
+    # No novel sequences are saved once the corpus holds this many.
+    max_novel: int = 1000
+    # Flows run by this instance over all `run` calls.
+    flows_run: int
+    # Profile of all `run` calls.
+    stats: FuzzStats
+    profiler: FuzzProfiler
+    # Seed of the current sequence, set before `pre_sequence`.
+    sequence_seed: int
+    # Last failing sequence saved to the failure corpus, with its path.
+    last_failure: Optional[Tuple[str, CorpusEntry]] = None
+    _failure_dir: Optional[str] = None
+    _seen: Set[Hashable]
+    _observe_events: bool
+    _observed: List[Hashable]
+    _steps: List[CorpusStep]
+
+    @classmethod
+    def prepare_campaign(cls, seed: int, sequences: int, flows: int) -> None:
+        """
+        Called by run_sharded before it forks the shards, which share whatever this prepares.
+        The sequences will start with the seeds `get_campaign_sequence_seeds(seed, sequences)`.
+        """
+        pass
+
+    def get_model_state(self) -> Optional[Hashable]:
+        """
+        Coarse, hashable summary of the reference model, None to not use model states.
+        """
+        return None
+
+    def observe(self, *key: Hashable) -> None:
+        """
+        Report behavior reached by the current flow to the scheduler.
+        """
+        self._observed.append(key)
+
+    def get_corpus(self) -> Optional[Corpus]:
+        directory = os.environ.get("FUZZ_CORPUS") or self.corpus_dir
+        if not directory:
+            return None
+        return Corpus(os.path.join(directory, type(self).__name__))
+
+    def get_failure_corpus(self) -> Corpus:
+        """
+        The corpus, or a temporary one when none is configured: failures are always saved.
+        """
+        corpus = self.get_corpus()
+        if corpus is not None:
+            return corpus
+        if self._failure_dir is None:
+            self._failure_dir = tempfile.mkdtemp(prefix=f"{type(self).__name__}-failures-")
+        return Corpus(self._failure_dir)
+
+    def pre_sequence(self) -> None:
+        pass
+
+    def post_sequence(self) -> None:
+        pass
+
+    def pre_flow(self, flow: Callable) -> None:
+        pass
+
+    def post_flow(self, flow: Callable) -> None:
+        pass
+
+    def pre_invariants(self) -> None:
+        pass
+
+    def post_invariants(self) -> None:
+        pass
+
+    def pre_invariant(self, invariant: Callable) -> None:
+        pass
+
+    def post_invariant(self, invariant: Callable) -> None:
+        pass
+
+    def run(self, sequences_count: int, flows_count: int, *, dry_run: bool = False) -> None:
+        """
+        Every sequence draws its seed from `random`, each flow is run with its own seed derived
+        from it, so a sequence can be replayed flow by flow from its `CorpusEntry`. As in
+        FuzzTest.run, the chain is reverted to its state before the sequence when it ends.
+        """
+        self._init_run()
+        flows = get_methods(type(self), "flow")
+        invariants = get_methods(type(self), "invariant")
+        corpus = self.get_corpus()
+
+        # Started first, so transactions are decoded in its listener and counted as decode time.
+        self.profiler.start()
+        add_tx_listener(self._on_tx)
+        start = time.perf_counter()
+        try:
+            for i in range(sequences_count):
+                self._sequence_num = i
+                sequence_seed = random.getrandbits(64)
+                flows_counter = defaultdict(int)
+                invariant_periods = defaultdict(int)
+                novel = False
+
+                snapshot = default_chain.snapshot()
+                try:
+                    self._start_sequence(sequence_seed)
+                    for j in range(flows_count):
+                        valid_flows = [
+                            f for f in flows
+                            if (not hasattr(f, "max_times") or flows_counter[f] < getattr(f, "max_times"))
+                            and (not hasattr(f, "precondition") or getattr(f, "precondition")(self))
+                        ]
+                        if len(valid_flows) == 0:
+                            raise Exception("No flow can be run, check max_times and preconditions")
+                        flow = self.scheduler.choose(valid_flows)
+
+                        self._flow_num = j
+                        self._run_flow(flow, get_sequence_seed(sequence_seed, j))
+                        flows_counter[flow] += 1
+                        flow_novel = self._is_novel(flow)
+                        novel = novel or flow_novel
+                        self.scheduler.update(flow, flow_novel)
+
+                        if not dry_run:
+                            self._run_invariants(invariants, invariant_periods)
+
+                    self.post_sequence()
+                except Exception as e:
+                    entry = CorpusEntry(type(self).__name__, sequence_seed, self._steps, _format_failure(e))
+                    self.last_failure = (self.get_failure_corpus().save(entry), entry)
+                    raise
+                finally:
+                    self.stats.sequences += 1
+                    default_chain.revert(snapshot)
+
+                if novel and self.save_novel and corpus is not None and corpus.count("novel") < self.max_novel:
+                    corpus.save(CorpusEntry(type(self).__name__, sequence_seed, self._steps))
+        finally:
+            self.stats.elapsed += time.perf_counter() - start
+            remove_tx_listener(self._on_tx)
+            self.profiler.stop()
+
+    def replay(self, entry: CorpusEntry) -> None:
+        """
+        Replay `entry` from the current chain state, which must be the state sequences start
+        from, and revert the chain afterwards. Raises whatever the sequence raises. Behavior the
+        replay reaches counts as seen, so `run` doesn't save it again as novel.
+        """
+        self._init_run()
+        invariants = get_methods(type(self), "invariant")
+        invariant_periods = defaultdict(int)
+        snapshot = default_chain.snapshot()
+        add_tx_listener(self._on_tx)
+        try:
+            self._start_sequence(entry.seed)
+            for step in entry.steps:
+                flow = getattr(type(self), step.flow)
+                if hasattr(flow, "precondition") and not getattr(flow, "precondition")(self):
+                    continue
+                self._run_flow(flow, step.seed)
+                self._is_novel(flow)
+                self._run_invariants(invariants, invariant_periods)
+            self.post_sequence()
+        finally:
+            remove_tx_listener(self._on_tx)
+            default_chain.revert(snapshot)
+
+    def replay_corpus(self, shard: int = 0, shards: int = 1) -> List[Tuple[str, str]]:
+        """
+        Replay every `shards`-th corpus entry starting at `shard`, returning (path, error) of
+        those that fail. Failing entries that aren't minimized yet are shrunk first. Only the
+        behavior of the replayed entries counts as seen afterwards, so with several shards,
+        behavior only reached by another shard's entries may still be saved again.
+        """
+        corpus = self.get_corpus()
+        if corpus is None:
+            return []
+        failures = []
+        for path, entry in corpus.load()[shard::shards]:
+            try:
+                self.replay(entry)
+            except Exception as e:
+                if entry.failure is not None and not entry.minimized:
+                    path = self._save_minimized(corpus, path, entry, e)
+                failures.append((path, traceback.format_exc()))
+        return failures
+
+    def minimize_last_failure(self) -> Optional[str]:
+        """
+        Shrink the last failing sequence to a minimal reproducer and return its corpus path.
+        The chain must be back in the state the sequence started from.
+        """
+        if self.last_failure is None:
+            return None
+        corpus = self.get_failure_corpus()
+        path, entry = self.last_failure
+        try:
+            self.replay(entry)
+        except Exception as e:
+            path = self._save_minimized(corpus, path, entry, e)
+        self.last_failure = None
+        return path
+
+    def _save_minimized(self, corpus: Corpus, path: str, entry: CorpusEntry, error: Exception) -> str:
+        failure = _get_failure_location(error)
+
+        def fails(candidate: CorpusEntry) -> bool:
+            try:
+                self.replay(candidate)
+            except Exception as e:
+                return _get_failure_location(e) == failure
+            return False
+
+        minimized = minimize(entry, fails)
+        corpus.remove(path)
+        return corpus.save(minimized)
+
+    def _init_run(self) -> None:
+        if not hasattr(self, "scheduler"):
+            self.scheduler = self.scheduler_class()
+        if not hasattr(self, "flows_run"):
+            self.flows_run = 0
+            self._seen = set()
+            self.stats = FuzzStats()
+            self.profiler = FuzzProfiler(self.stats)
+        # Event sequences only matter to novelty, don't decode them when nothing uses it.
+        self._observe_events = self.scheduler.uses_novelty or (self.save_novel and self.get_corpus() is not None)
+        self.stats.eager_events = self.stats.eager_events or self._observe_events
+
+    def _start_sequence(self, seed: int) -> None:
+        random.seed(seed)
+        self.sequence_seed = seed
+        self._steps = []
+        self._observed = []
+        with self.profiler.measure("sequence", "pre_sequence"):
+            self.pre_sequence()
+
+    def _run_flow(self, flow: Callable, seed: int) -> None:
+        random.seed(seed)
+        flow_params = [generate(v) for k, v in get_type_hints(flow, include_extras=True).items() if k != "return"]
+        self._steps.append(CorpusStep(flow.__name__, seed, [format_arg(param) for param in flow_params]))
+        self._observed = []
+        # Counted before the flow runs, so a failing flow counts towards flows to failure.
+        self.flows_run += 1
+        with self.profiler.measure("flow", flow.__name__):
+            self.pre_flow(flow)
+            flow(self, *flow_params)
+            self.post_flow(flow)
+
+    def _run_invariants(self, invariants: List[Callable], invariant_periods: Dict[Callable, int]) -> None:
+        self.pre_invariants()
+        for invariant in invariants:
+            if invariant_periods[invariant] == 0:
+                with self.profiler.measure("invariant", invariant.__name__):
+                    self.pre_invariant(invariant)
+                    invariant(self)
+                    self.post_invariant(invariant)
+            invariant_periods[invariant] = (invariant_periods[invariant] + 1) % getattr(invariant, "period", 1)
+        self.post_invariants()
+
+    def _on_tx(self, tx) -> None:
+        if tx.error is not None:
+            self._observed.append(("revert", get_revert_key(tx.error)))
+        elif self._observe_events:
+            self._observed.append(("events", tuple(type(event).__name__ for event in tx.events)))
+
+    def _is_novel(self, flow: Callable) -> bool:
+        keys = [(flow.__name__,) + key for key in self._observed]
+        state = self.get_model_state()
+        if state is not None:
+            keys.append(("state", state))
+        novel = any(key not in self._seen for key in keys)
+        self._seen.update(keys)
+        return novel
+
+
+def get_campaign_sequence_seeds(seed: int, sequences: int) -> List[int]:
+    # `run` draws the sequence seed first thing after run_sequence seeds `random`.
+    return [random.Random(get_sequence_seed(seed, sequence)).getrandbits(64) for sequence in range(sequences)]
+
+
+def _format_failure(error: Exception) -> str:
+    return "".join(traceback.format_exception_only(type(error), error)).strip()
+
+
+def _get_failure_location(error: Exception) -> Tuple[str, str, int]:
+    # A shrunk sequence must fail the same way: same exception type raised at the same line.
+    frame = traceback.extract_tb(error.__traceback__)[-1]
+    return type(error).__name__, frame.filename, frame.lineno
+
+
+@dataclass
+class ScheduleResult:
+    scheduler: str
+    campaigns: int = 0
+    flows_to_failure: List[int] = field(default_factory=list)
+    seconds_to_failure: List[float] = field(default_factory=list)
+
+    def format(self) -> str:
+        found = len(self.flows_to_failure)
+        flows = sum(self.flows_to_failure) / found if found else float("nan")
+        seconds = sum(self.seconds_to_failure) / found if found else float("nan")
+        return f"{self.scheduler:<20}{found:>6}/{self.campaigns:<6}{flows:>14.1f}{seconds:>12.2f}"
+
+
+def compare_schedulers(
+    test_class: Type[ScheduledFuzzTest],
+    campaigns: int,
+    sequences: int,
+    flows: int,
+    schedulers: Sequence[Type[StaticScheduler]] = (StaticScheduler, AdaptiveScheduler),
+    seed: int = 0,
+) -> List[ScheduleResult]:
+    """
+    Run the same `campaigns` seeded campaigns with every scheduler on the connected chain until
+    their first failure. Only meaningful against a build or model with a known bug.
+    """
+    results = []
+    for scheduler_class in schedulers:
+        result = ScheduleResult(scheduler_class.__name__, campaigns)
+        for campaign in range(campaigns):
+            campaign_seed = get_sequence_seed(seed, campaign)
+            snapshot = default_chain.snapshot()
+            try:
+                random.seed(campaign_seed)
+                test = test_class()
+                test.scheduler = scheduler_class()
+                start = time.perf_counter()
+                for sequence in range(sequences):
+                    try:
+                        run_sequence(test_class, get_sequence_seed(campaign_seed, sequence), flows, test)
+                    except Exception:
+                        result.flows_to_failure.append(test.flows_run)
+                        result.seconds_to_failure.append(time.perf_counter() - start)
+                        break
+            finally:
+                default_chain.revert(snapshot)
+        results.append(result)
+    return results
+
+
+def format_comparison(results: List[ScheduleResult]) -> str:
+    lines = [f"{'scheduler':<20}{'failed':>13}{'flows':>14}{'seconds':>12}"]
+    lines += [result.format() for result in results]
+    return "\n".join(lines)
@@ -0,0 +1,286 @@
+"""
+Where fuzz campaigns spend their time: chain, event decoding, or the Python reference models.
+
+Every flow, invariant and `pre_sequence` call is recorded with its latency split three ways:
+- chain: time in `default_chain.chain_interface` methods, i.e. the RPC round trips to the node,
+- decode: time in wake's `tx.error` and `tx.events` properties, wherever the test, the runner or
+  the scheduler reads them (wake decodes on first access and caches the result),
+- model: everything else, the test's own Python and wake's overhead around the RPC calls.
+
+The profiler doesn't decode anything itself, so the split matches an unprofiled run. Only when
+ScheduledFuzzTest tracks novelty are the events of every transaction decoded, `eager_events`
+says so and the summary notes it.
+
+`FuzzProfiler` measures a live test, `FuzzStats` holds the results, merges across shards and
+exports them as JSON or a summary table.
+"""
+import json
+import time
+from collections import Counter
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from wake.testing import *
+
+from .fuzz_runner import add_tx_listener, get_revert_key, remove_tx_listener
+
+# Bucket i counts latencies in [2^i, 2^(i+1)) microseconds, the last one everything above ~8s.
+HISTOGRAM_BUCKETS = 24
+
+
+@dataclass
+class Histogram:
+    counts: List[int] = field(default_factory=lambda: [0] * HISTOGRAM_BUCKETS)
+    total: float = 0.0
+
+    @property
+    def count(self) -> int:
+        return sum(self.counts)
+
+    def add(self, seconds: float) -> None:
+        bucket = min(max(int(seconds * 1e6), 1).bit_length() - 1, HISTOGRAM_BUCKETS - 1)
+        self.counts[bucket] += 1
+        self.total += seconds
+
+    def quantile(self, q: float) -> float:
+        """
+        Upper bound in seconds of the bucket holding the `q` quantile.
+        """
+        target = q * self.count
+        seen = 0
+        for bucket, count in enumerate(self.counts):
+            seen += count
+            if count and seen >= target:
+                return 2 ** (bucket + 1) / 1e6
+        return 0.0
+
+    def merge(self, other: "Histogram") -> None:
+        self.counts = [a + b for a, b in zip(self.counts, other.counts)]
+        self.total += other.total
+
+    def to_dict(self) -> Dict[str, Any]:
+        count = self.count
+        return {
+            "count": count,
+            "total": self.total,
+            "mean": self.total / count if count else 0.0,
+            "p50": self.quantile(0.5),
+            "p90": self.quantile(0.9),
+            "p99": self.quantile(0.99),
+            "buckets": self.counts,
+        }
+
+
+@dataclass
+class CallStats:
+    # "flow", "invariant" or "sequence" (pre_sequence).
+    kind: str
+    calls: int = 0
+    # Revert selectors or error names of the transactions sent by the call.
+    reverts: Counter = field(default_factory=Counter)
+    total: Histogram = field(default_factory=Histogram)
+    chain: Histogram = field(default_factory=Histogram)
+    decode: Histogram = field(default_factory=Histogram)
+    model: Histogram = field(default_factory=Histogram)
+
+    def merge(self, other: "CallStats") -> None:
+        self.calls += other.calls
+        self.reverts.update(other.reverts)
+        for name in ("total", "chain", "decode", "model"):
+            getattr(self, name).merge(getattr(other, name))
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "kind": self.kind,
+            "calls": self.calls,
+            "reverts": dict(self.reverts.most_common()),
+            "total": self.total.to_dict(),
+            "chain": self.chain.to_dict(),
+            "decode": self.decode.to_dict(),
+            "model": self.model.to_dict(),
+        }
+
+
+@dataclass
+class FuzzStats:
+    calls: Dict[str, CallStats] = field(default_factory=dict)
+    sequences: int = 0
+    # Time spent in FuzzTest.run, summed over shards.
+    elapsed: float = 0.0
+    # Whether the events of every transaction were decoded for novelty tracking.
+    eager_events: bool = False
+
+    @property
+    def sequences_per_second(self) -> float:
+        return self.sequences / self.elapsed if self.elapsed else 0.0
+
+    @property
+    def reverts(self) -> Counter:
+        return sum((call.reverts for call in self.calls.values()), Counter())
+
+    def merge(self, other: "FuzzStats") -> None:
+        for name, call in other.calls.items():
+            self.calls.setdefault(name, CallStats(call.kind)).merge(call)
+        self.sequences += other.sequences
+        self.elapsed += other.elapsed
+        self.eager_events = self.eager_events or other.eager_events
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "sequences": self.sequences,
+            "elapsed": self.elapsed,
+            "sequences_per_second": self.sequences_per_second,
+            "eager_events": self.eager_events,
+            "reverts": dict(self.reverts.most_common()),
+            "calls": {name: call.to_dict() for name, call in self.calls.items()},
+        }
+
+    def to_json(self) -> str:
+        return json.dumps(self.to_dict(), indent=2)
+
+    def format(self) -> str:
+        lines = [
+            f"{self.sequences} sequences in {self.elapsed:.1f}s ({self.sequences_per_second:.2f} sequences/s per worker)",
+        ]
+        if self.eager_events:
+            lines.append("events of every transaction decoded for novelty tracking, included in decode time")
+        lines += [
+            f"{'call':<40}{'kind':>10}{'calls':>8}{'reverts':>9}{'total s':>10}{'chain %':>9}{'decode %':>10}{'model %':>9}{'p50 ms':>9}{'p99 ms':>9}",
+        ]
+        for name, call in sorted(self.calls.items(), key=lambda item: item[1].total.total, reverse=True):
+            total = call.total.total
+
+            def share(histogram: Histogram) -> float:
+                return 100 * histogram.total / total if total else 0.0
+
+            lines.append(
+                f"{name:<40}{call.kind:>10}{call.calls:>8}{sum(call.reverts.values()):>9}{total:>10.2f}"
+                f"{share(call.chain):>9.1f}{share(call.decode):>10.1f}{share(call.model):>9.1f}"
+                f"{call.total.quantile(0.5) * 1e3:>9.2f}{call.total.quantile(0.99) * 1e3:>9.2f}"
+            )
+        return "\n".join(lines)
+
+
+class FuzzProfiler:
+    """
+    Records calls into `stats` between `start` and `stop`, `measure` does nothing outside.
+    """
+
+    stats: FuzzStats
+    _current: Optional[CallStats]
+    _timed: List[Any]
+    _timed_properties: Dict[Tuple[type, str], property]
+
+    def __init__(self, stats: Optional[FuzzStats] = None):
+        self.stats = stats if stats is not None else FuzzStats()
+        self.active = False
+        self._chain = 0.0
+        self._decode = 0.0
+        self._depth = 0
+        self._decode_depth = 0
+        self._current = None
+        self._timed = []
+        self._timed_properties = {}
+
+    def start(self) -> None:
+        self.active = True
+        self._time_chain_interface()
+        # First, so the transaction's properties are timed before other listeners read them.
+        add_tx_listener(self._on_tx, first=True)
+
+    def stop(self) -> None:
+        remove_tx_listener(self._on_tx)
+        for interface, name in self._timed:
+            delattr(interface, name)
+        self._timed = []
+        for (cls, name), prop in self._timed_properties.items():
+            setattr(cls, name, prop)
+        self._timed_properties = {}
+        self.active = False
+
+    @contextmanager
+    def measure(self, kind: str, name: str) -> Iterator[None]:
+        if not self.active:
+            yield
+            return
+        call = self.stats.calls.setdefault(name, CallStats(kind))
+        previous = self._current
+        chain = self._chain
+        decode = self._decode
+        self._current = call
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            chain = self._chain - chain
+            decode = self._decode - decode
+            call.calls += 1
+            call.total.add(elapsed)
+            call.chain.add(chain)
+            call.decode.add(decode)
+            call.model.add(max(elapsed - chain - decode, 0.0))
+            self._current = previous
+
+    def _time_chain_interface(self) -> None:
+        # Shadow the interface's public methods with timed instance attributes, `stop` deletes
+        # them again. The interface object itself stays in place, wake checks its type.
+        interface = getattr(default_chain, "chain_interface", None)
+        if interface is None:
+            return
+        for name in dir(type(interface)):
+            if name.startswith("_") or not callable(getattr(type(interface), name, None)):
+                continue
+            setattr(interface, name, self._timed_call(getattr(interface, name)))
+            self._timed.append((interface, name))
+
+    def _timed_call(self, method: Callable) -> Callable:
+        def timed(*args, **kwargs):
+            # Only the outermost call counts, interface methods call each other.
+            self._depth += 1
+            start = time.perf_counter()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                self._depth -= 1
+                if self._depth == 0:
+                    self._chain += time.perf_counter() - start
+
+        return timed
+
+    def _time_decoding(self, tx) -> None:
+        # Replace the `error` and `events` properties of the transaction's class with timed
+        # ones, `stop` puts the originals back. Only what somebody reads gets decoded.
+        for name in ("error", "events"):
+            for cls in type(tx).__mro__:
+                prop = cls.__dict__.get(name)
+                if isinstance(prop, property):
+                    break
+            else:
+                continue
+            if (cls, name) not in self._timed_properties:
+                self._timed_properties[(cls, name)] = prop
+                setattr(cls, name, property(self._timed_decode(prop.fget)))
+
+    def _timed_decode(self, fget: Callable) -> Callable:
+        def timed(tx):
+            self._decode_depth += 1
+            start = time.perf_counter()
+            chain = self._chain
+            try:
+                return fget(tx)
+            finally:
+                self._decode_depth -= 1
+                # Decoding may fetch a trace from the node, that part is chain time.
+                if self._decode_depth == 0:
+                    self._decode += time.perf_counter() - start - (self._chain - chain)
+
+        return timed
+
+    def _on_tx(self, tx) -> None:
+        self._time_decoding(tx)
+        if self._current is not None:
+            error = tx.error
+            if error is not None:
+                self._current.reverts[get_revert_key(error)] += 1
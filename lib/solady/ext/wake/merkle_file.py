@@ -0,0 +1,224 @@
+"""
+MerkleTree for millions of leaves, built into a file and served from it.
+
+Leaves are streamed and hashed in chunks across worker processes with pycryptodome's keccak,
+each upper level is split into ranges that workers hash straight into the memory-mapped file.
+The file is a 32 byte header followed by every level as contiguous 32 byte nodes, leaf hashes
+first and the root last, so proofs only read the nodes they need.
+
+With the suite moved to `tests/` like in CI:
+
+    python -m tests.merkle_file build leaves.txt tree.bin
+    python -m tests.merkle_file proof tree.bin 42
+"""
+import argparse
+import mmap
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+from Crypto.Hash import keccak
+
+from .utils import get_multiproof, get_proof
+
+MAGIC = b"MERKLE01"
+HEADER_SIZE = 32
+NODE_SIZE = 32
+CHUNK_SIZE = 1 << 16
+
+
+def keccak256(data: bytes) -> bytes:
+    return keccak.new(digest_bits=256, data=data).digest()
+
+
+def get_level_sizes(leaves: int) -> List[int]:
+    if leaves == 0:
+        raise ValueError("Tree has no leaves")
+    sizes = [leaves]
+    while sizes[-1] > 1:
+        sizes.append((sizes[-1] + 1) // 2)
+    return sizes
+
+
+def get_level_offsets(sizes: List[int]) -> List[int]:
+    offsets = [HEADER_SIZE]
+    for size in sizes[:-1]:
+        offsets.append(offsets[-1] + size * NODE_SIZE)
+    return offsets
+
+
+def read_leaves(path: str) -> Iterator[bytes]:
+    """
+    Leaves from a text file, one hex encoded leaf per line.
+    """
+    with open(path) as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                yield bytes.fromhex(line[2:] if line.startswith("0x") else line)
+
+
+def build_merkle_file(leaves: Iterable[bytes], path: str, workers: Optional[int] = None, chunk_size: int = CHUNK_SIZE) -> "MerkleFile":
+    """
+    Write the tree of `leaves` to `path`. Only `chunk_size` leaves per worker are held in
+    memory at a time.
+    """
+    workers = workers or os.cpu_count() or 1
+    executor = ProcessPoolExecutor(workers) if workers > 1 else None
+    try:
+        with open(path, "wb") as f:
+            f.write(bytes(HEADER_SIZE))
+            count = 0
+            for hashes in _hash_chunks(executor, workers, leaves, chunk_size):
+                f.write(hashes)
+                count += len(hashes) // NODE_SIZE
+
+            sizes = get_level_sizes(count)
+            offsets = get_level_offsets(sizes)
+            f.truncate(offsets[-1] + NODE_SIZE)
+            f.seek(0)
+            f.write(MAGIC + count.to_bytes(8, "big"))
+
+        for depth in range(1, len(sizes)):
+            ranges = [
+                (path, offsets[depth - 1], sizes[depth - 1], offsets[depth], start, min(start + chunk_size, sizes[depth]))
+                for start in range(0, sizes[depth], chunk_size)
+            ]
+            if executor is None or len(ranges) == 1:
+                for r in ranges:
+                    _hash_level_range(*r)
+            else:
+                list(executor.map(_hash_level_range, *zip(*ranges)))
+    finally:
+        if executor is not None:
+            executor.shutdown()
+    return MerkleFile(path)
+
+
+class _Level:
+    """
+    Read-only view of one level of a `MerkleFile`, indexable like a list of nodes.
+    """
+
+    def __init__(self, data: mmap.mmap, offset: int, size: int):
+        self._data = data
+        self._offset = offset
+        self._size = size
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __getitem__(self, index: int) -> bytes:
+        if not 0 <= index < self._size:
+            raise IndexError("Node index out of range")
+        start = self._offset + index * NODE_SIZE
+        return self._data[start:start + NODE_SIZE]
+
+
+class MerkleFile:
+    _file: object
+    _data: mmap.mmap
+    levels: List[_Level]
+
+    def __init__(self, path: str):
+        self._file = open(path, "rb")
+        self._data = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._data[:len(MAGIC)] != MAGIC:
+            self.close()
+            raise ValueError(f"{path} is not a Merkle tree file")
+        sizes = get_level_sizes(int.from_bytes(self._data[len(MAGIC):len(MAGIC) + 8], "big"))
+        self.levels = [_Level(self._data, offset, size) for offset, size in zip(get_level_offsets(sizes), sizes)]
+
+    def __enter__(self) -> "MerkleFile":
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    def __len__(self) -> int:
+        return len(self.levels[0])
+
+    @property
+    def root(self) -> bytes:
+        return self.levels[-1][0]
+
+    def get_leaf_hash(self, index: int) -> bytes:
+        return self.levels[0][index]
+
+    def get_proof(self, index: int) -> List[bytes]:
+        if not 0 <= index < len(self):
+            raise IndexError("Leaf index out of range")
+        return get_proof(self.levels, index)
+
+    def get_multiproof(self, indexes: List[int]) -> Tuple[List[bytes], List[bool]]:
+        return get_multiproof(self.levels, indexes)
+
+    def close(self) -> None:
+        self._data.close()
+        self._file.close()
+
+
+def _hash_leaves(leaves: List[bytes]) -> bytes:
+    return b"".join(keccak256(leaf) for leaf in leaves)
+
+
+def _hash_chunks(executor: Optional[ProcessPoolExecutor], workers: int, leaves: Iterable[bytes], chunk_size: int) -> Iterator[bytes]:
+    # Leaf hashes chunk by chunk in order, with at most two chunks per worker in flight.
+    leaves = iter(leaves)
+    chunks = iter(lambda: list(islice(leaves, chunk_size)), [])
+    if executor is None:
+        yield from map(_hash_leaves, chunks)
+        return
+    pending = deque()
+    for chunk in chunks:
+        pending.append(executor.submit(_hash_leaves, chunk))
+        if len(pending) >= 2 * workers:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+
+def _hash_level_range(path: str, children_offset: int, children: int, offset: int, start: int, stop: int) -> None:
+    # Parents [start, stop) of a level, written in place.
+    with open(path, "r+b") as f, mmap.mmap(f.fileno(), 0) as data:
+        nodes = data[children_offset + 2 * start * NODE_SIZE:children_offset + min(2 * stop, children) * NODE_SIZE]
+        out = bytearray((stop - start) * NODE_SIZE)
+        for i in range(stop - start):
+            a = nodes[2 * i * NODE_SIZE:(2 * i + 1) * NODE_SIZE]
+            b = nodes[(2 * i + 1) * NODE_SIZE:(2 * i + 2) * NODE_SIZE] or a
+            out[i * NODE_SIZE:(i + 1) * NODE_SIZE] = keccak256(a + b) if a < b else keccak256(b + a)
+        data[offset + start * NODE_SIZE:offset + stop * NODE_SIZE] = out
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Disk backed MerkleTree for MerkleProofLib")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    build = subparsers.add_parser("build", help="Build a tree file from hex leaves, one per line.")
+    build.add_argument("leaves")
+    build.add_argument("tree")
+    build.add_argument("--workers", type=int, default=None)
+    build.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    root = subparsers.add_parser("root")
+    root.add_argument("tree")
+    proof = subparsers.add_parser("proof")
+    proof.add_argument("tree")
+    proof.add_argument("index", type=int)
+    args = parser.parse_args()
+
+    if args.command == "build":
+        tree = build_merkle_file(read_leaves(args.leaves), args.tree, args.workers, args.chunk_size)
+    else:
+        tree = MerkleFile(args.tree)
+    with tree:
+        if args.command == "proof":
+            print("leaf", "0x" + tree.get_leaf_hash(args.index).hex())
+            for node in tree.get_proof(args.index):
+                print("0x" + node.hex())
+        else:
+            print(f"{len(tree)} leaves, root 0x{tree.root.hex()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+"""
+Signed hashes generated ahead of the signature checker flows.
+
+Everything a sequence signs is derived from its seed: the signer key with `get_signer_key`, the
+i-th signed hash from the seed and i. `SignaturePool.prepare` signs the first items of many
+sequences in worker processes; run_sharded calls it through the test's `prepare_campaign`
+before forking the shards, which inherit the results and don't sign at all. Items that weren't
+prepared are signed when the sequence takes them, so a sequence sees the same signatures whether
+or not they were prepared. `finish` drops a sequence's items once it's done, so a pool only holds
+the prepared sequences that haven't run yet and the current one.
+
+With a cache directory (FUZZ_SIGNATURE_CACHE in the test), the items of every sequence are also
+stored under its signer's address. Reruns with a fixed seed and corpus replays use the same
+signers and read them back instead of signing.
+"""
+import multiprocessing
+import os
+import random
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+from typing import Dict, Iterable, List, NamedTuple, Optional
+
+from eth_keys import keys
+from wake.testing import keccak256
+
+
+class SignedHash(NamedTuple):
+    data: bytes
+    hash: bytes
+    signature: bytes
+    r: bytes
+    s: bytes
+    v: int
+    # EIP-2098 compact s with the parity of v in its top bit.
+    vs: bytes
+
+    @classmethod
+    def from_signature(cls, data: bytes, signature: bytes) -> "SignedHash":
+        r = signature[:32]
+        s = signature[32:64]
+        v = signature[64]
+        vs = s if v == 27 else (s[0] | 0x80).to_bytes(1, "big") + s[1:]
+        return cls(data, keccak256(data), signature, r, s, v, vs)
+
+
+def get_signer_key(seed: int) -> bytes:
+    return keccak256(f"signer:{seed}".encode())
+
+
+def sign_range(seed: int, start: int, stop: int, max_data_length: int) -> List[SignedHash]:
+    key = keys.PrivateKey(get_signer_key(seed))
+    items = []
+    for i in range(start, stop):
+        rng = random.Random(f"{seed}:{i}")
+        data = rng.randbytes(rng.randint(0, max_data_length))
+        signature = key.sign_msg_hash(keccak256(data)).to_bytes()
+        # eth_keys returns v as 0 / 1, Account.sign_hash as 27 / 28.
+        items.append(SignedHash.from_signature(data, signature[:64] + bytes([signature[64] + 27])))
+    return items
+
+
+def encode_items(items: List[SignedHash]) -> bytes:
+    return b"".join(len(item.data).to_bytes(2, "big") + item.data + item.signature for item in items)
+
+
+def decode_items(encoded: bytes) -> List[SignedHash]:
+    items = []
+    offset = 0
+    while offset < len(encoded):
+        length = int.from_bytes(encoded[offset:offset + 2], "big")
+        data = encoded[offset + 2:offset + 2 + length]
+        signature = encoded[offset + 2 + length:offset + 67 + length]
+        items.append(SignedHash.from_signature(data, signature))
+        offset += 67 + length
+    return items
+
+
+class SignaturePool:
+    """
+    Signed hashes by sequence seed. `start` selects a sequence, `next` takes its next item.
+    """
+
+    _signed: Dict[int, List[SignedHash]]
+    # Number of items of each sequence stored in the cache.
+    _cached: Dict[int, int]
+    _seed: Optional[int]
+
+    def __init__(self, max_data_length: int = 1000, cache_dir: Optional[str] = None):
+        self.max_data_length = max_data_length
+        self.cache_dir = cache_dir
+        self._signed = {}
+        self._cached = {}
+        self._seed = None
+        self._position = 0
+
+    def prepare(self, seeds: Iterable[int], count: int, workers: Optional[int] = None) -> None:
+        """
+        Sign the first `count` items of every sequence in `seeds` over `workers` processes,
+        defaulting to the CPU count. The processes only live for this call.
+        """
+        seeds = list(seeds)
+        for seed in seeds:
+            self._load(seed)
+        seeds = [seed for seed in seeds if len(self._signed[seed]) < count]
+        workers = min(workers or os.cpu_count() or 1, len(seeds))
+        args = (seeds, [len(self._signed[seed]) for seed in seeds], repeat(count), repeat(self.max_data_length))
+        # Daemonic processes (e.g. fuzz_runner shards) can't start workers, sign inline there.
+        if workers <= 1 or multiprocessing.current_process().daemon:
+            signed = list(map(sign_range, *args))
+        else:
+            with ProcessPoolExecutor(workers) as executor:
+                signed = list(executor.map(sign_range, *args, chunksize=max(len(seeds) // (4 * workers), 1)))
+        for seed, items in zip(seeds, signed):
+            self._signed[seed] += items
+            self._store(seed)
+
+    def start(self, seed: int) -> None:
+        if self._seed is not None:
+            self.finish()
+        self._seed = seed
+        self._position = 0
+        self._load(seed)
+
+    def next(self) -> SignedHash:
+        assert self._seed is not None, "start a sequence first"
+        items = self._signed[self._seed]
+        if self._position == len(items):
+            items += sign_range(self._seed, len(items), len(items) + 1, self.max_data_length)
+        item = items[self._position]
+        self._position += 1
+        return item
+
+    def finish(self) -> None:
+        """
+        Store the current sequence's items in the cache and drop them. `start` does this for a
+        sequence that didn't finish, e.g. one that failed.
+        """
+        assert self._seed is not None, "start a sequence first"
+        self._store(self._seed)
+        del self._signed[self._seed]
+        del self._cached[self._seed]
+        self._seed = None
+
+    def _get_cache_path(self, seed: int) -> Optional[str]:
+        if self.cache_dir is None:
+            return None
+        address = keys.PrivateKey(get_signer_key(seed)).public_key.to_checksum_address()
+        return os.path.join(self.cache_dir, address, f"{self.max_data_length}.bin")
+
+    def _load(self, seed: int) -> None:
+        if seed in self._signed:
+            return
+        path = self._get_cache_path(seed)
+        if path is not None and os.path.exists(path):
+            with open(path, "rb") as f:
+                self._signed[seed] = decode_items(f.read())
+        else:
+            self._signed[seed] = []
+        self._cached[seed] = len(self._signed[seed])
+
+    def _store(self, seed: int) -> None:
+        # Items only ever get appended, a longer list replaces the cached one.
+        path = self._get_cache_path(seed)
+        items = self._signed[seed]
+        if path is None or len(items) <= self._cached[seed]:
+            return
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(f"{path}.{os.getpid()}.tmp", "wb") as f:
+            f.write(encode_items(items))
+        os.replace(f"{path}.{os.getpid()}.tmp", path)
+        self._cached[seed] = len(items)
@@ -6,6 +6,10 @@ from wake.testing.fuzzing import *
 from pytypes.src.utils.ERC1967Factory import ERC1967Factory
 from pytypes.tests.EIP712Mock import EIP712Mock
 
+from .fuzz_fixture import FixtureFuzzTest
+from .fuzz_runner import run_sharded
+from .fuzz_scheduler import ScheduledFuzzTest
+
 
 @dataclass
 class Person:
@@ -20,17 +24,18 @@ class Mail:
     contents: str
 
 
-class Eip712FuzzTest(FuzzTest):
+class Eip712FuzzTest(FixtureFuzzTest, ScheduledFuzzTest):
     _proxy_factory: ERC1967Factory
     _eip712: EIP712Mock
     _eip712_proxy: EIP712Mock
     _signer: Account
 
-    def __init__(self):
+    def setup_fixture(self) -> None:
         self._proxy_factory = ERC1967Factory.deploy()
+        self._eip712 = EIP712Mock.deploy()
 
     def pre_sequence(self) -> None:
-        self._eip712 = EIP712Mock.deploy()
+        super().pre_sequence()
         self._signer = Account.new()
         self._eip712_proxy = EIP712Mock(
             self._proxy_factory.deploy_(self._eip712, self._signer).return_value
@@ -59,6 +64,5 @@ class Eip712FuzzTest(FuzzTest):
         assert sign1 == sign2
 
 
-@default_chain.connect()
 def test_eip712_fuzz():
-    Eip712FuzzTest().run(10, 10)
+    run_sharded(Eip712FuzzTest, 10, 10).check()
@@ -7,23 +7,41 @@ from wake.testing import *
 from wake.testing.fuzzing import *
 from pytypes.tests.ERC1155Mock import ERC1155Mock
 
+from .fuzz_fixture import FixtureFuzzTest
+from .fuzz_runner import run_sharded
+from .fuzz_scheduler import AdaptiveScheduler, ScheduledFuzzTest
+from .utils import IndexedDict
+
 
 logger = logging.getLogger(__name__)
 #logger.setLevel(logging.DEBUG)
 
 
-class ERC1155FuzzTest(FuzzTest):
+class ERC1155FuzzTest(FixtureFuzzTest, ScheduledFuzzTest):
+    fixture_attributes = ("_balances", "_approvals")
+    scheduler_class = AdaptiveScheduler
+
     _erc1155: ERC1155Mock
-    _balances: DefaultDict[Account, DefaultDict[uint256, uint256]]
+    # Only non-zero balances are stored, missing ids read as 0.
+    _balances: DefaultDict[Account, IndexedDict[uint256, uint256]]
     _approvals: DefaultDict[Account, Set[Account]]
     _token_ids: List[uint256]
 
-    def pre_sequence(self) -> None:
+    def setup_fixture(self) -> None:
         self._erc1155 = ERC1155Mock.deploy(True)
-        self._balances = defaultdict(lambda: defaultdict(lambda: 0))
+        self._balances = defaultdict(lambda: IndexedDict(default=0))
         self._approvals = defaultdict(set)
+
+    def pre_sequence(self) -> None:
+        super().pre_sequence()
         self._token_ids = [random_int(0, 2 ** 256 - 1, edge_values_prob=0.25) for _ in range(10)]
 
+    def get_model_state(self):
+        # Orders of magnitude of non-zero holdings and approvals.
+        holdings = sum(len(balances) for balances in self._balances.values())
+        approvals = sum(len(operators) for operators in self._approvals.values())
+        return holdings.bit_length(), approvals.bit_length()
+
     @flow()
     def flow_mint(self, payload: bytearray) -> None:
         a = random_account()
@@ -78,8 +96,8 @@ class ERC1155FuzzTest(FuzzTest):
     def flow_burn(self) -> None:
         owner = random_account()
 
-        if random.random() < 0.8 and sum(self._balances[owner].values()) > 0:
-            id = random.choice([k for k in self._balances[owner].keys() if self._balances[owner][k] > 0])
+        if random.random() < 0.8 and len(self._balances[owner]) > 0:
+            id = self._balances[owner].random_key()
         else:
             id = random.choice(self._token_ids)
 
@@ -123,8 +141,8 @@ class ERC1155FuzzTest(FuzzTest):
         ids = []
         amounts = []
         for _ in range(random_int(0, 10, edge_values_prob=0.05)):
-            if random.random() < 0.98 and sum(self._balances[owner].values()) > 0:
-                id = random.choice([k for k in self._balances[owner].keys() if self._balances[owner][k] > 0])
+            if random.random() < 0.98 and len(self._balances[owner]) > 0:
+                id = self._balances[owner].random_key()
                 ids.append(id)
                 if self._balances[owner][id] == 0:
                     amount = random.choice([0, 1])
@@ -173,8 +191,8 @@ class ERC1155FuzzTest(FuzzTest):
     def flow_burn_unchecked(self) -> None:
         owner = random_account()
 
-        if random.random() < 0.8 and sum(self._balances[owner].values()) > 0:
-            id = random.choice([k for k in self._balances[owner].keys() if self._balances[owner][k] > 0])
+        if random.random() < 0.8 and len(self._balances[owner]) > 0:
+            id = self._balances[owner].random_key()
         else:
             id = random.choice(self._token_ids)
 
@@ -219,8 +237,8 @@ class ERC1155FuzzTest(FuzzTest):
         ids = []
         amounts = []
         for _ in range(random_int(0, 10, edge_values_prob=0.05)):
-            if random.random() < 0.98 and sum(self._balances[owner].values()) > 0:
-                id = random.choice([k for k in self._balances[owner].keys() if self._balances[owner][k] > 0])
+            if random.random() < 0.98 and len(self._balances[owner]) > 0:
+                id = self._balances[owner].random_key()
                 ids.append(id)
                 if self._balances[owner][id] == 0:
                     amount = random.choice([0, 1])
@@ -308,8 +326,8 @@ class ERC1155FuzzTest(FuzzTest):
         owner = random_account()
         recipient = random_account()
 
-        if random.random() < 0.8 and sum(self._balances[owner].values()) > 0:
-            id = random.choice([k for k in self._balances[owner].keys() if self._balances[owner][k] > 0])
+        if random.random() < 0.8 and len(self._balances[owner]) > 0:
+            id = self._balances[owner].random_key()
         else:
             id = random.choice(self._token_ids)
 
@@ -356,8 +374,8 @@ class ERC1155FuzzTest(FuzzTest):
         ids = []
         amounts = []
         for _ in range(random_int(0, 10, edge_values_prob=0.05)):
-            if random.random() < 0.98 and sum(self._balances[owner].values()) > 0:
-                id = random.choice([k for k in self._balances[owner].keys() if self._balances[owner][k] > 0])
+            if random.random() < 0.98 and len(self._balances[owner]) > 0:
+                id = self._balances[owner].random_key()
                 ids.append(id)
                 if self._balances[owner][id] == 0:
                     amount = random.choice([0, 1])
@@ -414,8 +432,8 @@ class ERC1155FuzzTest(FuzzTest):
         owner = random_account()
         recipient = random_account()
 
-        if random.random() < 0.8 and sum(self._balances[owner].values()) > 0:
-            id = random.choice([k for k in self._balances[owner].keys() if self._balances[owner][k] > 0])
+        if random.random() < 0.8 and len(self._balances[owner]) > 0:
+            id = self._balances[owner].random_key()
         else:
             id = random.choice(self._token_ids)
 
@@ -463,8 +481,8 @@ class ERC1155FuzzTest(FuzzTest):
         ids = []
         amounts = []
         for _ in range(random_int(0, 10, edge_values_prob=0.05)):
-            if random.random() < 0.98 and sum(self._balances[owner].values()) > 0:
-                id = random.choice([k for k in self._balances[owner].keys() if self._balances[owner][k] > 0])
+            if random.random() < 0.98 and len(self._balances[owner]) > 0:
+                id = self._balances[owner].random_key()
                 ids.append(id)
                 if self._balances[owner][id] == 0:
                     amount = random.choice([0, 1])
@@ -520,7 +538,7 @@ class ERC1155FuzzTest(FuzzTest):
     @invariant(period=20)
     def invariant_balances(self) -> None:
         for a, balances in self._balances.items():
-            assert self._erc1155.balanceOfBatch([a] * len(balances), list(balances.keys())) == list(balances.values())
+            assert self._erc1155.balanceOfBatch([a] * len(self._token_ids), self._token_ids) == [balances[id] for id in self._token_ids]
             for id, balance in balances.items():
                 assert self._erc1155.balanceOf(a, id) == balance
 
@@ -531,6 +549,5 @@ class ERC1155FuzzTest(FuzzTest):
                 assert self._erc1155.isApprovedForAll(a, b) == (b in self._approvals[a])
 
 
-@default_chain.connect(accounts=20)
 def test_erc1155_fuzz():
-    ERC1155FuzzTest().run(1, 100)
+    run_sharded(ERC1155FuzzTest, 1, 100, connect_kwargs={"accounts": 20}).check()
@@ -5,24 +5,29 @@ from wake.testing import *
 
 from pytypes.tests.ERC721Mock import ERC721Mock
 
+from .fuzz_fixture import FixtureFuzzTest
+from .fuzz_runner import run_sharded
+from .fuzz_scheduler import AdaptiveScheduler, ScheduledFuzzTest
+from .utils import IndexedDict
+
 
 ###################################################################
 ####################### PYTHON ERC721 MODEL #######################
 ###################################################################
 class ERC721:
     # mapping owner -> token id
-    owners: dict[int, Address]
+    owners: IndexedDict[int, Address]
     # mapping owner -> token count
     balances: dict[Address, int]
     # mapping token id -> approved address
-    approvals: dict[int, Address]
+    approvals: IndexedDict[int, Address]
     # mapping operator approval owner -> operator
-    operators: dict[Address, Address]
+    operators: IndexedDict[Address, Address]
     def __init__(self):
-        self.owners = {}
+        self.owners = IndexedDict()
         self.balances = {}
-        self.approvals = {}
-        self.operators = {}
+        self.approvals = IndexedDict()
+        self.operators = IndexedDict()
 
     def balance_of(self, _owner: Address):
         return self.balances[_owner]
@@ -87,7 +92,10 @@ class ERC721:
 ########################### Fuzz Test #############################
 ###################################################################
 
-class ERC721FuzzTest(FuzzTest):
+class ERC721FuzzTest(FixtureFuzzTest, ScheduledFuzzTest):
+    fixture_attributes = ("_py_erc721",)
+    scheduler_class = AdaptiveScheduler
+
     _erc721: ERC721Mock
     _py_erc721: ERC721
     _id_counter: int
@@ -96,13 +104,20 @@ class ERC721FuzzTest(FuzzTest):
     # We want more interaction by addresses that are already managing something
     _addresses: List[Address]
 
-    def pre_sequence(self) -> None:
+    def setup_fixture(self) -> None:
         self._erc721 = ERC721Mock.deploy()
         self._py_erc721 = ERC721()
+
+    def pre_sequence(self) -> None:
+        super().pre_sequence()
         self._addresses = []
         for i in range(20):
             self._addresses.append(random_address())
 
+    def get_model_state(self):
+        # Orders of magnitude of owned tokens, approvals and operators.
+        return len(self._py_erc721.owners).bit_length(), len(self._py_erc721.approvals).bit_length(), len(self._py_erc721.operators).bit_length()
+
     ######################## MINT ########################
     @flow(weight=100)
     def mint(self) -> None:
@@ -125,7 +140,7 @@ class ERC721FuzzTest(FuzzTest):
     def burn_owner(self) -> None:
         if self._py_erc721.owners:
             # Random token with owner
-            token_id, owner = random.choice(list(self._py_erc721.owners.items()))
+            token_id, owner = self._py_erc721.owners.random_item()
             # Burn in contract, msg.sender == owner
             tx = self._erc721.burn(token_id, from_=owner)
             # Check events
@@ -141,7 +156,7 @@ class ERC721FuzzTest(FuzzTest):
     def burn_approved(self) -> None:
         if self._py_erc721.approvals:
             # Random token with owner
-            token_id, approved = random.choice(list(self._py_erc721.approvals.items()))
+            token_id, approved = self._py_erc721.approvals.random_item()
             if token_id in self._py_erc721.owners.keys():
                 owner = self._py_erc721.owners[token_id]
                 # Burn in contract, msg.sender == approved
@@ -158,7 +173,7 @@ class ERC721FuzzTest(FuzzTest):
     @flow(weight=40)
     def burn_operator(self) -> None:
         if self._py_erc721.operators:
-            owner, operator = random.choice(list(self._py_erc721.operators.items()))
+            owner, operator = self._py_erc721.operators.random_item()
             if owner in self._py_erc721.owners.keys():
                 token_id = self._py_erc721.owners[owner]
                 # Burn in contract, msg.sender == operator
@@ -177,7 +192,7 @@ class ERC721FuzzTest(FuzzTest):
     def transfer_owner(self) -> None:
         # from == by == owner
         if self._py_erc721.owners:
-            token_id, owner = random.choice(list(self._py_erc721.owners.items()))
+            token_id, owner = self._py_erc721.owners.random_item()
             to = random.choice(self._addresses)
             # Transfer in contract, msg.sender == owner
             tx = self._erc721.transfer(owner, to, token_id, from_ = owner)
@@ -193,7 +208,7 @@ class ERC721FuzzTest(FuzzTest):
     def transfer_approved(self) -> None:
         # by == approved, from == owner
         if self._py_erc721.approvals:
-            token_id, approved = random.choice(list(self._py_erc721.approvals.items()))
+            token_id, approved = self._py_erc721.approvals.random_item()
             if token_id in self._py_erc721.owners.keys():
                 owner = self._py_erc721.owners[token_id]
                 to = random.choice(self._addresses)
@@ -211,7 +226,7 @@ class ERC721FuzzTest(FuzzTest):
     def transfer_operator(self) -> None:
         # by == operator, from == owner
         if self._py_erc721.operators:
-            owner, operator = random.choice(list(self._py_erc721.operators.items()))
+            owner, operator = self._py_erc721.operators.random_item()
             if owner in self._py_erc721.owners.keys():
                 token_id = self._py_erc721.owners[owner]
                 to = random.choice(self._addresses)
@@ -230,7 +245,7 @@ class ERC721FuzzTest(FuzzTest):
     def transfer_from_owner(self) -> None:
         # from == by == owner
         if self._py_erc721.owners:
-            token_id, owner = random.choice(list(self._py_erc721.owners.items()))
+            token_id, owner = self._py_erc721.owners.random_item()
             to = random.choice(self._addresses)
             # Transfer in contract, msg.sender == owner
             tx = self._erc721.transferFrom(owner, to, token_id, from_ = owner)
@@ -246,7 +261,7 @@ class ERC721FuzzTest(FuzzTest):
     def transfer_from_approved(self) -> None:
         # by == approved, from == owner
         if self._py_erc721.approvals:
-            token_id, approved = random.choice(list(self._py_erc721.approvals.items()))
+            token_id, approved = self._py_erc721.approvals.random_item()
             if token_id in self._py_erc721.owners.keys():
                 owner = self._py_erc721.owners[token_id]
                 to = random.choice(self._addresses)
@@ -264,7 +279,7 @@ class ERC721FuzzTest(FuzzTest):
     def transfer_from_operator(self) -> None:
         # by == operator, from == owner
         if self._py_erc721.operators:
-            owner, operator = random.choice(list(self._py_erc721.operators.items()))
+            owner, operator = self._py_erc721.operators.random_item()
             if owner in self._py_erc721.owners.keys():
                 token_id = self._py_erc721.owners[owner]
                 to = random.choice(self._addresses)
@@ -282,7 +297,7 @@ class ERC721FuzzTest(FuzzTest):
     @flow(weight=50)
     def approve_owner(self) -> None:
         if self._py_erc721.owners:
-            token_id, owner = random.choice(list(self._py_erc721.owners.items()))
+            token_id, owner = self._py_erc721.owners.random_item()
             account = random.choice(self._addresses)
             # Approve in contract
             tx = self._erc721.approve(account, token_id, from_=owner)
@@ -297,7 +312,7 @@ class ERC721FuzzTest(FuzzTest):
     @flow(weight=40)
     def dis_approve_owner(self) -> None:
         if self._py_erc721.owners:
-            token_id, owner = random.choice(list(self._py_erc721.owners.items()))
+            token_id, owner = self._py_erc721.owners.random_item()
             if token_id in self._py_erc721.approvals.keys():
                 # Delete approval in contract
                 tx = self._erc721.approve(Address(0), token_id, from_=owner)
@@ -311,7 +326,7 @@ class ERC721FuzzTest(FuzzTest):
     @flow(weight=40)
     def approve_operator(self) -> None:
         if self._py_erc721.operators:
-            owner, operator = random.choice(list(self._py_erc721.operators.items()))
+            owner, operator = self._py_erc721.operators.random_item()
             if owner in self._py_erc721.owners.keys():
                 token_id = self._py_erc721.owners[owner]
                 account = random.choice(self._addresses)
@@ -328,7 +343,7 @@ class ERC721FuzzTest(FuzzTest):
     @flow(weight=40)
     def approve_for_all(self) -> None:
         if self._py_erc721.owners:
-            _, owner = random.choice(list(self._py_erc721.owners.items()))
+            _, owner = self._py_erc721.owners.random_item()
             operator = random.choice(self._addresses)
             # Set approve for all in contract
             tx = self._erc721.setApprovalForAll(operator, True, from_=owner)
@@ -358,7 +373,6 @@ class ERC721FuzzTest(FuzzTest):
             assert self._erc721.getApproved(token_id) == approved
 
 
-@default_chain.connect()
 def test_eip712_fuzz():
-    ERC721FuzzTest().run(30, 600)
+    run_sharded(ERC721FuzzTest, 30, 600).check()
 
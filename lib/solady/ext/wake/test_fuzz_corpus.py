@@ -0,0 +1,86 @@
+import tempfile
+from dataclasses import replace
+
+from .fuzz_corpus import Corpus, CorpusEntry, CorpusStep, minimize
+
+
+def make_entry(flows, failure=None) -> CorpusEntry:
+    return CorpusEntry("ExampleFuzzTest", 42, [CorpusStep(flow, i, [repr(i)]) for i, flow in enumerate(flows)], failure)
+
+
+def fails_on_transfer_after_mint(entry: CorpusEntry) -> bool:
+    # Fails once a transfer follows a mint, like a model bug needing both flows.
+    flows = [step.flow for step in entry.steps]
+    return "flow_mint" in flows and "flow_transfer" in flows[flows.index("flow_mint"):]
+
+
+def test_minimize():
+    flows = ["flow_burn", "flow_approve", "flow_mint", "flow_burn", "flow_approve", "flow_approve", "flow_transfer", "flow_burn", "flow_transfer"]
+    entry = make_entry(flows, "AssertionError")
+    replays = []
+
+    def fails(candidate: CorpusEntry) -> bool:
+        replays.append(candidate)
+        return fails_on_transfer_after_mint(candidate)
+
+    minimized = minimize(entry, fails)
+    assert [(step.flow, step.seed) for step in minimized.steps] == [("flow_mint", 2), ("flow_transfer", 8)]
+    assert minimized.minimized
+    assert (minimized.test, minimized.seed, minimized.failure) == (entry.test, entry.seed, entry.failure)
+    assert not entry.minimized and len(entry.steps) == len(flows)
+    # Removing any remaining step makes the failure go away.
+    for i in range(len(minimized.steps)):
+        assert not fails_on_transfer_after_mint(replace(minimized, steps=minimized.steps[:i] + minimized.steps[i + 1:]))
+    assert len(replays) <= 200
+
+
+def test_minimize_max_replays():
+    entry = make_entry(["flow_approve"] * 20 + ["flow_mint", "flow_transfer"], "AssertionError")
+    replays = []
+
+    def fails(candidate: CorpusEntry) -> bool:
+        replays.append(candidate)
+        return fails_on_transfer_after_mint(candidate)
+
+    minimized = minimize(entry, fails, max_replays=3)
+    assert len(replays) == 3
+    # Cut short, but whatever was kept still fails.
+    assert 2 < len(minimized.steps) < len(entry.steps)
+    assert fails_on_transfer_after_mint(minimized)
+    assert minimized.minimized
+
+
+def test_minimize_keeps_entries_that_stop_failing():
+    entry = make_entry(["flow_mint", "flow_transfer"], "AssertionError")
+    assert minimize(entry, lambda candidate: False).steps == entry.steps
+
+
+def test_corpus_entry_json():
+    entry = make_entry(["flow_mint", "flow_transfer"], "AssertionError: x")
+    entry.minimized = True
+    loaded = CorpusEntry.from_json(entry.to_json())
+    assert loaded == entry
+    assert isinstance(loaded.steps[0], CorpusStep)
+    assert loaded.key == entry.key
+    # The key only depends on what replays, not on the failure or argument reprs.
+    assert replace(entry, failure=None, steps=[CorpusStep(step.flow, step.seed) for step in entry.steps]).key == entry.key
+    assert replace(entry, seed=43).key != entry.key
+
+
+def test_corpus_save_load_count():
+    with tempfile.TemporaryDirectory() as directory:
+        corpus = Corpus(directory)
+        novel = make_entry(["flow_mint"])
+        failure = make_entry(["flow_mint", "flow_transfer"], "AssertionError")
+        novel_path = corpus.save(novel)
+        failure_path = corpus.save(failure)
+        # Saving the same sequence again overwrites it.
+        assert corpus.save(novel) == novel_path
+
+        assert corpus.load() == [(failure_path, failure), (novel_path, novel)]
+        assert corpus.count("failure") == 1
+        assert corpus.count("novel") == 1
+
+        corpus.remove(failure_path)
+        assert corpus.load() == [(novel_path, novel)]
+        assert corpus.count("failure") == 0
@@ -0,0 +1,95 @@
+import random
+
+import pytest
+
+from wake.testing import *
+from wake.testing.fuzzing import *
+
+from .fuzz_scheduler import AdaptiveScheduler, ScheduledFuzzTest, StaticScheduler, compare_schedulers, format_comparison, get_methods
+
+
+class Flows:
+    @flow(weight=100)
+    def flow_a(self) -> None:
+        pass
+
+    @flow(weight=50)
+    def flow_b(self) -> None:
+        pass
+
+
+def test_static_scheduler_weights():
+    scheduler = StaticScheduler()
+    assert get_methods(Flows, "flow") == [Flows.flow_a, Flows.flow_b]
+    assert scheduler.get_weight(Flows.flow_a) == 100
+    scheduler.update(Flows.flow_a, False)
+    assert scheduler.get_weight(Flows.flow_a) == 100
+
+
+def test_adaptive_scheduler_weights():
+    scheduler = AdaptiveScheduler(decay=0.5, floor=0.1)
+    # Untried flows count as novel.
+    assert scheduler.get_weight(Flows.flow_a) == pytest.approx(100 * 1.1)
+
+    scheduler.update(Flows.flow_a, False)
+    assert scheduler.novelty["flow_a"] == pytest.approx(0.5)
+    assert scheduler.get_weight(Flows.flow_a) == pytest.approx(100 * 0.6)
+    scheduler.update(Flows.flow_a, True)
+    assert scheduler.novelty["flow_a"] == pytest.approx(0.75)
+
+    for _ in range(100):
+        scheduler.update(Flows.flow_a, False)
+    # Flows that stop finding anything decay to `floor` times their weight, others are untouched.
+    assert scheduler.get_weight(Flows.flow_a) == pytest.approx(100 * 0.1)
+    assert scheduler.get_weight(Flows.flow_b) == pytest.approx(50 * 1.1)
+
+
+def test_adaptive_scheduler_choose():
+    random.seed(0)
+    scheduler = AdaptiveScheduler(decay=0.5, floor=0.1)
+    for _ in range(20):
+        scheduler.update(Flows.flow_a, False)
+    flows = [scheduler.choose([Flows.flow_a, Flows.flow_b]) for _ in range(1000)]
+    # Weights 10 : 55.
+    assert 100 < flows.count(Flows.flow_a) < 220
+
+
+class BalanceFuzzTest(ScheduledFuzzTest):
+    def __init__(self):
+        self._account = default_chain.accounts[1]
+        self._balance = self._account.balance
+
+    def pre_sequence(self) -> None:
+        assert self._account.balance == self._balance
+
+    @flow()
+    def flow_add_balance(self) -> None:
+        self._account.balance += 1
+
+
+@default_chain.connect()
+def test_scheduled_run_reverts_sequences():
+    test = BalanceFuzzTest()
+    test.run(3, 5)
+    assert test._account.balance == test._balance
+
+
+class BuggyFuzzTest(ScheduledFuzzTest):
+    @flow(weight=100)
+    def flow_ok(self) -> None:
+        pass
+
+    @flow(weight=10)
+    def flow_bug(self) -> None:
+        assert False
+
+
+@default_chain.connect()
+def test_compare_schedulers():
+    results = compare_schedulers(BuggyFuzzTest, 3, 10, 50)
+    assert [result.scheduler for result in results] == ["StaticScheduler", "AdaptiveScheduler"]
+    for result in results:
+        assert result.campaigns == 3
+        assert len(result.flows_to_failure) == 3
+        assert all(flows >= 1 for flows in result.flows_to_failure)
+    assert "AdaptiveScheduler" in format_comparison(results)
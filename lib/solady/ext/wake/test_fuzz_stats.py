@@ -0,0 +1,45 @@
+import time
+
+from wake.testing import *
+
+from .fuzz_stats import FuzzProfiler, FuzzStats
+
+
+class DecodingTx:
+    decoded = 0
+
+    @property
+    def error(self):
+        return None
+
+    @property
+    def events(self):
+        DecodingTx.decoded += 1
+        time.sleep(0.01)
+        return ()
+
+
+@default_chain.connect()
+def test_profiler_times_decoding_where_read():
+    stats = FuzzStats()
+    profiler = FuzzProfiler(stats)
+    profiler.start()
+    try:
+        with profiler.measure("flow", "flow_ignore_events"):
+            default_chain.tx_callback(DecodingTx())
+        with profiler.measure("flow", "flow_read_events"):
+            tx = DecodingTx()
+            default_chain.tx_callback(tx)
+            tx.events
+    finally:
+        profiler.stop()
+
+    # The profiler itself decodes nothing, only the flow that reads events pays for it.
+    assert DecodingTx.decoded == 1
+    assert stats.calls["flow_ignore_events"].decode.total < 0.005
+    assert stats.calls["flow_read_events"].decode.total >= 0.01
+    assert not stats.eager_events
+    # `stop` restores the original properties.
+    decode = profiler._decode
+    DecodingTx().events
+    assert profiler._decode == decode
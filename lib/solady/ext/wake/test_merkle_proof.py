@@ -1,9 +1,12 @@
+import os
 import random
+import tempfile
 
 from wake.testing import *
 from wake.testing.fuzzing import random_bytes, random_int
 from pytypes.tests.MerkleProofMock import MerkleProofMock
 
+from .merkle_file import build_merkle_file
 from .utils import MerkleTree
 
 
@@ -49,3 +52,45 @@ def test_merkle_multiproof():
         proof, flags = tree.get_multiproof(indexes)
         assert merkle_proof_mock.verifyMultiProof(proof, tree.root, [keccak256(leaf) for leaf in leaves], flags)
         assert merkle_proof_mock.verifyMultiProofCalldata(proof, tree.root, [keccak256(leaf) for leaf in leaves], flags)
+
+
+@default_chain.connect()
+def test_merkle_proof_update():
+    tree = MerkleTree()
+    for _ in range(100):
+        tree.add_leaf(random_bytes(0, 1_000))
+
+    merkle_proof_mock = MerkleProofMock.deploy()
+
+    for _ in range(20):
+        index = random_int(0, len(tree) - 1)
+        old_root = tree.root
+        tree.update_leaf(index, random_bytes(0, 1_000))
+        assert tree.root != old_root
+        assert tree.index_of(tree.values[index]) <= index
+
+        for i in random.sample(range(len(tree)), 10) + [index]:
+            assert merkle_proof_mock.verify(tree.get_proof(i), tree.root, keccak256(tree.values[i]))
+
+        tree.add_leaf(random_bytes(0, 1_000))
+        assert merkle_proof_mock.verify(tree.get_proof(len(tree) - 1), tree.root, keccak256(tree.values[-1]))
+
+
+@default_chain.connect()
+def test_merkle_file():
+    leaves = [random_bytes(0, 100) for _ in range(random_int(1, 2_000))]
+    tree = MerkleTree(leaves)
+
+    merkle_proof_mock = MerkleProofMock.deploy()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        with build_merkle_file(leaves, os.path.join(tmp, "tree.bin"), workers=2, chunk_size=64) as merkle_file:
+            assert merkle_file.root == tree.root
+
+            for i in random.sample(range(len(leaves)), min(len(leaves), 20)):
+                assert merkle_file.get_proof(i) == tree.get_proof(i)
+                assert merkle_proof_mock.verify(merkle_file.get_proof(i), merkle_file.root, keccak256(leaves[i]))
+
+            indexes = sorted(random.sample(range(len(leaves)), random_int(1, min(len(leaves), 100))))
+            proof, flags = merkle_file.get_multiproof(indexes)
+            assert merkle_proof_mock.verifyMultiProof(proof, merkle_file.root, [merkle_file.get_leaf_hash(i) for i in indexes], flags)
@@ -4,10 +4,12 @@ from wake.testing import *
 from wake.testing.fuzzing import *
 from pytypes.tests.MerkleProofMock import MerkleProofMock
 
+from .fuzz_runner import run_sharded
+from .fuzz_scheduler import ScheduledFuzzTest
 from .utils import MerkleTree
 
 
-class MerkleProofFuzzTest(FuzzTest):
+class MerkleProofFuzzTest(ScheduledFuzzTest):
     _merkle_proof: MerkleProofMock
     _tree: MerkleTree
 
@@ -31,7 +33,7 @@ class MerkleProofFuzzTest(FuzzTest):
     @flow(weight=40)
     def flow_verify_invalid_random(self, proof: List[bytes32], root: bytes32, leaf: bytes) -> None:
         try:
-            index = self._tree.values.index(leaf)
+            index = self._tree.index_of(leaf)
             assert self._tree.root == root
             assert self._tree.get_proof(index) == proof
             return
@@ -75,7 +77,7 @@ class MerkleProofFuzzTest(FuzzTest):
     @flow(weight=40)
     def flow_verify_multiproof_invalid_random(self, proof: List[bytes32], root: bytes32, leaves: List[bytes], flags: List[bool]) -> None:
         try:
-            indexes = sorted([self._tree.values.index(leaf) for leaf in leaves])
+            indexes = sorted([self._tree.index_of(leaf) for leaf in leaves])
             assert self._tree.root == root
             assert self._tree.get_multiproof(indexes) == (proof, flags)
             return
@@ -118,6 +120,5 @@ class MerkleProofFuzzTest(FuzzTest):
         assert not self._merkle_proof.verifyMultiProofCalldata(proof, root, leaf_hashes, flags)
 
 
-@default_chain.connect()
 def test_merkle_proof_fuzz():
-    MerkleProofFuzzTest().run(10, 100)
+    run_sharded(MerkleProofFuzzTest, 10, 100).check()
@@ -1,32 +1,60 @@
+import os
+from typing import Optional
+
 from wake.testing import *
 from wake.testing.fuzzing import *
 from pytypes.tests.SignatureCheckerMock import SignatureCheckerMock, ERC1217SignatureChecker
 
-class SignatureCheckerFuzzTest(FuzzTest):
+from .fuzz_fixture import FixtureFuzzTest
+from .fuzz_runner import run_sharded
+from .fuzz_scheduler import ScheduledFuzzTest, get_campaign_sequence_seeds
+from .signature_pool import SignaturePool, get_signer_key
+
+class SignatureCheckerFuzzTest(FixtureFuzzTest, ScheduledFuzzTest):
+    # Prepared in the parent process by `prepare_campaign` and inherited by the shards. Every
+    # campaign replaces it, tests not run by run_sharded sign as they go.
+    _prepared_signatures: Optional[SignaturePool] = None
+    signatures: SignaturePool
     _signature_checker: SignatureCheckerMock
     _erc1271_signature_checker: ERC1217SignatureChecker
     _signer: Account
 
-    def pre_sequence(self) -> None:
+    @classmethod
+    def prepare_campaign(cls, seed: int, sequences: int, flows: int) -> None:
+        # A flow takes at most one signature.
+        signatures = SignaturePool(cache_dir=os.environ.get("FUZZ_SIGNATURE_CACHE"))
+        signatures.prepare(get_campaign_sequence_seeds(seed, sequences), flows)
+        cls._prepared_signatures = signatures
+
+    def setup_fixture(self) -> None:
+        self.signatures = self._prepared_signatures or SignaturePool(cache_dir=os.environ.get("FUZZ_SIGNATURE_CACHE"))
         self._signature_checker = SignatureCheckerMock.deploy()
         self._erc1271_signature_checker = ERC1217SignatureChecker.deploy()
-        self._signer = Account.new()
+
+    def pre_sequence(self) -> None:
+        super().pre_sequence()
+        # A new signer every sequence, derived from its seed so replays sign the same data.
+        self._signer = Account.from_key(get_signer_key(self.sequence_seed))
+        self.signatures.start(self.sequence_seed)
+
+    def post_sequence(self) -> None:
+        self.signatures.finish()
 
     @flow()
     def flow_check_signature(self) -> None:
-        data = random_bytes(0, 1000)
-        hash = keccak256(data)
-        signature = self._signer.sign_hash(hash)
-        r = signature[:32]
-        s = signature[32:64]
-        v = signature[64]
+        signed = self.signatures.next()
+        hash = signed.hash
+        signature = signed.signature
+        r = signed.r
+        s = signed.s
+        v = signed.v
 
         assert self._signature_checker.isValidSignatureNow(self._signer, hash, signature)
         assert self._signature_checker.isValidSignatureNow_(
             self._signer,
             hash,
             r,
-            s if v == 27 else (s[0] | 0x80).to_bytes(1, "big") + s[1:],
+            signed.vs,
         )
         assert self._signature_checker.isValidSignatureNow__(self._signer, hash, v, r, s)
         assert self._signature_checker.isValidSignatureNowCalldata(self._signer, hash, signature)
@@ -37,7 +65,7 @@ class SignatureCheckerFuzzTest(FuzzTest):
             self._erc1271_signature_checker,
             hash,
             r,
-            s if v == 27 else (s[0] | 0x80).to_bytes(1, "big") + s[1:],
+            signed.vs,
             from_=self._signer,
         )
         assert self._signature_checker.isValidSignatureNow__(self._erc1271_signature_checker, hash, v, r, s, from_=self._signer)
@@ -48,7 +76,7 @@ class SignatureCheckerFuzzTest(FuzzTest):
             self._erc1271_signature_checker,
             hash,
             r,
-            s if v == 27 else (s[0] | 0x80).to_bytes(1, "big") + s[1:],
+            signed.vs,
         )
         assert not self._signature_checker.isValidSignatureNow__(self._erc1271_signature_checker, hash, v, r, s)
         assert not self._signature_checker.isValidSignatureNowCalldata(self._erc1271_signature_checker, hash, signature)
@@ -95,9 +123,9 @@ class SignatureCheckerFuzzTest(FuzzTest):
     @flow(weight=60)
     def flow_check_signature_invalid_modified(self) -> None:
         signer = self._signer.address
-        data = random_bytes(0, 1000)
-        hash = bytearray(keccak256(data))
-        signature = bytearray(self._signer.sign_hash(hash))
+        signed = self.signatures.next()
+        hash = bytearray(signed.hash)
+        signature = bytearray(signed.signature)
         original_v = None
 
         x = random_int(0, 2)
@@ -172,6 +200,5 @@ class SignatureCheckerFuzzTest(FuzzTest):
         assert not self._signature_checker.isValidERC1271SignatureNowCalldata(self._erc1271_signature_checker, hash, signature, from_=signer)
 
 
-@default_chain.connect()
 def test_signature_checker():
-    SignatureCheckerFuzzTest().run(10, 20)
+    run_sharded(SignatureCheckerFuzzTest, 10, 20).check()
@@ -0,0 +1,51 @@
+import os
+import tempfile
+
+from eth_keys import keys
+
+from . import signature_pool
+from .signature_pool import SignaturePool, get_signer_key, sign_range
+
+
+def test_signature_pool():
+    pool = SignaturePool(max_data_length=100)
+    pool.prepare([1, 2], 3, workers=2)
+    pool.start(1)
+    # Prepared items and the ones signed past them match signing inline.
+    assert [pool.next() for _ in range(5)] == sign_range(1, 0, 5, 100)
+    item = sign_range(1, 0, 1, 100)[0]
+    signature = keys.Signature(vrs=(item.v - 27, int.from_bytes(item.r, "big"), int.from_bytes(item.s, "big")))
+    assert signature.recover_public_key_from_msg_hash(item.hash) == keys.PrivateKey(get_signer_key(1)).public_key
+
+    pool.finish()
+    assert list(pool._signed) == [2]
+    # Starting a sequence drops the previous one even if it didn't finish.
+    pool.start(2)
+    pool.start(3)
+    assert list(pool._signed) == [3]
+
+
+def test_signature_pool_cache(monkeypatch):
+    signed = []
+
+    def sign_range_counted(seed, start, stop, max_data_length):
+        signed.append((seed, start, stop))
+        return sign_range(seed, start, stop, max_data_length)
+
+    monkeypatch.setattr(signature_pool, "sign_range", sign_range_counted)
+    with tempfile.TemporaryDirectory() as directory:
+        pool = SignaturePool(max_data_length=100, cache_dir=directory)
+        pool.prepare([1], 3, workers=1)
+        pool.start(1)
+        items = [pool.next() for _ in range(4)]
+        pool.finish()
+        address = keys.PrivateKey(get_signer_key(1)).public_key.to_checksum_address()
+        assert os.listdir(directory) == [address]
+
+        # A rerun with the same seed reads everything back, only signing past the cached items.
+        signed.clear()
+        pool = SignaturePool(max_data_length=100, cache_dir=directory)
+        pool.prepare([1], 3, workers=1)
+        pool.start(1)
+        assert [pool.next() for _ in range(5)] == items + sign_range(1, 4, 5, 100)
+        assert signed == [(1, 4, 5)]
@@ -0,0 +1,40 @@
+import copy
+
+import pytest
+
+from .utils import IndexedDict
+
+
+def test_indexed_dict_missing_key():
+    d = IndexedDict()
+    d[1] = 10
+    for c in (d, copy.copy(d), copy.deepcopy(d)):
+        assert c[1] == 10
+        with pytest.raises(KeyError):
+            c[2]
+        with pytest.raises(KeyError):
+            c.pop(2)
+        assert c.pop(2, None) is None
+
+
+def test_indexed_dict_default():
+    d = IndexedDict(0)
+    d[1] = 10
+    d[2] = 0
+    c = copy.deepcopy(d)
+    assert c[2] == 0
+    assert list(c) == [1]
+    c[1] = 0
+    assert len(c) == 0
+    assert d[1] == 10
+
+
+def test_indexed_dict_delete_swaps_last():
+    d = IndexedDict()
+    for i in range(5):
+        d[i] = i
+    del d[1]
+    d.pop(4)
+    assert sorted(d._keys) == [0, 2, 3]
+    assert all(d._keys[position] == key for key, position in d._positions.items())
+    assert {d.random_key() for _ in range(100)} == {0, 2, 3}
@@ -1,89 +1,257 @@
-from typing import List, Tuple
+import random
+from bisect import bisect_left, insort
+from typing import Any, Dict, Generic, ItemsView, Iterable, Iterator, KeysView, List, Optional, Sequence, Tuple, TypeVar, ValuesView
 
 from wake.testing import keccak256
 
+K = TypeVar("K")
+V = TypeVar("V")
+_MISSING: Any = object()
+
+
+def hash_pair(a: bytes, b: bytes) -> bytes:
+    # Sorted pair hashing, as in MerkleProofLib.
+    return keccak256(a + b) if a < b else keccak256(b + a)
+
+
+def get_node(level: Sequence[bytes], index: int) -> bytes:
+    # Missing right siblings are duplicates of the left node.
+    return level[index] if index < len(level) else level[index - 1]
+
+
+def get_proof(levels: Sequence[Sequence[bytes]], index: int) -> List[bytes]:
+    """
+    `verify` proof for leaf `index` given every level of the tree, leaf hashes first.
+    """
+    return [get_node(level, index >> depth ^ 1) for depth, level in enumerate(levels[:-1])]
+
+
+def get_multiproof(levels: Sequence[Sequence[bytes]], indexes: List[int]) -> Tuple[List[bytes], List[bool]]:
+    """
+    Proof and flags for `verifyMultiProof` with leaves in `indexes` order. Each level is a
+    single pass over the sorted known nodes: a node is either hashed with the next known
+    node (its sibling, flag True) or with a proof element (flag False).
+    """
+    proof = []
+    flags = []
+    known = list(indexes)
+    assert all(a < b for a, b in zip(known, known[1:])), "Leaves must be sorted"
+
+    for level in levels[:-1]:
+        new_known = []
+        j = 0
+        while j < len(known):
+            i = known[j]
+            if i % 2 == 0 and j + 1 < len(known) and known[j + 1] == i + 1:
+                flags.append(True)
+                j += 2
+            else:
+                flags.append(False)
+                proof.append(get_node(level, i ^ 1))
+                j += 1
+            new_known.append(i // 2)
+        known = new_known
+
+    return proof, flags
+
 
 class MerkleTree:
-    _is_ready: bool
+    """
+    Sorted pair Merkle tree compatible with MerkleProofLib, a lone node at the end of a level
+    is paired with itself.
+
+    Levels are kept between calls and only the nodes above changed leaves are rehashed:
+    appended leaves are hashed in one pass on the next `root`/proof access, `update_leaf`
+    rehashes its O(log n) path.
+    """
+
     _leaves: List[bytes]
     _levels: List[List[bytes]]
+    # First leaf whose ancestors are stale, None if the tree is up to date.
+    _dirty: Optional[int]
+    _indexes: Dict[bytes, List[int]]
+    _proofs: Dict[int, Tuple[bytes, ...]]
+    _values: Optional[Tuple[bytes, ...]]
 
-    def __init__(self):
-        self._is_ready = False
+    def __init__(self, leaves: Iterable[bytes] = ()):
         self._leaves = []
-        self._levels = []
+        self._levels = [[]]
+        self._dirty = None
+        self._indexes = {}
+        self._proofs = {}
+        self._values = None
+        for leaf in leaves:
+            self.add_leaf(leaf)
+
+    def __len__(self) -> int:
+        return len(self._leaves)
 
     @property
     def root(self) -> bytes:
-        if not self._is_ready:
-            self._build_tree()
+        self._build_tree()
         return self._levels[-1][0]
 
     @property
     def values(self) -> Tuple[bytes, ...]:
-        return tuple(self._leaves)
+        if self._values is None:
+            self._values = tuple(self._leaves)
+        return self._values
+
+    def index_of(self, leaf: bytes) -> int:
+        """
+        Same as `values.index(leaf)` in O(1), raises ValueError if the leaf is not in the tree.
+        """
+        indexes = self._indexes.get(leaf)
+        if not indexes:
+            raise ValueError("Leaf not in tree")
+        return indexes[0]
 
     def get_proof(self, index: int) -> List[bytes]:
-        if not self._is_ready:
-            self._build_tree()
+        if not 0 <= index < len(self._leaves):
+            raise IndexError("Leaf index out of range")
+        self._build_tree()
 
-        proof = []
-        for level in self._levels[:-1]:
-            if index % 2 == 0:
-                proof.append(level[index + 1])
-            else:
-                proof.append(level[index - 1])
-            index //= 2
-        return proof
+        proof = self._proofs.get(index)
+        if proof is None:
+            proof = tuple(get_proof(self._levels, index))
+            self._proofs[index] = proof
+        return list(proof)
 
     def get_multiproof(self, indexes: List[int]) -> Tuple[List[bytes], List[bool]]:
-        if not self._is_ready:
-            self._build_tree()
-
-        proof = []
-        flags = []
-        known = indexes
-        assert known == sorted(known), "Leaves must be sorted"
-
-        for level in self._levels[:-1]:
-            new_known = []
-            for i in known:
-                if i % 2 == 0:
-                    if i + 1 in known:
-                        flags.append(True)
-                    else:
-                        flags.append(False)
-                        if i + 1 < len(level):
-                            proof.append(level[i + 1])
-                        else:
-                            proof.append(level[i])
-                else:
-                    if i - 1 in known:
-                        pass  # already processed
-                    else:
-                        flags.append(False)
-                        proof.append(level[i - 1])
-                if len(new_known) == 0 or new_known[-1] != i // 2:
-                    new_known.append(i // 2)
-            known = new_known
-
-        return proof, flags
+        self._build_tree()
+        return get_multiproof(self._levels, indexes)
 
     def add_leaf(self, leaf: bytes):
+        index = len(self._leaves)
         self._leaves.append(leaf)
-        self._is_ready = False
+        self._levels[0].append(keccak256(leaf))
+        self._indexes.setdefault(leaf, []).append(index)
+        if self._dirty is None:
+            self._dirty = index
+        self._invalidate()
+
+    def update_leaf(self, index: int, leaf: bytes):
+        if not 0 <= index < len(self._leaves):
+            raise IndexError("Leaf index out of range")
+        old = self._leaves[index]
+        indexes = self._indexes[old]
+        del indexes[bisect_left(indexes, index)]
+        if not indexes:
+            del self._indexes[old]
+        insort(self._indexes.setdefault(leaf, []), index)
+
+        self._leaves[index] = leaf
+        self._levels[0][index] = keccak256(leaf)
+        if self._dirty is None:
+            self._rehash(index, index + 1)
+        else:
+            self._dirty = min(self._dirty, index)
+        self._invalidate()
 
     def _build_tree(self) -> None:
-        self._levels.append([keccak256(leaf) for leaf in self._leaves])
-        while len(self._levels[-1]) > 1:
-            self._levels.append(self._build_level(self._levels[-1]))
-        self._is_ready = True
-
-    def _build_level(self, level: List[bytes]) -> List[bytes]:
-        if len(level) % 2 == 1:
-            level.append(level[-1])
-        return [
-            keccak256(level[i] + level[i + 1]) if level[i] < level[i + 1]
-            else keccak256(level[i + 1] + level[i])
-            for i in range(0, len(level), 2)
-        ]
+        if self._dirty is not None:
+            self._rehash(self._dirty, len(self._leaves))
+            self._dirty = None
+
+    def _rehash(self, start: int, stop: int) -> None:
+        # Recompute the parents of nodes [start, stop) level by level up to the root.
+        depth = 0
+        while len(self._levels[depth]) > 1:
+            level = self._levels[depth]
+            if depth + 1 == len(self._levels):
+                self._levels.append([])
+            parents = self._levels[depth + 1]
+            start, stop = start >> 1, ((stop - 1) >> 1) + 1
+            for i in range(start, stop):
+                node = hash_pair(level[2 * i], get_node(level, 2 * i + 1))
+                if i < len(parents):
+                    parents[i] = node
+                else:
+                    parents.append(node)
+            depth += 1
+        del self._levels[depth + 1:]
+
+    def _invalidate(self) -> None:
+        self._proofs.clear()
+        self._values = None
+
+
+class IndexedDict(Generic[K, V]):
+    """
+    Dict that samples a uniformly random key in O(1). Keys are also kept in a dense list with a
+    key -> position map, a deleted key is swapped with the last one.
+
+    With a `default`, missing keys read as `default` and keys set to it are removed, so only
+    non-default entries (e.g. non-zero balances) are iterated and sampled.
+    """
+
+    _values: Dict[K, V]
+    _keys: List[K]
+    _positions: Dict[K, int]
+
+    def __init__(self, default: V = _MISSING):
+        # A flag rather than identity checks against _MISSING, which deepcopy doesn't preserve.
+        self._has_default = default is not _MISSING
+        self._default = default
+        self._values = {}
+        self._keys = []
+        self._positions = {}
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def __iter__(self) -> Iterator[K]:
+        return iter(self._values)
+
+    def __contains__(self, key: K) -> bool:
+        return key in self._values
+
+    def __getitem__(self, key: K) -> V:
+        if key not in self._values and self._has_default:
+            return self._default
+        return self._values[key]
+
+    def __setitem__(self, key: K, value: V) -> None:
+        if self._has_default and value == self._default:
+            self.pop(key, None)
+            return
+        if key not in self._values:
+            self._positions[key] = len(self._keys)
+            self._keys.append(key)
+        self._values[key] = value
+
+    def __delitem__(self, key: K) -> None:
+        del self._values[key]
+        position = self._positions.pop(key)
+        last = self._keys.pop()
+        if position < len(self._keys):
+            self._keys[position] = last
+            self._positions[last] = position
+
+    def get(self, key: K, default: Optional[V] = None) -> Optional[V]:
+        return self._values.get(key, default)
+
+    def pop(self, key: K, default: V = _MISSING) -> V:
+        if key not in self._values:
+            if default is _MISSING:
+                raise KeyError(key)
+            return default
+        value = self._values[key]
+        del self[key]
+        return value
+
+    def keys(self) -> KeysView[K]:
+        return self._values.keys()
+
+    def values(self) -> ValuesView[V]:
+        return self._values.values()
+
+    def items(self) -> ItemsView[K, V]:
+        return self._values.items()
+
+    def random_key(self) -> K:
+        return random.choice(self._keys)
+
+    def random_item(self) -> Tuple[K, V]:
+        key = random.choice(self._keys)
+        return key, self._values[key]
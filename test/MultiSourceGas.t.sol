@@ -103,6 +103,7 @@ contract MultiSourceLoanTest is MultiSourceCommons {
             _addUser(thisUser, principalAmount * 20, address(_msLoan));
 
             refiOffer.lender = thisUser;
+            uint256 tranchesBefore = loan.tranche.length;
             uint256 a = gasleft();
             vm.prank(_borrower);
             (loanId, loan) = _msLoan.addNewTranche(refiOffer, loan, abi.encode());
@@ -110,6 +111,7 @@ contract MultiSourceLoanTest is MultiSourceCommons {
             console.logString("Gas cost refinance. Refi: ");
             console.logUint(i);
             console.logUint(a - b);
+            _logGas("addNewTranche", tranchesBefore, a - b);
             console.logString("------");
             unchecked {
                 ++i;
@@ -131,12 +133,14 @@ contract MultiSourceLoanTest is MultiSourceCommons {
             (uint256 loanId, IMultiSourceLoan.Loan memory loan, IMultiSourceLoan.RenegotiationOffer memory refiOffer) =
                 _setupRefinanceFull();
 
+            uint256 tranchesBefore = loan.tranche.length;
             vm.prank(_refinanceLender);
             uint256 a = gasleft();
             (loanId, loan) = _msLoan.refinanceFull(refiOffer, loan, abi.encode(0));
             uint256 b = gasleft();
             console.logUint(i);
             console.logUint(a - b);
+            _logGas("refinanceFull", tranchesBefore, a - b);
             console.logString("------");
 
             vm.startPrank(_borrower);
@@ -174,6 +178,7 @@ contract MultiSourceLoanTest is MultiSourceCommons {
             vm.stopPrank();
             console.logUint(i);
             console.logUint(a - b);
+            _logGas("repayLoan", loan.tranche.length, a - b);
             console.logString("------");
             unchecked {
                 ++i;
@@ -215,6 +220,7 @@ contract MultiSourceLoanTest is MultiSourceCommons {
 
             console.logUint(loan.tranche.length);
             console.logUint(a - b);
+            _logGas("liquidateLoan", loan.tranche.length, a - b);
 
             vm.startPrank(_borrower);
             auction =
@@ -227,6 +233,7 @@ contract MultiSourceLoanTest is MultiSourceCommons {
             b = gasleft();
             console.logString("Settlement");
             console.logUint(a - b);
+            _logGas("settleAuction", loan.tranche.length, a - b);
             console.logString("------");
             assertEq(collateralCollection.ownerOf(collateralTokenId), _borrower);
             collateralCollection.approve(address(_msLoan), collateralTokenId);
@@ -238,6 +245,89 @@ contract MultiSourceLoanTest is MultiSourceCommons {
         }
     }
 
+    function testEmitManySourcesGas() public {
+        uint256 mintedAmount = 1e18;
+        testToken.mint(_borrower, mintedAmount);
+        vm.prank(_borrower);
+        testToken.approve(address(_msLoan), mintedAmount);
+        for (uint256 i = 1; i < _maxTranches;) {
+            vm.warp(1);
+            IMultiSourceLoan.OfferExecution[] memory offerExecution = new IMultiSourceLoan.OfferExecution[](i);
+            for (uint256 j = 0; j < i;) {
+                /// @dev Each offer's principal covers the tranches ahead of it, like `_getManyOffersLDE`.
+                IMultiSourceLoan.LoanOffer memory loanOffer =
+                    _getSampleOffer(address(collateralCollection), collateralTokenId, _INITIAL_PRINCIPAL * (j + 1));
+                loanOffer.maxSeniorRepayment = type(uint256).max;
+                offerExecution[j] = IMultiSourceLoan.OfferExecution(loanOffer, _INITIAL_PRINCIPAL, "");
+                unchecked {
+                    ++j;
+                }
+            }
+            IMultiSourceLoan.LoanOffer memory first = offerExecution[0].offer;
+
+            vm.startPrank(_borrower);
+            uint256 a = gasleft();
+            (uint256 loanId, IMultiSourceLoan.Loan memory loan) = _msLoan.emitLoan(
+                IMultiSourceLoan.LoanExecutionData(
+                    IMultiSourceLoan.ExecutionData(
+                        offerExecution, collateralTokenId, first.duration, first.expirationTime, _borrower, ""
+                    ),
+                    _borrower,
+                    ""
+                )
+            );
+            uint256 b = gasleft();
+            _logGas("emitLoan", i, a - b);
+
+            _msLoan.repayLoan(
+                IMultiSourceLoan.LoanRepaymentData(IMultiSourceLoan.SignableRepaymentData(loanId, "", false), loan, "")
+            );
+            collateralCollection.approve(address(_msLoan), collateralTokenId);
+            vm.stopPrank();
+            unchecked {
+                ++i;
+            }
+        }
+    }
+
+    function testRefinancePartialGas() public {
+        uint256 mintedAmount = 1e18;
+        testToken.mint(_borrower, mintedAmount);
+        vm.prank(_borrower);
+        testToken.approve(address(_msLoan), mintedAmount);
+        for (uint256 i = 1; i < _maxTranches;) {
+            vm.warp(1);
+            /// @dev `_setupMultipleRefi` adds `i - 1` tranches to the initial one.
+            (uint256 loanId, IMultiSourceLoan.Loan memory loan) = _setupMultipleRefi(i - 1);
+            vm.warp(block.timestamp + 1 days);
+            /// @dev Refinances the first tranche, which has the lowest apr.
+            IMultiSourceLoan.RenegotiationOffer memory refiOffer =
+                _getSampleRefinancePartial(loanId, new uint256[](1), loan);
+
+            vm.prank(_refinanceLender);
+            uint256 a = gasleft();
+            (loanId, loan) = _msLoan.refinancePartial(refiOffer, loan);
+            uint256 b = gasleft();
+            _logGas("refinancePartial", i, a - b);
+
+            vm.startPrank(_borrower);
+            _msLoan.repayLoan(
+                IMultiSourceLoan.LoanRepaymentData(IMultiSourceLoan.SignableRepaymentData(loanId, "", false), loan, "")
+            );
+            collateralCollection.approve(address(_msLoan), collateralTokenId);
+            vm.stopPrank();
+            unchecked {
+                ++i;
+            }
+        }
+    }
+
+    /// @dev Parsed by `deploy/florida_contracts/gas_benchmark.py`. `_tranches` is the loan's
+    /// tranche count before the call (the number of sources for `emitLoan`).
+    function _logGas(string memory _operation, uint256 _tranches, uint256 _gas) private pure {
+        console.log("GAS_REPORT", _operation, _tranches, _gas);
+    }
+
     function _setupPool() private {
         Pool.OptimalIdleRange memory optimalIdleRange = IPool.OptimalIdleRange(5e19, 75e18, 0);
         _pool = new Pool(